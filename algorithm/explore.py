@@ -0,0 +1,166 @@
+# explore.py
+# Exploration planner. It keeps two views of the partly known maze: optimistic
+# (unknown walls are open) and pessimistic (unknown walls are closed). The true
+# shortest start-goal distance lies between the two flood distances, so the
+# search is finished as soon as they are equal: the best path is then proven
+# and the fast run cannot find a shorter one. Until then the mouse visits the
+# cells that can still change the answer, i.e. cells with unknown walls on an
+# optimistic shortest path, nearest first and counted together with the way
+# home, since the mouse has to drive back to the start anyway.
+from array import array
+from algorithm.maze import Maze, DIR_CODES, DIR_NAMES, OPEN_DIRS, sensor_masks
+from algorithm.floodfill import FloodFill, flood_fill_flat, UNREACHED, _goal_cells
+
+# Phases of the search
+TO_GOAL = 'to_goal'
+EXPLORE = 'explore'
+RETURN = 'return'
+DONE = 'done'
+
+class Explorer:
+    """
+    Step-by-step exploration. Every decision does a fixed amount of work: the three
+    flood maps are repaired incrementally for the walls just seen, plus one BFS
+    from the mouse and one scan over the cells, so the time per cell is bounded
+    by O(cells) whatever the maze looks like.
+    """
+
+    def __init__(self, width, height, goal, start=None):
+        """
+        :param width, height: Maze size in cells.
+        :param goal: Goal cell or list/tuple of goal cells (row, col).
+        :param start: Start cell, defaults to the bottom-left corner.
+        """
+        self.width, self.height = width, height
+        self.goal = _goal_cells(goal)
+        self.start = start if start is not None else (height - 1, 0)
+        n = width * height
+        self.start_i = self.start[0] * width + self.start[1]
+        self.goal_i = set(r * width + c for (r, c) in self.goal)
+        # Optimistic maps (unknown = open) towards the goal and towards the start,
+        # on separate Maze copies since each FloodFill adds walls through its own maze.
+        self.to_goal = FloodFill(Maze(width, height), self.goal)
+        self.to_start = FloodFill(Maze(width, height), self.start)
+        self.maze = self.to_goal.maze  # known walls and observed sides (maze.seen)
+        # Pessimistic map (unknown = closed): every inner wall starts closed.
+        closed = Maze(width, height)
+        for i in range(n):
+            for d in range(4):
+                closed.add_wall_idx(i, d)
+        self.closed = FloodFill(closed, self.goal)
+        self._dist = array('H', [UNREACHED] * n)
+        self._queue = array('H', self._dist)
+        self.phase = TO_GOAL
+        self.target = None
+
+    # Knowledge
+    def observe(self, i, look, walls):
+        """
+        Record one sensor sweep from cell index i into all three maps.
+        :param look, walls: Bit masks of the sides looked at and of those with a wall.
+        """
+        new = self.to_goal.observe_idx(i, look, walls)
+        for d in range(4):
+            if walls & look & (1 << d):
+                # also when the side was seen open before: the wall is kept in every map
+                self.to_start.add_wall_idx(i, d)
+                self.closed.add_wall_idx(i, d)
+            elif new & (1 << d):
+                self.closed.open_wall_idx(i, d)
+
+    def sense(self, cell, sensor_walls):
+        """Feed the walls seen from cell, e.g. {'N': True, 'E': False, 'W': True}."""
+        self.observe(cell[0] * self.width + cell[1], *sensor_masks(sensor_walls))
+
+    @property
+    def shortest(self):
+        """(optimistic, pessimistic) start-goal distance in cells."""
+        return self.to_goal.dist[self.start_i], self.closed.dist[self.start_i]
+
+    @property
+    def proven(self):
+        """
+        True when the shortest start-goal path is known for certain. Same answer as
+        maze.shortest_path_observed(to_goal.dist, start), but O(1) from the pessimistic map.
+        """
+        low, high = self.shortest
+        return high != UNREACHED and low == high
+
+    def unknown(self, i):
+        """True if cell index i still has an unobserved side."""
+        return self.maze.seen[i] != 15
+
+    # Decisions
+    def _candidate(self, here):
+        """
+        Best cell to explore: unknown walls, on an optimistic shortest path, cheapest
+        detour (distance from the mouse plus distance on to the start).
+        """
+        dist = flood_fill_flat(self.maze, [divmod(here, self.width)], self._dist, self._queue)
+        goal_d, start_d, seen = self.to_goal.dist, self.to_start.dist, self.maze.seen
+        length = goal_d[self.start_i]
+        best, best_cost = None, UNREACHED
+        for i in range(self.width * self.height):
+            if seen[i] != 15 and goal_d[i] + start_d[i] == length:
+                cost = dist[i] + start_d[i]
+                if cost < best_cost:
+                    best, best_cost = i, cost
+        return best
+
+    def _first_step(self, here, target):
+        """Direction code of the first move on a shortest path to target (uses the BFS from _candidate)."""
+        dist, walls, offsets = self._dist, self.maze.walls, self.maze.offsets
+        i = target
+        while dist[i] > 1:
+            for d in OPEN_DIRS[walls[i]]:
+                j = i + offsets[d]
+                if dist[j] == dist[i] - 1:
+                    i = j
+                    break
+        for d in OPEN_DIRS[walls[here]]:
+            if here + offsets[d] == i:
+                return d
+        return None
+
+    def _downhill(self, flood, here, heading):
+        """Open neighbour with the smallest flood distance, straight ahead first, unseen cells on ties."""
+        walls, offsets, dist, seen = self.maze.walls, self.maze.offsets, flood.dist, self.maze.seen
+        h = DIR_CODES[heading]
+        best, best_key = None, None
+        for d in (h, (h + 1) & 3, (h + 3) & 3, (h + 2) & 3):
+            if walls[here] & (1 << d):
+                continue
+            j = here + offsets[d]
+            key = (dist[j], 0 if seen[j] != 15 else 1)
+            if best_key is None or key < best_key:
+                best, best_key = d, key
+        return best
+
+    def step(self, cell, heading, sensor_walls):
+        """
+        Take in the walls seen from cell and return the next direction ('N', 'E', 'S', 'W'),
+        or None when the search is over (back at the start) or nothing is reachable.
+        """
+        self.sense(cell, sensor_walls)
+        here = cell[0] * self.width + cell[1]
+        if self.phase == TO_GOAL and here in self.goal_i:
+            self.phase = EXPLORE
+        if self.phase == EXPLORE:
+            self.target = None if self.proven else self._candidate(here)
+            if self.target is None:
+                self.phase = RETURN
+            elif self.target == here:
+                # Only reachable by standing here: the sensors have now seen what they can
+                self.target = None
+                self.phase = RETURN if self.proven else EXPLORE
+        if self.phase == RETURN and here == self.start_i:
+            self.phase = DONE
+        if self.phase == DONE:
+            return None
+        if self.phase == TO_GOAL:
+            d = self._downhill(self.to_goal, here, heading)
+        elif self.phase == EXPLORE and self.target is not None:
+            d = self._first_step(here, self.target)
+        else:
+            d = self._downhill(self.to_start, here, heading)
+        return None if d is None else DIR_NAMES[d]
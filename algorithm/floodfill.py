@@ -1,47 +1,101 @@
 # floodfill.py
-from collections import deque
-from algorithm.maze import Maze
+from array import array
+from algorithm.maze import Maze, DIR_CODES, OPEN_DIRS, sensor_masks
 
-def flood_fill(maze, goal):
-    """
-    Compute Manhattan distance from every cell to the goal using floodfill (BFS).
-    :param maze: Maze object with wall information.
-    :param goal: Goal cell or list/tuple of goal cells (row, col). 
-                 If multiple goal cells (e.g., center of maze), provide a list of (r,c) pairs.
-    :return: 2D list of distances of size maze.height x maze.width.
-    """
-    # Initialize distance grid with a large number (treated as "unreached/blank").
-    dist = [[9999 for _ in range(maze.width)] for _ in range(maze.height)]
-    queue = deque()
+# Distance value used for cells that have not been reached (yet) by the flood.
+UNREACHED = 9999
 
-    # Determine list of goal cells
+def _goal_cells(goal):
+    """Normalize a single goal cell or a list/tuple of goal cells to a list of (r, c)."""
     if isinstance(goal, list):
-        goal_cells = goal
+        return goal
     elif isinstance(goal, tuple) and len(goal) > 0 and isinstance(goal[0], tuple):
         # If goal is a tuple of tuples, convert to list (to handle multiple goals given as tuple)
-        goal_cells = list(goal)
+        return list(goal)
+    return [goal]
+
+def flood_fill_flat(maze, goal, dist=None, queue=None):
+    """
+    Floodfill (BFS) over the flat wall array of the maze.
+    :param maze: Maze object with wall information.
+    :param goal: Goal cell or list/tuple of goal cells (row, col). A goal given as
+                 (row, col, cost) is weighted: it starts at distance `cost` instead of 0
+                 and only joins the flood when the wavefront gets there.
+    :param dist: Optional preallocated array('H') of maze.width * maze.height entries to fill.
+    :param queue: Optional preallocated array('H') of the same size, used as the BFS queue.
+    :return: dist, indexed by maze.index(r, c).
+    """
+    n = maze.width * maze.height
+    if dist is None:
+        dist = array('H', [UNREACHED] * n)
     else:
-        goal_cells = [goal]
+        for i in range(n):
+            dist[i] = UNREACHED
+    if queue is None:
+        queue = array('H', dist)
+    walls, offsets = maze.walls, maze.offsets
 
     # Initialize queue with goal cell(s)
-    for (gr, gc) in goal_cells:
-        dist[gr][gc] = 0
-        queue.append((gr, gc))
-
-    # BFS floodfill to assign distances
-    while queue:
-        r, c = queue.popleft()
-        current_d = dist[r][c]
-        # Explore all four directions from (r,c)
-        for direction, (dr, dc) in [('N', (-1, 0)), ('E', (0, 1)), ('S', (1, 0)), ('W', (0, -1))]:
-            nr, nc = r + dr, c + dc
-            # If neighbor is within bounds and accessible (no wall) and not visited yet
-            if 0 <= nr < maze.height and 0 <= nc < maze.width:
-                if maze.is_open(r, c, direction) and dist[nr][nc] == 9999:
-                    dist[nr][nc] = current_d + 1
-                    queue.append((nr, nc))
+    head = tail = 0
+    seeds = []
+    for g in _goal_cells(goal):
+        i = g[0] * maze.width + g[1]
+        if len(g) > 2 and g[2]:
+            seeds.append((g[2], i))
+        elif dist[i]:
+            dist[i] = 0
+            queue[tail] = i
+            tail += 1
+
+    if seeds:
+        # Level by level, seeding the weighted goals as their level comes up
+        seeds.sort()
+        s, ns = 0, len(seeds)
+        while head < tail or s < ns:
+            level = dist[queue[head]] if head < tail else seeds[s][0]
+            while s < ns and seeds[s][0] <= level:
+                i = seeds[s][1]
+                s += 1
+                if dist[i] == UNREACHED:
+                    dist[i] = level
+                    queue[tail] = i
+                    tail += 1
+            while head < tail and dist[queue[head]] == level:
+                i = queue[head]
+                head += 1
+                for d in OPEN_DIRS[walls[i]]:
+                    j = i + offsets[d]
+                    if dist[j] == UNREACHED:
+                        dist[j] = level + 1
+                        queue[tail] = j
+                        tail += 1
+        return dist
+
+    # BFS floodfill to assign distances; every cell enters the queue at most once
+    while head < tail:
+        i = queue[head]
+        head += 1
+        nd = dist[i] + 1
+        for d in OPEN_DIRS[walls[i]]:
+            j = i + offsets[d]
+            if dist[j] == UNREACHED:
+                dist[j] = nd
+                queue[tail] = j
+                tail += 1
     return dist
 
+def flood_fill(maze, goal):
+    """
+    Compute Manhattan distance from every cell to the goal using floodfill (BFS).
+    :param maze: Maze object with wall information.
+    :param goal: Goal cell or list/tuple of goal cells (row, col). 
+                 If multiple goal cells (e.g., center of maze), provide a list of (r,c) pairs.
+    :return: 2D list of distances of size maze.height x maze.width.
+    """
+    dist = flood_fill_flat(maze, goal)
+    w = maze.width
+    return [list(dist[r * w:(r + 1) * w]) for r in range(maze.height)]
+
 # Function to update flood map based on new sensor data (walls).
 def update_flood_map(maze, current_cell, sensor_walls, goal):
     """
@@ -61,6 +115,196 @@ def update_flood_map(maze, current_cell, sensor_walls, goal):
     # Recompute and return new distance map
     return flood_fill(maze, goal)
 
+class FloodFill:
+    """
+    Persistent floodfill distance map that is repaired incrementally as walls are discovered.
+    Adding a wall can only make distances grow, so instead of re-running the whole BFS
+    only the cells that lost their shortest path through the new wall are invalidated
+    and then re-flooded from the still valid cells around them.
+    The map is a flat array('H') indexed by maze.index(r, c); all work buffers are
+    allocated once here.
+    """
+
+    def __init__(self, maze, goal, fill=True):
+        """
+        :param maze: Maze object with wall information (walls are added through this object).
+        :param goal: Goal cell or list/tuple of goal cells (row, col), same as flood_fill.
+        :param fill: False to skip the initial flood when the caller fills in `dist`
+                     itself (e.g. a map restored by utils.maze_store).
+        """
+        self.maze = maze
+        self.goal_cells = _goal_cells(goal)
+        for g in self.goal_cells:
+            if len(g) > 2 and g[2]:
+                raise ValueError("weighted goals need flood_fill_flat; the repair assumes goals at 0")
+        n = maze.width * maze.height
+        self.dist = array('H', [UNREACHED] * n)
+        self._queue = array('H', self.dist)
+        self._affected = array('H', self.dist)
+        self._mark = bytearray(n)
+        if fill:
+            self.recompute()
+
+    def recompute(self):
+        """Rebuild the whole distance map from scratch (e.g. after walls were removed)."""
+        return flood_fill_flat(self.maze, self.goal_cells, self.dist, self._queue)
+
+    def distance(self, r, c):
+        """Distance of cell (r, c) to the goal."""
+        return self.dist[r * self.maze.width + c]
+
+    def to_grid(self):
+        """Copy of the distance map as a 2D list, same layout as flood_fill()."""
+        w = self.maze.width
+        return [list(self.dist[r * w:(r + 1) * w]) for r in range(self.maze.height)]
+
+    def add_wall(self, r, c, direction):
+        """
+        Add a wall to the maze and repair the distance map.
+        :return: True if any distance changed.
+        """
+        if direction not in DIR_CODES:
+            raise ValueError("Invalid direction. Use 'N', 'E', 'S', or 'W'.")
+        return self.add_wall_idx(r * self.maze.width + c, DIR_CODES[direction])
+
+    def add_wall_idx(self, i, d):
+        """Same as add_wall() with a flat cell index and a direction code."""
+        maze = self.maze
+        if not maze.add_wall_idx(i, d):
+            return False  # wall already known (or maze border), nothing to repair
+        j = i + maze.offsets[d]
+        di, dj = self.dist[i], self.dist[j]
+        # Only the farther of the two cells can have used the removed passage
+        if di == dj:
+            return False
+        return self._repair(i if di > dj else j)
+
+    def observe_idx(self, i, look, walls):
+        """
+        Record a sensor sweep from cell index i (see Maze.observe_idx) and repair the
+        map for the walls that are new, including walls on sides seen open before.
+        :return: Bit mask of the sides that were not observed before.
+        """
+        new = self.maze.observe_idx(i, look, 0)
+        found = walls & look & ~self.maze.walls[i] & 0x0F
+        for d in range(4):
+            if found & (1 << d):
+                self.add_wall_idx(i, d)
+        return new
+
+    def open_wall_idx(self, i, d):
+        """
+        Remove a wall and repair the distance map. Opening a passage can only make
+        distances shrink, so this is a BFS relaxation from the side that got closer.
+        :return: True if any distance changed.
+        """
+        maze = self.maze
+        if not maze.remove_wall_idx(i, d):
+            return False
+        walls, offsets = maze.walls, maze.offsets
+        dist, queue = self.dist, self._queue
+        j = i + offsets[d]
+        if dist[i] > dist[j]:
+            i, j = j, i
+        if dist[i] == UNREACHED or dist[i] + 1 >= dist[j]:
+            return False
+        dist[j] = dist[i] + 1
+        queue[0] = j
+        head, tail = 0, 1
+        while head < tail:
+            i = queue[head]
+            head += 1
+            nd = dist[i] + 1
+            for k in OPEN_DIRS[walls[i]]:
+                j = i + offsets[k]
+                if dist[j] > nd:
+                    dist[j] = nd
+                    queue[tail] = j
+                    tail += 1
+        return True
+
+    def update(self, current_cell, sensor_walls):
+        """
+        Incremental equivalent of update_flood_map().
+        :param current_cell: (row, col) of the robot's current position.
+        :param sensor_walls: dict like {'N': True/False, 'E': ..., 'S': ..., 'W': ...}.
+        :return: Updated distance map (flat array owned by this object).
+        """
+        r, c = current_cell
+        self.observe_idx(self.maze.index(r, c), *sensor_masks(sensor_walls))
+        return self.dist
+
+    def _repair(self, start):
+        walls, offsets = self.maze.walls, self.maze.offsets
+        dist, queue, affected, mark = self.dist, self._queue, self._affected, self._mark
+
+        # Pass 1: walk outwards (in BFS order) from the cell that lost its passage and
+        # invalidate every cell that no longer has a neighbour one step closer to the goal.
+        queue[0] = start
+        mark[start] = 1
+        head, tail, count = 0, 1, 0
+        while head < tail:
+            i = queue[head]
+            head += 1
+            d = dist[i]
+            if d == 0:
+                continue  # goal cell
+            supported = False
+            for k in OPEN_DIRS[walls[i]]:
+                if dist[i + offsets[k]] == d - 1:
+                    supported = True
+                    break
+            if supported:
+                continue
+            dist[i] = UNREACHED
+            affected[count] = i
+            count += 1
+            for k in OPEN_DIRS[walls[i]]:
+                j = i + offsets[k]
+                if dist[j] == d + 1 and not mark[j]:
+                    mark[j] = 1
+                    queue[tail] = j
+                    tail += 1
+        for h in range(tail):
+            mark[queue[h]] = 0
+        if not count:
+            return False
+
+        # Pass 2: seed the invalidated region from its valid border and re-flood it
+        # level by level. Cells that cannot be reached any more stay UNREACHED.
+        seeds = []
+        for a in range(count):
+            i = affected[a]
+            best = UNREACHED
+            for k in OPEN_DIRS[walls[i]]:
+                nd = dist[i + offsets[k]]
+                if nd < best:
+                    best = nd
+            if best != UNREACHED:
+                seeds.append((best + 1, i))
+        seeds.sort()
+        head = tail = s = 0
+        ns = len(seeds)
+        while head < tail or s < ns:
+            level = dist[queue[head]] if head < tail else seeds[s][0]
+            while s < ns and seeds[s][0] <= level:
+                i = seeds[s][1]
+                s += 1
+                if dist[i] == UNREACHED:
+                    dist[i] = level
+                    queue[tail] = i
+                    tail += 1
+            while head < tail and dist[queue[head]] == level:
+                i = queue[head]
+                head += 1
+                for k in OPEN_DIRS[walls[i]]:
+                    j = i + offsets[k]
+                    if dist[j] == UNREACHED:
+                        dist[j] = level + 1
+                        queue[tail] = j
+                        tail += 1
+        return True
+
 # Independent testing of floodfill module
 if __name__ == "__main__":
     from algorithm.maze import Maze
@@ -84,3 +328,43 @@ if __name__ == "__main__":
     print("\nAfter adding wall north of (1,2), new distance map:")
     for row in new_map:
         print(row)
+
+    # Check the incremental FloodFill against the full BFS while walls of a random
+    # 32x32 maze are discovered one cell at a time, and time both approaches.
+    import random
+    import time
+    try:
+        ticks_us, ticks_diff = time.ticks_us, time.ticks_diff
+    except AttributeError:
+        ticks_us = lambda: int(time.perf_counter() * 1000000)
+        ticks_diff = lambda a, b: a - b
+
+    size = 32
+    random.seed(1)
+    hidden = []  # (r, c, direction) walls the mouse will find
+    for r in range(size):
+        for c in range(size):
+            for direction in ('E', 'S'):
+                if random.random() < 0.3:
+                    hidden.append((r, c, direction))
+    random.shuffle(hidden)
+    centre = [(size // 2 - 1, size // 2 - 1), (size // 2 - 1, size // 2),
+              (size // 2, size // 2 - 1), (size // 2, size // 2)]
+
+    full_maze = Maze(size, size)
+    incremental = FloodFill(Maze(size, size), centre)
+    full_us = incremental_us = 0
+    for (r, c, direction) in hidden:
+        t0 = ticks_us()
+        full_maze.add_wall(r, c, direction)
+        reference = flood_fill(full_maze, centre)
+        t1 = ticks_us()
+        incremental.add_wall(r, c, direction)
+        t2 = ticks_us()
+        full_us += ticks_diff(t1, t0)
+        incremental_us += ticks_diff(t2, t1)
+        assert incremental.to_grid() == reference, "incremental flood differs at wall %s" % ((r, c, direction),)
+    steps = len(hidden)
+    print("\n%dx%d maze, %d walls added: full BFS %d us/step, incremental %d us/step (%.1fx)" % (
+        size, size, steps, full_us // steps, incremental_us // steps,
+        full_us / max(incremental_us, 1)))
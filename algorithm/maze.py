@@ -1,6 +1,43 @@
 # maze.py
+
+# Integer direction codes, used as indices into the precomputed tables below.
+NORTH = 0
+EAST = 1
+SOUTH = 2
+WEST = 3
+
+DIR_CODES = {'N': NORTH, 'E': EAST, 'S': SOUTH, 'W': WEST}
+DIR_NAMES = ('N', 'E', 'S', 'W')
+OPPOSITE = (SOUTH, WEST, NORTH, EAST)
+
+# OPEN_DIRS[walls] -> tuple of direction codes without a wall, for every 4-bit wall byte.
+OPEN_DIRS = tuple(tuple(d for d in range(4) if not mask & (1 << d)) for mask in range(16))
+
+# High bits of Maze.seen, only used as scratch by Maze.shortest_path_observed().
+_BACK_SHIFT = 4   # bits 4-5: direction back to the previous cell of the walk
+_DEAD = 0x40      # bit 6: no observed shortest path from this cell
+_ENTERED = 0x80   # bit 7: the walk has been here
+
+
+def sensor_masks(sensor_walls):
+    """
+    Bit masks of one sensor sweep, for Maze.observe_idx().
+    :param sensor_walls: dict like {'N': True, 'E': False, 'W': True}.
+    :return: (look, walls): sides that were looked at, and those of them with a wall.
+    """
+    look = walls = 0
+    for direction, wall in sensor_walls.items():
+        if direction not in DIR_CODES:
+            raise ValueError("Invalid direction. Use 'N', 'E', 'S', or 'W'.")
+        bit = 1 << DIR_CODES[direction]
+        look |= bit
+        if wall:
+            walls |= bit
+    return look, walls
+
+
 class Maze:
-    # Bit masks for walls
+    # Bit masks for walls (bit number == direction code)
     WALL_N = 1  # 0001 - wall to the North
     WALL_E = 2  # 0010 - wall to the East
     WALL_S = 4  # 0100 - wall to the South
@@ -10,75 +47,204 @@ class Maze:
         """Initialize a maze of given dimensions with no internal walls."""
         self.width = width
         self.height = height
-        # 2D array for wall information, initialized with 0 (no walls).
-        self.walls = [[0 for _ in range(width)] for _ in range(height)]
-        # (Optionally, outer boundary walls could be initialized here, 
-        # but is_open will treat out-of-range as walls anyway.)
+        # One wall byte per cell, row-major: index = r * width + c.
+        self.walls = bytearray(width * height)
+        # Index offset to the neighbour in each direction (N, E, S, W).
+        self.offsets = (-width, 1, width, -1)
+        # The outer boundary is stored as walls, so lookups never need a bounds check.
+        for c in range(width):
+            self.walls[c] |= Maze.WALL_N
+            self.walls[(height - 1) * width + c] |= Maze.WALL_S
+        for r in range(height):
+            self.walls[r * width] |= Maze.WALL_W
+            self.walls[r * width + width - 1] |= Maze.WALL_E
+        # Observed sides, same bit layout as walls: a clear bit in walls is only a
+        # confirmed opening if the side is also set here. The border counts as seen.
+        self.seen = bytearray(self.walls)
+
+    def index(self, r, c):
+        """Flat index of cell (r, c)."""
+        return r * self.width + c
+
+    def cell(self, i):
+        """(row, col) of flat index i."""
+        return divmod(i, self.width)
+
+    def add_wall_idx(self, i, d):
+        """
+        Add a wall on side d (direction code) of cell index i.
+        Also updates the adjacent cell's opposite wall for consistency.
+        :return: True if the wall was not known before.
+        """
+        walls = self.walls
+        bit = 1 << d
+        if walls[i] & bit:
+            return False
+        walls[i] |= bit
+        walls[i + self.offsets[d]] |= 1 << OPPOSITE[d]
+        return True
+
+    def remove_wall_idx(self, i, d):
+        """
+        Remove the wall on side d of cell index i (and the neighbour's opposite wall).
+        The caller must not open the outer boundary.
+        :return: True if there was a wall.
+        """
+        walls = self.walls
+        bit = 1 << d
+        if not walls[i] & bit:
+            return False
+        walls[i] &= ~bit
+        walls[i + self.offsets[d]] &= ~(1 << OPPOSITE[d])
+        return True
+
+    def observe_idx(self, i, look, walls):
+        """
+        Record one sensor sweep from cell index i (e.g. left, front and right at once).
+        Both sides of each wall are marked as observed, and the walls are added, also
+        on sides seen open before (a wall reported once is kept, like update_flood_map()).
+        :param look: Bit mask of the sides looked at.
+        :param walls: Bit mask of the sides with a wall (a subset of look).
+        :return: Bit mask of the sides that were not observed before.
+        """
+        seen, offsets = self.seen, self.offsets
+        new = look & ~seen[i] & 0x0F
+        if new:
+            seen[i] |= new
+            for d in range(4):
+                if new & (1 << d):
+                    seen[i + offsets[d]] |= 1 << OPPOSITE[d]
+        added = walls & look & ~self.walls[i] & 0x0F
+        if added:
+            for d in range(4):
+                if added & (1 << d):
+                    self.add_wall_idx(i, d)
+        return new
+
+    def is_observed_idx(self, i, d):
+        """True if side d of cell index i has been observed (wall or opening)."""
+        return bool(self.seen[i] & (1 << d))
+
+    def unobserved(self, i):
+        """Bit mask of the sides of cell index i that have not been observed yet."""
+        return ~self.seen[i] & 0x0F
+
+    def shortest_path_observed(self, dist, start):
+        """
+        True if a shortest path from cell index start, following `dist` (flood distances
+        on this maze with unknown walls taken as open) down to 0, goes only through
+        observed openings. The optimistic distance is then also the real one: the path is
+        proven and no unexplored wall can make it shorter.
+        Depth-first walk down the distances; the way back and the dead ends are kept in
+        the high bits of `seen`, so nothing is allocated and every cell is entered at most
+        once. A second walk over the same cells clears the scratch bits again.
+        """
+        seen, walls, offsets = self.seen, self.walls, self.offsets
+        i = start
+        found = False
+        while True:
+            here = dist[i]
+            if here == 0:
+                found = True
+                break
+            # Observed openings: seen and not a wall
+            sides = seen[i] & ~walls[i] & 0x0F
+            for d in range(4):
+                if sides & (1 << d):
+                    j = i + offsets[d]
+                    if dist[j] == here - 1 and not seen[j] & _DEAD:
+                        seen[j] = (seen[j] & 0x0F) | (OPPOSITE[d] << _BACK_SHIFT) | _ENTERED
+                        i = j
+                        break
+            else:
+                seen[i] |= _DEAD
+                if i == start:
+                    break
+                i += offsets[(seen[i] >> _BACK_SHIFT) & 3]
+        # Children first, so the way back is still there when a cell is cleared
+        i = start
+        while True:
+            sides = seen[i] & ~walls[i] & 0x0F
+            for d in range(4):
+                if sides & (1 << d):
+                    j = i + offsets[d]
+                    if seen[j] & _ENTERED and (seen[j] >> _BACK_SHIFT) & 3 == OPPOSITE[d]:
+                        i = j
+                        break
+            else:
+                back = (seen[i] >> _BACK_SHIFT) & 3
+                seen[i] &= 0x0F
+                if i == start:
+                    break
+                i += offsets[back]
+        return found
+
+    def is_open_idx(self, i, d):
+        """True if there is no wall on side d (direction code) of cell index i."""
+        return not self.walls[i] & (1 << d)
+
+    def open_dirs(self, i):
+        """Tuple of direction codes that are open from cell index i."""
+        return OPEN_DIRS[self.walls[i]]
 
     def add_wall(self, r, c, direction):
         """
-        Add a wall at cell (r, c) in the given direction.
+        Add a wall at cell (r, c) in the given direction ('N', 'E', 'S' or 'W').
         Also updates the adjacent cell's opposite wall for consistency.
         """
-        if direction == 'N':
-            # Wall on north side of (r,c) -> also wall on south side of (r-1,c)
-            self.walls[r][c] |= Maze.WALL_N
-            if r - 1 >= 0:
-                self.walls[r-1][c] |= Maze.WALL_S
-        elif direction == 'E':
-            # Wall on east side of (r,c) -> also wall on west side of (r,c+1)
-            self.walls[r][c] |= Maze.WALL_E
-            if c + 1 < self.width:
-                self.walls[r][c+1] |= Maze.WALL_W
-        elif direction == 'S':
-            # Wall on south side of (r,c) -> also wall on north side of (r+1,c)
-            self.walls[r][c] |= Maze.WALL_S
-            if r + 1 < self.height:
-                self.walls[r+1][c] |= Maze.WALL_N
-        elif direction == 'W':
-            # Wall on west side of (r,c) -> also wall on east side of (r,c-1)
-            self.walls[r][c] |= Maze.WALL_W
-            if c - 1 >= 0:
-                self.walls[r][c-1] |= Maze.WALL_E
-        else:
+        if direction not in DIR_CODES:
             raise ValueError("Invalid direction. Use 'N', 'E', 'S', or 'W'.")
+        self.add_wall_idx(r * self.width + c, DIR_CODES[direction])
 
     def is_open(self, r, c, direction):
         """
-        Check if the cell (r,c) has an open path in the given direction 
+        Check if the cell (r,c) has an open path in the given direction
         (no wall and within maze bounds). Returns True if movement is possible.
         """
-        if direction == 'N':
-            if r - 1 < 0:
-                return False  # out of bounds (treat as wall)
-            # No wall on current cell's north and neighbor's south
-            return not (self.walls[r][c] & Maze.WALL_N or self.walls[r-1][c] & Maze.WALL_S)
-        elif direction == 'S':
-            if r + 1 >= self.height:
-                return False
-            return not (self.walls[r][c] & Maze.WALL_S or self.walls[r+1][c] & Maze.WALL_N)
-        elif direction == 'W':
-            if c - 1 < 0:
-                return False
-            return not (self.walls[r][c] & Maze.WALL_W or self.walls[r][c-1] & Maze.WALL_E)
-        elif direction == 'E':
-            if c + 1 >= self.width:
-                return False
-            return not (self.walls[r][c] & Maze.WALL_E or self.walls[r][c+1] & Maze.WALL_W)
-        else:
+        if direction not in DIR_CODES:
             raise ValueError("Invalid direction. Use 'N', 'E', 'S', or 'W'.")
+        return not self.walls[r * self.width + c] & (1 << DIR_CODES[direction])
 
 # Independent testing of Maze module
 if __name__ == "__main__":
     # Create a 2x2 maze and add some walls, then test is_open logic
     maze = Maze(2, 2)
-    print("Initial walls:", maze.walls)  # Expect all zeros (no walls)
+    print("Initial walls:", list(maze.walls))  # Expect only the outer boundary walls
 
     # Add a wall on the north side of cell (1,0)
     maze.add_wall(1, 0, 'N')
     # This should also add a wall on the south side of cell (0,0)
-    print("After adding wall between (1,0) and (0,0):", maze.walls)
+    print("After adding wall between (1,0) and (0,0):", list(maze.walls))
     # Test movement between these cells
     print("is_open(1,0,'N') ->", maze.is_open(1, 0, 'N'))  # Expect False (wall present)
     print("is_open(0,0,'S') ->", maze.is_open(0, 0, 'S'))  # Expect False (wall present)
     print("is_open(0,0,'E') ->", maze.is_open(0, 0, 'E'))  # Expect True (no wall to the east)")
+    print("is_open(0,0,'N') ->", maze.is_open(0, 0, 'N'))  # Expect False (outer boundary)
+
+    # Observed walls: a 1x3 corridor, start at the left end, goal at the right end
+    maze = Maze(3, 1)
+    dist = (2, 1, 0)  # flood distances to the goal with unknown walls open
+    print("Path proven before sensing ->", maze.shortest_path_observed(dist, 0))  # Expect False
+    look, walls = sensor_masks({'E': False})
+    print("New sides seen from (0,0):", maze.observe_idx(0, look, walls))  # Expect 2 (east)
+    maze.observe_idx(1, *sensor_masks({'E': False}))
+    print("Path proven after sensing ->", maze.shortest_path_observed(dist, 0))  # Expect True
+    print("Scratch bits cleared ->", list(maze.seen))  # Expect [15, 15, 15]
+
+    # Wall storage for a 32x32 half-size maze compared to the old list-of-lists layout
+    import gc
+    gc.collect()
+    try:
+        before = gc.mem_alloc()
+        old = [[0 for _ in range(32)] for _ in range(32)]
+        old_bytes = gc.mem_alloc() - before
+        before = gc.mem_alloc()
+        new = Maze(32, 32)
+        new_bytes = gc.mem_alloc() - before
+    except AttributeError:
+        import sys  # CPython has no gc.mem_alloc()
+        old = [[0 for _ in range(32)] for _ in range(32)]
+        old_bytes = sys.getsizeof(old) + sum(sys.getsizeof(row) for row in old)
+        maze = Maze(32, 32)
+        new_bytes = sys.getsizeof(maze.walls) + sys.getsizeof(maze.seen)
+    print("32x32 wall storage: list of lists %d bytes, walls + seen bytearrays %d bytes" % (old_bytes, new_bytes))
@@ -0,0 +1,212 @@
+# planner.py
+# Time-optimal path planner for the fast run. flood_fill minimizes the number of
+# cells, this planner minimizes the estimated run time instead: a Dijkstra search
+# over (cell, heading) states where one edge is a whole straight run, an in-place
+# 90 degree turn or a diagonal (zig-zag) run, each weighted by the motion model.
+import math
+from array import array
+from heapq import heappush, heappop
+from algorithm.maze import Maze, DIR_CODES
+from algorithm.floodfill import _goal_cells
+
+# Move kinds stored in the search tree
+_STRAIGHT = 0
+_TURN_RIGHT = 1
+_TURN_LEFT = 2
+_DIAG_RIGHT = 3
+_DIAG_LEFT = 4
+
+
+def trapezoid_time(distance, v_max, accel):
+    """
+    Time (s) to cover distance (mm) from standstill to standstill with a trapezoidal
+    velocity profile. accel of None/0 means constant speed (the open-loop MotorController model).
+    """
+    if distance <= 0:
+        return 0.0
+    if not accel:
+        return distance / v_max
+    if distance >= v_max * v_max / accel:
+        return distance / v_max + v_max / accel
+    return 2 * math.sqrt(distance / accel)  # triangle profile, never reaches v_max
+
+
+class MotionCosts:
+    def __init__(self, mm_per_sec=700.0, turn_90_time=0.5, cell_mm=180.0, accel=2000.0,
+                 diag_speed_factor=0.8, max_cells=32, diagonals=True):
+        """
+        Cost model for the planner, all times in seconds.
+        :param mm_per_sec: Top speed on straights (MotorController.mm_per_sec).
+        :param turn_90_time: Time for a 90 degree in-place turn (MotorController.turn_90_time).
+        :param cell_mm: Cell pitch (180 for classic, 90 for half-size mazes).
+        :param accel: Straight line acceleration in mm/s^2 (None for constant speed).
+        :param diag_speed_factor: Top speed on diagonals relative to straights.
+        :param max_cells: Longest run the cost tables cover.
+        :param diagonals: False to plan with orthogonal runs and 90 degree turns only.
+        """
+        self.mm_per_sec = mm_per_sec
+        self.turn_90_time = turn_90_time
+        self.cell_mm = cell_mm
+        self.accel = accel
+        self.diag_speed_factor = diag_speed_factor
+        # straight[k] / diagonal[k]: time of a k-cell run, precomputed so the search only indexes
+        self.straight = [trapezoid_time(k * cell_mm, mm_per_sec, accel)
+                         for k in range(max_cells + 1)]
+        diag_step = cell_mm * math.sqrt(0.5)
+        self.diagonal = [trapezoid_time(k * diag_step, mm_per_sec * diag_speed_factor, accel)
+                         for k in range(2 * max_cells + 1 if diagonals else 1)]
+        self.turn_90 = turn_90_time
+        self.turn_45 = turn_90_time / 2
+
+    @classmethod
+    def from_controller(cls, controller, **kwargs):
+        """Build the cost model from a calibrated MotorController."""
+        return cls(mm_per_sec=controller.mm_per_sec, turn_90_time=controller.turn_90_time, **kwargs)
+
+
+def plan_fast_run(maze, start, goal, heading='N', costs=None):
+    """
+    Find the fastest route from start to any goal cell.
+    :param maze: Maze object with the walls to plan on (unexplored walls should already be closed).
+    :param start: Start cell (row, col).
+    :param goal: Goal cell or list/tuple of goal cells (row, col).
+    :param heading: Heading of the mouse at the start ('N', 'E', 'S' or 'W').
+    :param costs: MotionCosts instance (defaults to MotionCosts()).
+    :return: (estimated time in seconds, plan) where plan is a list of (action, value) tuples,
+             e.g. [('straight', 5), ('right', 90), ('right', 45), ('diagonal', 3), ('left', 45)].
+             Returns (None, []) if no goal cell can be reached.
+    """
+    if costs is None:
+        costs = MotionCosts()
+    walls, offsets = maze.walls, maze.offsets
+    straight, diagonal = costs.straight, costs.diagonal
+    turn_90, turn_45 = costs.turn_90, costs.turn_45
+    max_run = len(straight) - 1
+    max_diag = len(diagonal) - 1
+
+    n = maze.width * maze.height * 4  # state = cell index * 4 + heading code
+    best = [None] * n
+    parent = array('l', [-1] * n)
+    move = bytearray(n)
+    length = bytearray(n)
+    goal_set = set(maze.index(r, c) for (r, c) in _goal_cells(goal))
+
+    s0 = maze.index(*start) * 4 + DIR_CODES[heading]
+    best[s0] = 0.0
+    heap = [(0.0, s0)]
+    end = -1
+    while heap:
+        t, s = heappop(heap)
+        if t > best[s]:
+            continue  # stale heap entry
+        i, h = s >> 2, s & 3
+        if i in goal_set:
+            end = s
+            break
+
+        # In-place 90 degree turns
+        for kind, nh in ((_TURN_RIGHT, (h + 1) & 3), (_TURN_LEFT, (h + 3) & 3)):
+            ns = (i << 2) | nh
+            nt = t + turn_90
+            if best[ns] is None or nt < best[ns]:
+                best[ns], parent[ns], move[ns], length[ns] = nt, s, kind, 1
+                heappush(heap, (nt, ns))
+
+        # Straight runs of 1..k cells in the current heading
+        j, k = i, 0
+        step = offsets[h]
+        bit = 1 << h
+        while not walls[j] & bit and k < max_run:
+            j += step
+            k += 1
+            ns = (j << 2) | h
+            nt = t + straight[k]
+            if best[ns] is None or nt < best[ns]:
+                best[ns], parent[ns], move[ns], length[ns] = nt, s, _STRAIGHT, k
+                heappush(heap, (nt, ns))
+
+        # Diagonal zig-zag runs: alternate side / heading moves, 45 degree turn in and out
+        for kind, side in ((_DIAG_RIGHT, (h + 1) & 3), (_DIAG_LEFT, (h + 3) & 3)):
+            j, k = i, 0
+            d = side
+            while not walls[j] & (1 << d) and k < max_diag:
+                j += offsets[d]
+                k += 1
+                if k >= 2:
+                    ns = (j << 2) | d
+                    nt = t + turn_45 + diagonal[k] + turn_45
+                    if best[ns] is None or nt < best[ns]:
+                        best[ns], parent[ns], move[ns], length[ns] = nt, s, kind, k
+                        heappush(heap, (nt, ns))
+                d = h if d == side else side
+
+    if end < 0:
+        return None, []
+
+    # Walk the search tree back to the start and emit the motion plan
+    steps = []
+    s = end
+    while s != s0:
+        kind, k = move[s], length[s]
+        if kind == _STRAIGHT:
+            steps.append([('straight', k)])
+        elif kind == _TURN_RIGHT:
+            steps.append([('right', 90)])
+        elif kind == _TURN_LEFT:
+            steps.append([('left', 90)])
+        else:
+            into, out = ('right', 'left') if kind == _DIAG_RIGHT else ('left', 'right')
+            # Odd length ends moving to the side: keep turning the same way on the way out
+            steps.append([(into, 45), ('diagonal', k), (into if k & 1 else out, 45)])
+        s = parent[s]
+    plan = []
+    for step in reversed(steps):
+        for action, value in step:
+            if plan and plan[-1][0] == action and action in ('left', 'right'):
+                plan[-1] = (action, plan[-1][1] + value)  # merge e.g. right 90 + right 45
+            else:
+                plan.append((action, value))
+    return best[end], plan
+
+
+def format_plan(plan):
+    """Compact text form of a plan, e.g. "straight 5, right 90, diagonal 3"."""
+    return ', '.join('%s %d' % (action, value) for action, value in plan)
+
+
+# Independent testing of planner module
+if __name__ == "__main__":
+    # 4x4 staircase corridor: the flood path zig-zags, the planner should take it as a diagonal
+    corridor = [(3, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2), (0, 3)]
+    links = set(zip(corridor, corridor[1:])) | set(zip(corridor[1:], corridor))
+    maze = Maze(4, 4)
+    for r in range(4):
+        for c in range(4):
+            for d, dr, dc in (('N', -1, 0), ('E', 0, 1), ('S', 1, 0), ('W', 0, -1)):
+                if ((r, c), (r + dr, c + dc)) not in links:
+                    maze.add_wall(r, c, d)
+    total, plan = plan_fast_run(maze, (3, 0), (0, 3))
+    print("4x4 staircase: %.3f s: %s" % (total, format_plan(plan)))
+
+    # Timing on a full 16x16 maze with scattered walls
+    import random
+    import time
+    try:
+        ticks_us, ticks_diff = time.ticks_us, time.ticks_diff
+    except AttributeError:
+        ticks_us = lambda: int(time.perf_counter() * 1000000)
+        ticks_diff = lambda a, b: a - b
+    random.seed(1)
+    maze = Maze(16, 16)
+    for r in range(16):
+        for c in range(16):
+            for d in ('E', 'S'):
+                if random.random() < 0.25:
+                    maze.add_wall(r, c, d)
+    goal = [(7, 7), (7, 8), (8, 7), (8, 8)]
+    costs = MotionCosts(mm_per_sec=700.0, turn_90_time=0.5)
+    t0 = ticks_us()
+    total, plan = plan_fast_run(maze, (15, 0), goal, 'N', costs)
+    elapsed = ticks_diff(ticks_us(), t0)
+    print("16x16: planned in %d us, estimated run %s s: %s" % (
+        elapsed, None if total is None else "%.2f" % total, format_plan(plan)))
@@ -0,0 +1,158 @@
+# flood_batch.py
+# Host-only NumPy backend of algorithm.floodfill for offline analysis of many
+# mazes: worst-case search paths, goal region variants, 32x32 half-size mazes.
+# The walls of a batch of equally sized mazes are one (B, H, W) uint8 array in
+# the Maze bit layout. The BFS runs as a vectorized wavefront: each level
+# expands the frontier of every maze at once through the open sides of its
+# cells. A batch can be many mazes, many goal sets on one maze, or both (the
+# arrays broadcast). The distances are the same uint16 values, UNREACHED
+# included, that flood_fill_flat() puts into its array('H').
+#
+#   python -m analysis.flood_batch maze.txt [more mazes ...] [--goal 7,7 7,8 8,7 8,8]
+import argparse
+import numpy as np
+from algorithm.floodfill import UNREACHED, _goal_cells
+
+_N, _E, _S, _W = (np.uint8(1 << d) for d in range(4))
+
+def walls_array(mazes):
+    """Stack the walls of equally sized Maze objects into a (B, H, W) uint8 array."""
+    if not mazes:
+        raise ValueError("no mazes")
+    h, w = mazes[0].height, mazes[0].width
+    for maze in mazes:
+        if (maze.height, maze.width) != (h, w):
+            raise ValueError("all mazes of a batch must have the same size")
+    return np.frombuffer(b''.join(bytes(maze.walls) for maze in mazes), np.uint8).reshape(len(mazes), h, w)
+
+def goal_seeds(goal, height, width):
+    """
+    Starting distances of a goal, as accepted by flood_fill_flat(): a cell, a list of
+    cells, or (row, col, cost) weighted cells.
+    :return: (height, width) uint16 array, UNREACHED where there is no goal.
+    """
+    seeds = np.full((height, width), UNREACHED, np.uint16)
+    for g in _goal_cells(goal):
+        cost = g[2] if len(g) > 2 else 0
+        if cost < seeds[g[0], g[1]]:
+            seeds[g[0], g[1]] = cost
+    return seeds
+
+def _pack(cells, dtype):
+    """(..., H, W) bool -> (..., H) rows with bit c set for column c."""
+    bits = np.packbits(cells, axis=-1, bitorder='little')
+    pad = np.dtype(dtype).itemsize - bits.shape[-1]
+    if pad:
+        bits = np.concatenate([bits, np.zeros(bits.shape[:-1] + (pad,), np.uint8)], axis=-1)
+    return np.ascontiguousarray(bits).view(np.dtype(dtype).newbyteorder('<'))[..., 0]
+
+def _unpack(rows, width):
+    """Inverse of _pack()."""
+    rows = np.ascontiguousarray(rows.astype(rows.dtype.newbyteorder('<')))
+    bits = rows[..., None].view(np.uint8)
+    return np.unpackbits(bits, axis=-1, bitorder='little')[..., :width].astype(bool)
+
+def flood_fill_batch(walls, seeds):
+    """
+    Distance maps of a batch.
+    :param walls: (B, H, W) or (H, W) uint8 wall masks (see walls_array()), W <= 64.
+    :param seeds: (B, H, W) or (H, W) uint16 starting distances (see goal_seeds());
+                  walls and seeds broadcast, e.g. one maze against K goal sets.
+    :return: (B, H, W) uint16 distances.
+    """
+    walls, seeds = np.broadcast_arrays(np.asarray(walls, np.uint8), np.asarray(seeds, np.uint16))
+    if walls.ndim == 2:
+        walls, seeds = walls[None], seeds[None]
+    width = walls.shape[2]
+    if width > 64:
+        raise ValueError("at most 64 columns")
+    dtype = np.uint32 if width <= 32 else np.uint64
+    one = dtype(1)
+    # Every maze row is one integer, bit c for column c. The open sides are those
+    # of the cell a step starts from, as in the MCU BFS.
+    open_n = _pack((walls & _N) == 0, dtype)
+    open_e = _pack((walls & _E) == 0, dtype)
+    open_s = _pack((walls & _S) == 0, dtype)
+    open_w = _pack((walls & _W) == 0, dtype)
+    seeded = seeds < UNREACHED
+    pending = np.unique(seeds[seeded])  # levels at which goals join, ascending
+    # Results of the whole batch; the loop works on the mazes still flooding
+    shape = open_n.shape
+    out_reached = np.zeros(shape, dtype)
+    out_planes = []   # plane b holds bit b of the level each cell was reached at
+    alive = np.arange(shape[0])
+    reached = np.zeros(shape, dtype)
+    frontier = np.zeros(shape, dtype)
+    step = np.empty(shape, dtype)
+    planes = []
+    level = int(pending[0]) if pending.size else 0
+    p = 0
+    while True:
+        if p < pending.size and pending[p] == level:
+            frontier |= _pack(seeds[alive] == level, dtype) & ~reached
+            p += 1
+        if level & 15 == 0 and p == pending.size:
+            # Drop the mazes that are done, once they are at least a quarter of the batch
+            busy = frontier.any(axis=1)
+            if 4 * np.count_nonzero(busy) <= 3 * len(alive):
+                done = alive[~busy]
+                out_reached[done] = reached[~busy]
+                for b, plane in enumerate(planes):
+                    out_planes[b][done] = plane[~busy]
+                alive = alive[busy]
+                open_n, open_e, open_s, open_w = open_n[busy], open_e[busy], open_s[busy], open_w[busy]
+                reached, frontier, step = reached[busy], frontier[busy], step[busy]
+                planes = [plane[busy] for plane in planes]
+        if not frontier.any():
+            if p == pending.size:
+                break
+            level = int(pending[p])  # nothing in flight: jump to the next weighted goal
+            continue
+        reached |= frontier
+        while len(planes) < level.bit_length():
+            planes.append(np.zeros(reached.shape, dtype))
+            out_planes.append(np.zeros(shape, dtype))
+        for b in range(level.bit_length()):
+            if level >> b & 1:
+                planes[b] |= frontier
+        np.left_shift(frontier & open_e, one, out=step)
+        step |= (frontier & open_w) >> one
+        step[:, :-1] |= (frontier & open_n)[:, 1:]
+        step[:, 1:] |= (frontier & open_s)[:, :-1]
+        np.bitwise_and(step, ~reached, out=frontier)
+        level += 1
+    out_reached[alive] = reached
+    for b, plane in enumerate(planes):
+        out_planes[b][alive] = plane
+    dist = np.zeros(walls.shape, np.uint16)
+    for b, plane in enumerate(out_planes):
+        dist |= _unpack(plane, width).astype(np.uint16) << b
+    dist[~_unpack(out_reached, width)] = UNREACHED
+    return dist
+
+def flood_fill_mazes(mazes, goal):
+    """flood_fill_flat() of every maze to the same goal. :return: (B, H, W) uint16 distances."""
+    walls = walls_array(mazes)
+    return flood_fill_batch(walls, goal_seeds(goal, walls.shape[1], walls.shape[2]))
+
+def main():
+    from sim.maze_files import load_maze, centre_goal
+    parser = argparse.ArgumentParser(description="Distance maps of maze files (NumPy flood fill)")
+    parser.add_argument('mazes', nargs='+')
+    parser.add_argument('--goal', nargs='*', default=None, help="goal cells as row,col[,cost]")
+    args = parser.parse_args()
+    by_size = {}
+    for path in args.mazes:
+        maze = load_maze(path)
+        by_size.setdefault((maze.height, maze.width), []).append((path, maze))
+    for (h, w), items in sorted(by_size.items()):
+        goal = ([tuple(int(v) for v in g.split(',')) for g in args.goal] if args.goal
+                else centre_goal(w, h))
+        dist = flood_fill_mazes([maze for _, maze in items], goal)
+        for (path, _), d in zip(items, dist):
+            reached = d[d < UNREACHED]
+            print("%s: %dx%d, start distance %d, farthest cell %d, %d unreachable cells" % (
+                path, w, h, d[h - 1, 0], reached.max(), d.size - reached.size))
+
+if __name__ == "__main__":
+    main()
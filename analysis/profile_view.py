@@ -0,0 +1,115 @@
+# profile_view.py
+# Host-side viewer of control tick profiles written by utils.profiler
+# (Profiler.dump(), copied off the board with mpremote cp :profile.bin .).
+# Prints per stage count, mean, percentiles (bucket upper edges), maximum and
+# the mean as a share of the tick budget, optionally with the histogram of each
+# stage. Several dumps (e.g. before / after a change) are shown one after the
+# other, and compared stage by stage against the first.
+#
+#   python -m analysis.profile_view profile.bin
+#   python -m analysis.profile_view before.bin after.bin --budget-us 1000 --hist
+import argparse
+import struct
+import numpy as np
+from utils.profiler import MAGIC, _HEADER
+
+def load_profile(path):
+    """
+    :return: dict with 'names' (list), 'bucket_us', and the arrays 'count', 'total_us',
+             'max_us' (per stage) and 'hist' (stages, buckets).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("%s: not a profiler dump" % path)
+    pos = len(MAGIC)
+    stages, buckets, bucket_us = struct.unpack_from(_HEADER, data, pos)
+    pos += struct.calcsize(_HEADER)
+    names = []
+    for _ in range(stages):
+        n = data[pos]
+        names.append(data[pos + 1:pos + 1 + n].decode())
+        pos += 1 + n
+    counters = np.frombuffer(data, '<u4', 4 * stages, pos).astype(np.int64).reshape(4, stages)
+    pos += 16 * stages
+    hist = np.frombuffer(data, '<u4', stages * buckets, pos).astype(np.int64).reshape(stages, buckets)
+    return {'names': names, 'bucket_us': bucket_us, 'count': counters[0],
+            'total_us': counters[1] * 1000 + counters[2], 'max_us': counters[3], 'hist': hist}
+
+def percentiles(profile, ps):
+    """(stages, len(ps)) upper bucket edges in us; the overflow bucket reports the maximum."""
+    hist = profile['hist']
+    buckets = hist.shape[1]
+    cum = np.cumsum(hist, axis=1)
+    need = np.ceil(np.outer(profile['count'], np.asarray(ps, np.float64)) / 100.0)
+    index = np.array([np.searchsorted(c, n) for c, row in zip(cum, need) for n in row]).reshape(need.shape)
+    edges = (np.minimum(index, buckets - 1) + 1) * profile['bucket_us']
+    edges = np.where(index >= buckets - 1, profile['max_us'][:, None], edges)
+    return np.where(profile['count'][:, None] > 0, edges, 0)
+
+def table(profile, budget_us):
+    """Per stage summary as text lines."""
+    count = profile['count']
+    mean = np.divide(profile['total_us'], count, out=np.zeros(len(count)), where=count > 0)
+    pct = percentiles(profile, (50, 90, 99))
+    lines = ["%-16s %8s %8s %7s %7s %7s %7s %7s" % (
+        'stage', 'count', 'mean_us', 'p50', 'p90', 'p99', 'max', 'budget')]
+    for k, name in enumerate(profile['names']):
+        lines.append("%-16s %8d %8.1f %7d %7d %7d %7d %6.1f%%" % (
+            name, count[k], mean[k], pct[k, 0], pct[k, 1], pct[k, 2], profile['max_us'][k],
+            100.0 * mean[k] / budget_us))
+    return lines
+
+def histogram(profile, k, width=50):
+    """Text bars of the non-empty buckets of stage k."""
+    hist = profile['hist'][k]
+    used = np.nonzero(hist)[0]
+    if not used.size:
+        return []
+    bucket_us = profile['bucket_us']
+    top = hist.max()
+    lines = []
+    for b in range(used[0], used[-1] + 1):
+        label = ('%d-%d' % (b * bucket_us, (b + 1) * bucket_us) if b < len(hist) - 1
+                 else '>=%d' % (b * bucket_us))
+        lines.append("  %12s us %8d %s" % (label, hist[b], '#' * int(round(width * hist[b] / top))))
+    return lines
+
+def compare(base, profile):
+    """Change of the mean per stage present in both profiles, as text lines."""
+    lines = ["%-16s %10s %10s %9s" % ('stage', 'base mean', 'mean', 'change')]
+    index = dict((name, k) for k, name in enumerate(base['names']))
+    for k, name in enumerate(profile['names']):
+        j = index.get(name)
+        if j is None or not base['count'][j] or not profile['count'][k]:
+            continue
+        old = base['total_us'][j] / base['count'][j]
+        new = profile['total_us'][k] / profile['count'][k]
+        change = '%+8.1f%%' % (100.0 * (new - old) / old) if old else '%9s' % '-'
+        lines.append("%-16s %10.1f %10.1f %s" % (name, old, new, change))
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Show control tick profiles (utils.profiler dumps)")
+    parser.add_argument('profiles', nargs='+', help="profile.bin files")
+    parser.add_argument('--budget-us', type=float, default=1000.0, help="tick budget (1000 at 1 kHz)")
+    parser.add_argument('--hist', action='store_true', help="print the histogram of every stage")
+    args = parser.parse_args()
+    loaded = [load_profile(path) for path in args.profiles]
+    for path, profile in zip(args.profiles, loaded):
+        print("%s (%d us buckets)" % (path, profile['bucket_us']))
+        for line in table(profile, args.budget_us):
+            print(line)
+        if args.hist:
+            for k, name in enumerate(profile['names']):
+                print(name)
+                for line in histogram(profile, k):
+                    print(line)
+        if profile is not loaded[0]:
+            print("against %s" % args.profiles[0])
+            for line in compare(loaded[0], profile):
+                print(line)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# telemetry.py
+# Host-side analysis of control loop logs (log.csv from DataLogger or .bin from
+# BinaryLogger): loads columns into NumPy arrays in chunks, computes vectorized
+# timing / encoder / noise / tracking metrics and compares runs in parallel.
+#
+#   python -m analysis.telemetry log.csv
+#   python -m analysis.telemetry runs/*.csv --baseline runs/before.csv --jobs 8
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+def load_log(path, chunk_rows=65536):
+    """
+    Load a log into a dict of column name -> float64 array. CSV files are parsed
+    chunk by chunk straight into arrays, so multi-megabyte logs never exist as
+    Python row objects.
+    """
+    if path.endswith('.bin'):
+        from utils.data_logger import binary_log_to_numpy
+        records = binary_log_to_numpy(path)
+        return dict((name, records[name].astype(np.float64)) for name in records.dtype.names)
+    with open(path) as f:
+        names = f.readline().strip().split(',')
+        chunks = []
+        while True:
+            chunk = np.loadtxt(f, delimiter=',', max_rows=chunk_rows, ndmin=2, dtype=np.float64)
+            if not chunk.size:
+                break
+            chunks.append(chunk)
+            if len(chunk) < chunk_rows:
+                break
+    data = np.concatenate(chunks) if chunks else np.empty((0, len(names)))
+    return dict((name, data[:, i]) for i, name in enumerate(names))
+
+def interval_jitter(time_ms):
+    """Sample interval statistics of a ticks_ms time column."""
+    dt = np.diff(time_ms)
+    if not dt.size:
+        return {}
+    median = np.median(dt)
+    return {
+        'interval_ms': float(dt.mean()),
+        'jitter_ms': float(dt.std()),
+        'interval_p99_ms': float(np.percentile(dt, 99)),
+        'interval_max_ms': float(dt.max()),
+        'late_samples': int(np.count_nonzero(dt > 1.5 * median)),
+        'rate_hz': float(1000.0 / dt.mean()) if dt.mean() > 0 else 0.0,
+    }
+
+def wrap_events(raw_angle, counts=4096):
+    """Indices where a 12 bit encoder count wrapped around (jump of more than half a turn)."""
+    return np.flatnonzero(np.abs(np.diff(raw_angle)) > counts // 2) + 1
+
+def speed_spectrum(speed, time_ms):
+    """
+    One-sided power spectrum of the speed signal (mean removed, Hann window).
+    :return: (frequencies in Hz, power).
+    """
+    n = speed.size
+    if n < 4:
+        return np.zeros(0), np.zeros(0)
+    fs = 1000.0 / np.mean(np.diff(time_ms))
+    x = (speed - speed.mean()) * np.hanning(n)
+    power = np.abs(np.fft.rfft(x)) ** 2 / n
+    return np.fft.rfftfreq(n, 1.0 / fs), power
+
+def speed_noise(speed, window=5):
+    """RMS of the speed signal around its moving average (high-frequency noise)."""
+    if speed.size < window:
+        return 0.0
+    smooth = np.convolve(speed, np.ones(window) / window, mode='same')
+    core = slice(window // 2, speed.size - window // 2)  # skip the zero padded edges
+    return float(np.sqrt(np.mean((speed[core] - smooth[core]) ** 2)))
+
+def command_error(distance, command):
+    """Tracking error of measured distance against the commanded distance."""
+    error = distance - command
+    return {
+        'error_rms': float(np.sqrt(np.mean(error ** 2))),
+        'error_max': float(np.abs(error).max()),
+        'error_final': float(error[-1]),
+    }
+
+def summarize(path):
+    """All scalar metrics of one log."""
+    log = load_log(path)
+    summary = {'samples': int(next(iter(log.values())).size) if log else 0}
+    if 'time' in log:
+        summary.update(interval_jitter(log['time']))
+    if 'raw_angle' in log:
+        summary['wrap_events'] = int(wrap_events(log['raw_angle']).size)
+    if 'speed' in log and 'time' in log and log['speed'].size >= 4:
+        summary['speed_noise'] = speed_noise(log['speed'])
+        freqs, power = speed_spectrum(log['speed'], log['time'])
+        summary['speed_peak_hz'] = float(freqs[1:][np.argmax(power[1:])])
+    if 'distance' in log and 'command' in log:
+        summary.update(command_error(log['distance'], log['command']))
+    return summary
+
+def compare(paths, jobs=None):
+    """Summaries of many logs computed in a process pool, in input order."""
+    with ProcessPoolExecutor(jobs) as pool:
+        return list(pool.map(summarize, paths))
+
+# Metrics where a larger value is worse, for the before/after verdict
+WORSE_IF_HIGHER = ('interval_ms', 'jitter_ms', 'interval_p99_ms', 'interval_max_ms',
+                   'late_samples', 'speed_noise', 'error_rms', 'error_max')
+
+def report(paths, summaries, baseline=None):
+    """Text table of the summaries, with relative change against the baseline summary."""
+    keys = []
+    for summary in summaries:
+        keys += [k for k in summary if k not in keys]
+    width = max(12, max(len(p) for p in paths))
+    lines = ["%-*s " % (width, 'metric') + ' '.join('%14s' % k[:14] for k in keys)]
+    for path, summary in zip(paths, summaries):
+        lines.append("%-*s " % (width, path) + ' '.join(
+            '%14.4g' % summary[k] if k in summary else '%14s' % '-' for k in keys))
+        if baseline is not None:
+            deltas, verdict = [], []
+            for k in keys:
+                if k in summary and baseline.get(k):
+                    change = (summary[k] - baseline[k]) / abs(baseline[k]) * 100
+                    deltas.append('%+13.1f%%' % change)
+                    if k in WORSE_IF_HIGHER and abs(change) >= 5:
+                        verdict.append('%s %s' % (k, 'worse' if change > 0 else 'better'))
+                else:
+                    deltas.append('%14s' % '-')
+            lines.append("%-*s " % (width, '  vs baseline') + ' '.join(deltas))
+            if verdict:
+                lines.append("%-*s %s" % (width, '', ', '.join(verdict)))
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Control loop log analysis")
+    parser.add_argument('logs', nargs='+', help="log.csv / .bin files")
+    parser.add_argument('--baseline', help="log to compare every run against")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes")
+    args = parser.parse_args(argv)
+    paths = list(args.logs)
+    summaries = compare(paths + ([args.baseline] if args.baseline else []), args.jobs)
+    baseline = summaries.pop() if args.baseline else None
+    for line in report(paths, summaries, baseline):
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # Hardware configuration
 I2C_CONFIG = {
+    'id': 0,  # hardware controller; SoftI2C if the port has none (utils/i2c_bus.py)
     'scl': 40,
     'sda': 41,
     'freq': 400000
@@ -38,4 +39,29 @@ SENSOR_CONFIG = {
 
 TOF = {
     'address': 0x29,
+    # (name, XSHUT pin, address) in ToFArray.distances order, brought up one by one.
+    # The XSHUT lines are the IR_PINS header.
+    'sensors': (
+        ('left', 10, 0x2A),
+        ('front', 11, 0x2B),
+        ('right', 12, 0x2C),
+        ('diagonal', 13, 0x2D),
+    ),
+    'period_ms': 10,
+}
+
+# Cooperative scheduler task rates (Hz), see utils/scheduler.py
+SCHEDULER_TASKS = {
+    'imu': 1000,
+    'control': 1000,
+    'encoders': 500,
+    'tof': 50
+}
+
+# Control tick profiler, see utils/profiler.py: per stage histograms of
+# bucket_us wide buckets, the last one also counting longer durations
+PROFILE = {
+    'enabled': False,
+    'bucket_us': 10,
+    'buckets': 100
 }
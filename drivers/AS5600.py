@@ -1,11 +1,14 @@
-from machine import I2C, Pin
-from ustruct import unpack, pack
+try:
+    from ustruct import unpack, pack
+except ImportError:  # CPython host
+    from struct import unpack, pack
 from collections import namedtuple
 
 class AS5600:
     def __init__(self, i2c, address):
         self.i2c = i2c
         self.address = address
+        self._raw_buf = bytearray(2)
         
     @property
     def raw_angle(self):
@@ -15,6 +18,19 @@ class AS5600:
     def angle(self):
         return self._read_register(0x0E, 2)
     
+    def queue_raw_angle(self, bus, done=None):
+        """
+        Queue the raw angle read on a utils.i2c_bus.BusManager (instead of reading it
+        now); queued_raw_angle has the value after bus.run().
+        :param done: Called with the buffer once the read is done.
+        """
+        bus.read_into(self.address, 0x0C, self._raw_buf, done)
+
+    @property
+    def queued_raw_angle(self):
+        """Raw angle from the last queued read."""
+        return ((self._raw_buf[0] << 8) | self._raw_buf[1]) & 0x0FFF
+
     def _read_register(self, reg, length):
         data = self.i2c.readfrom_mem(self.address, reg, length)
         return unpack('>H', data)[0] & 0x0FFF
@@ -27,10 +27,11 @@ MicroPython I2C driver for MPU6500 6-axis motion tracking device
 __version__ = "0.4.0"
 
 # pylint: disable=import-error
-import ustruct
-import utime
-from machine import I2C, Pin
-from micropython import const
+try:
+    import ustruct
+except ImportError:  # CPython host, e.g. sim/ benchmarks on a mock I2C bus
+    import struct as ustruct
+from hal import sleep_ms, const
 # pylint: enable=import-error
 
 _GYRO_CONFIG = const(0x1b)
@@ -54,6 +55,19 @@ _WHO_AM_I = const(0x75)
 
 _PWR_MGMT_1 = const(0x6B)
 
+_SMPLRT_DIV = const(0x19)
+_CONFIG = const(0x1a)
+_FIFO_EN = const(0x23)
+_USER_CTRL = const(0x6a)
+_FIFO_COUNTH = const(0x72)
+_FIFO_R_W = const(0x74)
+
+_FIFO_EN_ALL = const(0xf8) # temperature, gyro x/y/z and accel, same order as the registers
+_USER_CTRL_FIFO_EN = const(0x40)
+_USER_CTRL_FIFO_RST = const(0x04)
+
+SAMPLE_SIZE = 14 # bytes of accel, temperature and gyro starting at _ACCEL_XOUT_H
+
 #_ACCEL_FS_MASK = const(0b00011000)
 ACCEL_FS_SEL_2G = const(0b00000000)
 ACCEL_FS_SEL_4G = const(0b00001000)
@@ -84,14 +98,26 @@ SF_M_S2 = 9.80665 # 1 g = 9.80665 m/s2 ie. standard gravity
 SF_DEG_S = 1
 SF_RAD_S = 0.017453292519943 # 1 deg/s is 0.017453292519943 rad/s
 
+def decode_sample(buf, offset, out):
+    """Unpack 7 big endian signed shorts from buf[offset:] into out without allocating."""
+    for i in range(7):
+        value = (buf[offset] << 8) | buf[offset + 1]
+        out[i] = value - 65536 if value & 0x8000 else value
+        offset += 2
+    return out
+
 class MPU6500:
     """Class which provides interface to MPU6500 6-axis motion tracking device."""
     def __init__(
         self, i2c, address=0x68,
         accel_fs=ACCEL_FS_SEL_2G, gyro_fs=GYRO_FS_SEL_250DPS,
         accel_sf=SF_M_S2, gyro_sf=SF_RAD_S,
-        gyro_offset=(0, 0, 0)
+        gyro_offset=(0, 0, 0), boot=True
     ):
+        """
+        :param boot: Reset and configure the chip now (sleeps 200 ms). With False the
+                     caller runs bring_up() itself, e.g. next to other devices'.
+        """
         self.i2c = i2c
         self.address = address
 
@@ -99,17 +125,35 @@ class MPU6500:
         if self.whoami not in [0x71, 0x70, 0x90]:
             raise RuntimeError("MPU6500 not found in I2C bus.")
 
-        # Reset, disable sleep mode
-        self._register_char(_PWR_MGMT_1, 0x80)
-        utime.sleep_ms(100)
-        self._register_char(_PWR_MGMT_1, 0x00)
-        utime.sleep_ms(100)
-
-        self._accel_so = self._accel_fs(accel_fs)
-        self._gyro_so = self._gyro_fs(gyro_fs)
+        self._accel_fs_sel = accel_fs
+        self._gyro_fs_sel = gyro_fs
+        self._accel_so = _ACCEL_SO_2G
+        self._gyro_so = _GYRO_SO_250DPS
         self._accel_sf = accel_sf
         self._gyro_sf = gyro_sf
         self._gyro_offset = gyro_offset
+        self._burst = bytearray(SAMPLE_SIZE)
+        self._raw = [0] * 7
+        # Accel, temperature and gyro blocks of _burst, for reads queued on a BusManager
+        view = memoryview(self._burst)
+        self._accel_part, self._temp_part, self._gyro_part = view[0:6], view[6:8], view[8:14]
+        if boot:
+            for ms in self.bring_up():
+                sleep_ms(ms)
+
+    def bring_up(self):
+        """
+        Reset, wake up and set the full scale ranges, as a generator that yields the
+        milliseconds to wait before its next step. The last wait lets the gyro
+        settle before the first sample is read.
+        """
+        # Reset, disable sleep mode
+        self._register_char(_PWR_MGMT_1, 0x80)
+        yield 100
+        self._register_char(_PWR_MGMT_1, 0x00)
+        self._accel_so = self._accel_fs(self._accel_fs_sel)
+        self._gyro_so = self._gyro_fs(self._gyro_fs_sel)
+        yield 100
 
     @property
     def acceleration(self):
@@ -156,13 +200,116 @@ class MPU6500:
         """ Value of the whoami register. """
         return self._register_char(_WHO_AM_I)
 
+    def read_raw_into(self, out, buf=None):
+        """
+        Read accel, temperature and gyro in one 14 byte I2C transaction.
+        Fills out[0:7] with the raw signed values ax, ay, az, temp, gx, gy, gz.
+        Does not allocate when out is preallocated (e.g. array('h', 7 * [0])).
+        """
+        if buf is None:
+            buf = self._burst
+        self.i2c.readfrom_mem_into(self.address, _ACCEL_XOUT_H, buf)
+        return decode_sample(buf, 0, out)
+
+    def read_into(self, out):
+        """
+        Burst read and scale into out[0:7]: acceleration (accel_sf units),
+        temperature (celcius) and gyro (gyro_sf units, offset corrected).
+        out should be a preallocated array('f', 7 * [0]).
+        """
+        raw = self.read_raw_into(self._raw)
+        self.scale_into(raw, out)
+        return out
+
+    def read_all(self):
+        """
+        Acceleration, temperature and gyro from one burst read as a tuple of
+        ((ax, ay, az), temperature, (gx, gy, gz)).
+        """
+        out = self.read_into([0.0] * 7)
+        return (out[0], out[1], out[2]), out[3], (out[4], out[5], out[6])
+
+    def queue_sample(self, bus, done=None):
+        """
+        Queue the 14 byte accel, temperature and gyro read on a utils.i2c_bus.BusManager
+        (instead of reading it now); sample_into() decodes it after bus.run().
+        :param done: Called with the buffer once the read is done.
+        """
+        bus.read_into(self.address, _ACCEL_XOUT_H, self._burst, done)
+
+    def queue_acceleration(self, bus, done=None):
+        """Queue only the accelerometer block of the sample; the bus merges it with queued gyro / temperature reads."""
+        bus.read_into(self.address, _ACCEL_XOUT_H, self._accel_part, done)
+
+    def queue_temperature(self, bus, done=None):
+        """Queue only the temperature block of the sample."""
+        bus.read_into(self.address, _TEMP_OUT_H, self._temp_part, done)
+
+    def queue_gyro(self, bus, done=None):
+        """Queue only the gyro block of the sample."""
+        bus.read_into(self.address, _GYRO_XOUT_H, self._gyro_part, done)
+
+    def sample_into(self, out):
+        """
+        Scale the sample read by the queue_* calls into out[0:7] like read_into(). Blocks
+        that were not queued keep their previous values.
+        """
+        self.scale_into(decode_sample(self._burst, 0, self._raw), out)
+        return out
+
+    def scale_into(self, raw, out):
+        """Convert one raw sample (as from read_raw_into / fifo_read_into) to units in out."""
+        so = self._accel_so
+        sf = self._accel_sf
+        out[0] = raw[0] / so * sf
+        out[1] = raw[1] / so * sf
+        out[2] = raw[2] / so * sf
+        out[3] = ((raw[3] - _TEMP_OFFSET) / _TEMP_SO) + _TEMP_OFFSET
+        so = self._gyro_so
+        sf = self._gyro_sf
+        ox, oy, oz = self._gyro_offset
+        out[4] = raw[4] / so * sf - ox
+        out[5] = raw[5] / so * sf - oy
+        out[6] = raw[6] / so * sf - oz
+        return out
+
+    def fifo_start(self, sample_div=0):
+        """
+        Start streaming accel, temperature and gyro samples into the device FIFO
+        at 1 kHz / (1 + sample_div). Use fifo_read_into() to fetch them in batches.
+        """
+        self._register_char(_CONFIG, 0x01) # DLPF on, 1 kHz internal sample rate
+        self._register_char(_SMPLRT_DIV, sample_div)
+        self._register_char(_USER_CTRL, _USER_CTRL_FIFO_RST)
+        self._register_char(_USER_CTRL, _USER_CTRL_FIFO_EN)
+        self._register_char(_FIFO_EN, _FIFO_EN_ALL)
+
+    def fifo_stop(self):
+        self._register_char(_FIFO_EN, 0x00)
+        self._register_char(_USER_CTRL, 0x00)
+
+    def fifo_count(self):
+        """Number of complete samples waiting in the FIFO."""
+        return (self._register_short(_FIFO_COUNTH) & 0x1fff) // SAMPLE_SIZE
+
+    def fifo_read_into(self, buf):
+        """
+        Read as many whole samples as are waiting and fit into buf (a bytearray,
+        ideally a multiple of 14 bytes) in one I2C transaction. Decode them with
+        decode_sample(buf, i * SAMPLE_SIZE, out). Returns the number of samples.
+        """
+        count = min(self.fifo_count(), len(buf) // SAMPLE_SIZE)
+        if count:
+            self.i2c.readfrom_mem_into(self.address, _FIFO_R_W, memoryview(buf)[:count * SAMPLE_SIZE])
+        return count
+
     def calibrate(self, count=256, delay=0):
         ox, oy, oz = (0.0, 0.0, 0.0)
         self._gyro_offset = (0.0, 0.0, 0.0)
         n = float(count)
 
         while count:
-            utime.sleep_ms(delay)
+            sleep_ms(delay)
             gx, gy, gz = self.gyro
             ox += gx
             oy += gy
@@ -189,7 +336,7 @@ class MPU6500:
             self.i2c.readfrom_mem_into(self.address, register, buf)
             return buf[0]
 
-        ustruct.pack_into("<b", buf, 0, value)
+        ustruct.pack_into("<B", buf, 0, value)
         return self.i2c.writeto_mem(self.address, register, buf)
 
     def _accel_fs(self, value):
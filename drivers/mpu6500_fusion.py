@@ -1,8 +1,10 @@
 import math
-import time
-from machine import I2C, Pin
+from hal import ticks_ms, ticks_diff, sleep_ms
 from drivers.mpu6500 import MPU6500
 
+# rad/s -> deg/s, applied as one multiply instead of math.degrees() per axis
+_DEG = 180.0 / math.pi
+
 class MPU6500Fusion:
     def __init__(self, i2c, address=0x68, accel_sf=9.80665, gyro_sf=0.0174533):
         """
@@ -19,7 +21,7 @@ class MPU6500Fusion:
         self.sample_delay = 10  # Delay between samples in milliseconds
         self.gyro_filter_alpha = 0.90  # Low-pass filter coefficient for gyroscope
         self.gx_prev, self.gy_prev, self.gz_prev = 0.0, 0.0, 0.0  # For low-pass filter
-        self.last_update_time = time.ticks_ms()  # Initialize last update time
+        self.last_update_time = ticks_ms()  # Initialize last update time
 
     def calibrate_gyro(self, samples=100, delay=10):
         """
@@ -34,7 +36,7 @@ class MPU6500Fusion:
             gx += self.sensor.gyro[0]
             gy += self.sensor.gyro[1]
             gz += self.sensor.gyro[2]
-            time.sleep_ms(delay)
+            sleep_ms(delay)
 
         self.gyro_offset = (gx / samples, gy / samples, gz / samples)
         print(f"Calibration complete. Offsets: {self.gyro_offset}")
@@ -52,6 +54,7 @@ class MPU6500Fusion:
     def update(self):
         """
         Update roll, pitch, and yaw using gyroscope data.
+        Gyro only, so yaw drifts; utils.heading_fusion fuses it with encoders and walls.
         """
         # Read gyroscope data
         gx, gy, gz = self.sensor.gyro
@@ -61,20 +64,17 @@ class MPU6500Fusion:
         gy -= self.gyro_offset[1]
         gz -= self.gyro_offset[2]
 
-        # Convert gyroscope data to degrees per second
-        gx = math.degrees(gx)
-        gy = math.degrees(gy)
-        gz = math.degrees(gz)
-
-        # Apply low-pass filter to gyroscope data
-        gx = self.low_pass_filter(gx, self.gx_prev, self.gyro_filter_alpha)
-        gy = self.low_pass_filter(gy, self.gy_prev, self.gyro_filter_alpha)
-        gz = self.low_pass_filter(gz, self.gz_prev, self.gyro_filter_alpha)
+        # Convert to degrees per second and low-pass filter (inlined low_pass_filter)
+        alpha = self.gyro_filter_alpha
+        k = (1 - alpha) * _DEG
+        gx = alpha * self.gx_prev + k * gx
+        gy = alpha * self.gy_prev + k * gy
+        gz = alpha * self.gz_prev + k * gz
         self.gx_prev, self.gy_prev, self.gz_prev = gx, gy, gz
 
         # Calculate time step (dt) in seconds
-        current_time = time.ticks_ms()
-        dt = time.ticks_diff(current_time, self.last_update_time) / 1000.0
+        current_time = ticks_ms()
+        dt = ticks_diff(current_time, self.last_update_time) / 1000.0
         self.last_update_time = current_time
 
         # Integrate gyroscope data to update angles
@@ -100,6 +100,7 @@ class MPU6500Fusion:
 
 # Example usage
 if __name__ == "__main__":
+    from hal import I2C, Pin
     i2c = I2C(0, scl=Pin(40), sda=Pin(41))  # Adjust pins for your hardware
     fusion = MPU6500Fusion(i2c)
 
@@ -114,4 +115,4 @@ if __name__ == "__main__":
         fusion.update()
         roll, pitch, yaw = fusion.get_angles()
         print(f"Roll: {roll:.2f}°, Pitch: {pitch:.2f}°, Yaw: {yaw:.2f}°")
-        time.sleep_ms(10)  # Adjust the delay for your desired update rate
\ No newline at end of file
+        sleep_ms(10)  # Adjust the delay for your desired update rate
\ No newline at end of file
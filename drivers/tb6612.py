@@ -1,4 +1,4 @@
-from machine import Pin, PWM
+from hal import Pin, PWM
 
 class MotorDriver:
     def __init__(self, ain1, ain2, pwma, bin1, bin2, pwmb, stby):
@@ -0,0 +1,169 @@
+from array import array
+from hal import Pin, ticks_ms, ticks_diff, ticks_add, sleep_ms
+from drivers.vl53I0x import (Sensor, DEFAULT_ADDRESS, RESULT_INTERRUPT_STATUS_GPIO, RESULT_RANGE_VAL,
+                              SYSTEM_INTERRUPT_CLEAR, RANGE_NEW_SAMPLE_READY)
+
+_CLEAR_ALL = b'\x07'
+
+class ToFArray:
+    """
+    Several ToF sensors on one I2C bus. begin() holds every sensor in shutdown
+    through its XSHUT pin and releases them one at a time to move each off the
+    shared default address. Afterwards all sensors range continuously, staggered
+    over the period, and update() only talks to a sensor when its next sample is
+    due, so conversions overlap with reads of the others and the bus is not
+    spent on empty polls.
+    """
+
+    def __init__(self, i2c, sensors, period_ms=10, clock=ticks_ms, sleep=sleep_ms):
+        """
+        :param i2c: Shared I2C bus.
+        :param sensors: Sequence of (name, xshut, address); xshut is a pin number or a Pin-like object.
+        :param period_ms: Continuous ranging period of every sensor (10 ms steps).
+        :param clock: Millisecond tick source.
+        :param sleep: Millisecond sleep, used during bring-up only.
+        """
+        self.i2c = i2c
+        self.names = tuple(name for name, _, _ in sensors)
+        self.addresses = tuple(address for _, _, address in sensors)
+        self.pins = [self._pin(xshut) for _, xshut, _ in sensors]
+        self.period_ms = period_ms
+        self.clock = clock
+        self.sleep = sleep
+        self.sensors = []
+        n = len(self.names)
+        # Latest reading of each sensor, in the order of `sensors`
+        self.distances = array('H', [0] * n)
+        self.timestamps = array('L', [0] * n)
+        self.samples = array('L', [0] * n)
+        self._due = array('l', [0] * n)
+        self._next = 0
+        self._queue = None     # bus of queue_update() and its per sensor callbacks
+        self._busy = bytearray(n)
+
+    @staticmethod
+    def _pin(xshut):
+        if isinstance(xshut, int):
+            return Pin(xshut, Pin.OUT)
+        return xshut
+
+    def index(self, name):
+        """Position of a sensor in distances / timestamps."""
+        return self.names.index(name)
+
+    def begin(self):
+        """Bring the sensors up one by one and give each its own address."""
+        for ms in self._begin():
+            self.sleep(ms)
+        return self
+
+    def start(self):
+        """Start continuous ranging, spreading the sensors evenly over the period."""
+        for ms in self._start():
+            self.sleep(ms)
+
+    def bring_up(self):
+        """
+        begin() and start() as a generator that yields the milliseconds to wait
+        between steps instead of sleeping, so other devices can be brought up meanwhile.
+        """
+        for ms in self._begin():
+            yield ms
+        for ms in self._start():
+            yield ms
+
+    def _begin(self):
+        for pin in self.pins:
+            pin.value(0)
+        yield 1
+        self.sensors = []
+        for pin, address in zip(self.pins, self.addresses):
+            pin.value(1)
+            yield 1  # boot time after XSHUT release
+            sensor = Sensor(self.i2c, DEFAULT_ADDRESS)
+            if address != DEFAULT_ADDRESS:
+                sensor.address(address)
+            self.sensors.append(sensor)
+
+    def _start(self):
+        step = self.period_ms // len(self.sensors)
+        for i, sensor in enumerate(self.sensors):
+            if i:
+                yield step
+            sensor.start(continuous=True, period_ms=self.period_ms)
+            self._due[i] = ticks_add(self.clock(), self.period_ms - 1)
+
+    def stop(self):
+        for sensor in self.sensors:
+            sensor.stop()
+
+    def update(self):
+        """
+        Read every sensor whose sample is due; never blocks.
+        :return: Number of new readings.
+        """
+        now = self.clock()
+        n = len(self.sensors)
+        new = 0
+        for k in range(n):
+            i = (self._next + k) % n
+            if ticks_diff(now, self._due[i]) < 0:
+                continue
+            value = self.sensors[i].read()
+            if value is None:
+                self._due[i] = ticks_add(now, 1)  # not converted yet, look again next ms
+                continue
+            self.distances[i] = value
+            self.timestamps[i] = now
+            self.samples[i] += 1
+            self._due[i] = ticks_add(now, self.period_ms - 1)
+            new += 1
+        self._next = (self._next + 1) % n  # round-robin who goes first
+        return new
+
+    def queue_update(self, bus):
+        """
+        update() through the transaction queue of a utils.i2c_bus.BusManager: queues
+        the status read of every due sensor that has nothing in flight. The range read
+        and the interrupt clear are queued by the completion callbacks, and readings
+        land in distances when bus.run() gets to them.
+        :return: Number of status reads queued.
+        """
+        if self._queue is None or self._queue[0] is not bus:
+            self._queue = (bus, [self._callbacks(bus, i) for i in range(len(self.sensors))])
+        callbacks = self._queue[1]
+        now = self.clock()
+        queued = 0
+        for i in range(len(self.sensors)):
+            if self._busy[i] or ticks_diff(now, self._due[i]) < 0:
+                continue
+            self._busy[i] = 1
+            status, on_status = callbacks[i][0], callbacks[i][1]
+            bus.read_into(self.addresses[i], RESULT_INTERRUPT_STATUS_GPIO, status, on_status, addrsize=16)
+            queued += 1
+        return queued
+
+    def _callbacks(self, bus, i):
+        # Buffers and completion callbacks of sensor i, made once
+        address = self.addresses[i]
+        status, value = bytearray(1), bytearray(1)
+
+        def on_status(buf):
+            if buf[0] & 0x07 != RANGE_NEW_SAMPLE_READY:
+                self._due[i] = ticks_add(self.clock(), 1)  # not converted yet, look again next ms
+                self._busy[i] = 0
+                return
+            bus.read_into(address, RESULT_RANGE_VAL, value, on_range, addrsize=16)
+
+        def on_range(buf):
+            now = self.clock()
+            self.distances[i] = buf[0]
+            self.timestamps[i] = now
+            self.samples[i] += 1
+            self._due[i] = ticks_add(now, self.period_ms - 1)
+            bus.write(address, SYSTEM_INTERRUPT_CLEAR, _CLEAR_ALL, on_clear, addrsize=16)
+
+        def on_clear(buf):
+            self._busy[i] = 0
+
+        return status, on_status
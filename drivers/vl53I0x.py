@@ -1,17 +1,25 @@
-from micropython import const
-import ustruct
-import utime
-import time
-from machine import SoftI2C, Pin, I2C
-# from machine import Timer
+from hal import sleep_ms as _sleep_ms
 
 
 # i2c = I2C(0, I2C.MASTER, baudrate=100000, pins=('P8', 'P9'))
 
+SYSRANGE_START = 0x0018
+SYSRANGE_INTERMEASUREMENT_PERIOD = 0x001B
+SYSTEM_INTERRUPT_CLEAR = 0x0015
+RESULT_INTERRUPT_STATUS_GPIO = 0x004F
+RESULT_RANGE_VAL = 0x0062
+I2C_SLAVE_DEVICE_ADDRESS = 0x0212
+
+DEFAULT_ADDRESS = 0x29
+
+RANGE_NEW_SAMPLE_READY = 0x04
+
 class Sensor:
-    def __init__(self, i2c, address=0x29):
+    def __init__(self, i2c, address=DEFAULT_ADDRESS):
         self.i2c = i2c
         self._address = address
+        self._buf = bytearray(1)
+        self.continuous = False
         self.default_settings()
         self.init()
 
@@ -20,13 +28,10 @@ class Sensor:
         return self.i2c.writeto_mem(self._address, register, bytearray([regValue]), addrsize=16), 'big'
 
     def myRead16(self, register):
-        """read 1 bit from 16 byte register"""
+        """read 1 byte from 16 bit register"""
         # i2c.readfrom_mem(0x29, 0x0016, 1, addrsize=16)
-        value = int.from_bytes(
-            self.i2c.readfrom_mem(self._address, register, 1, addrsize=16),
-            'big'
-        )
-        return value & 0xFFFF
+        self.i2c.readfrom_mem_into(self._address, register, self._buf, addrsize=16)
+        return self._buf[0]
 
     def init(self):
         if self.myRead16(0x0016) != 1:
@@ -110,20 +115,67 @@ class Sensor:
             return self._address
         if not 8 <= address <= 127:
             raise ValueError("Wrong address")
-        self._set_reg8(0x0212, address)
+        self.myWrite16(I2C_SLAVE_DEVICE_ADDRESS, address)
         self._address = address
         
 
-    def range(self):
-        """Measure the distance in millimeters. Takes 0.01s."""
-        self.myWrite16(0x0018, 0x01)  # Sysrange start
-        time.sleep(0.01)
-        return self.myRead16(0x0062)  # Result range valueimport ustruct
-    
-    
-    
+    def start(self, continuous=False, period_ms=None):
+        """
+        Start ranging and return immediately; use poll() / read() for the result.
+        :param continuous: Run back-to-back measurements instead of a single shot.
+        :param period_ms: Inter-measurement period in continuous mode (10 ms steps, 10..2550).
+        """
+        if continuous:
+            if period_ms is not None:
+                self.myWrite16(SYSRANGE_INTERMEASUREMENT_PERIOD, max(0, min(254, period_ms // 10 - 1)))
+            self.myWrite16(SYSRANGE_START, 0x03)  # start, continuous mode
+        else:
+            self.myWrite16(SYSRANGE_START, 0x01)  # start, single shot
+        self.continuous = continuous
+
+    def stop(self):
+        """Stop continuous ranging (the running measurement still completes)."""
+        if self.continuous:
+            self.myWrite16(SYSRANGE_START, 0x01)  # start bit toggles continuous mode off
+            self.continuous = False
+
+    def poll(self):
+        """True when a new range sample is ready ("New Sample Ready" interrupt status)."""
+        return self.myRead16(RESULT_INTERRUPT_STATUS_GPIO) & 0x07 == RANGE_NEW_SAMPLE_READY
+
+    def read(self):
+        """Latest range in millimeters and clear the interrupt, or None if no new sample is ready."""
+        if not self.poll():
+            return None
+        value = self.myRead16(RESULT_RANGE_VAL)
+        self.myWrite16(SYSTEM_INTERRUPT_CLEAR, 0x07)
+        return value
+
+    def range(self, timeout_ms=100):
+        """Measure the distance in millimeters (single shot, waits for the sample)."""
+        self.start()
+        for _ in range(timeout_ms):
+            value = self.read()
+            if value is not None:
+                return value
+            _sleep_ms(1)
+        raise OSError("range timeout")
+
+def start_staggered(sensors, period_ms, sleep_ms=_sleep_ms):
+    """
+    Start several sensors in continuous mode with their measurements spread
+    evenly over the period, so their results are not all ready (and read) at once.
+    """
+    step = period_ms // len(sensors)
+    for n, sensor in enumerate(sensors):
+        if n:
+            sleep_ms(step)
+        sensor.start(continuous=True, period_ms=period_ms)
+
+
 # Example usage
 if __name__ == "__main__":
+    from hal import SoftI2C, Pin
     i2c = SoftI2C(sda=Pin(41), scl=Pin(40), freq=100000)
 
     # Create a VL53L0X sensor instance
@@ -133,12 +185,14 @@ if __name__ == "__main__":
 
     # Start continuous ranging mode
     tof.init()
- 
+    tof.start(continuous=True, period_ms=50)
+
     while True:
-        # Read distance (in millimeters)
-        distance = tof.range()
-        print("Distance: {} mm".format(distance))
-        time.sleep(0.5)
+        # Read distance (in millimeters) when a new sample is ready
+        distance = tof.read()
+        if distance is not None:
+            print("Distance: {} mm".format(distance))
+        _sleep_ms(10)
 
     # To stop the sensor, you can call:
     # tof.stop()
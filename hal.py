@@ -0,0 +1,16 @@
+# hal.py
+# Hardware abstraction: drivers and application code import Pin, PWM, I2C,
+# SoftI2C, Timer and the ticks/sleep functions from here instead of `machine`
+# and `time`. On the board this is MicroPython itself; on a CPython host it is
+# sim/host.py, with simulated buses and devices and a virtual clock
+# (hal.clock / hal.board), so the same code runs faster than real time.
+try:
+    from machine import Pin, PWM, I2C, SoftI2C, Timer
+    from time import ticks_ms, ticks_us, ticks_diff, ticks_add, sleep_ms, sleep_us
+    from micropython import const
+    HOST = False
+    clock = board = None
+except ImportError:  # CPython host
+    from sim.host import Pin, PWM, I2C, SoftI2C, Timer, clock, board
+    from sim.host import ticks_ms, ticks_us, ticks_diff, ticks_add, sleep_ms, sleep_us, const
+    HOST = True
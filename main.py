@@ -1,33 +1,36 @@
-import time
-import math
-import micropython
-from machine import SoftI2C, Pin, Timer, I2C
-from drivers.AS5600 import AS5600
-from drivers.tb6612 import MotorDriver
-from utils.postion_calculator import PositionTracker
-from utils.data_logger import DataLogger
-import config 
-from drivers.mpu6500 import MPU6500
-from motor_controll import MotorController
+from hal import Timer, HOST, board, clock
+from utils.startup import Startup
+import config
+
+# Stamp the start of main first: everything before it is firmware start-up and imports
+startup = Startup()
+
+# On a CPython host hal is the simulator: fit the board with the devices from
+# config.py and put the physics model of the mouse behind them
+if HOST:
+    from sim.maze_files import random_maze
+    from sim.robot import VirtualRobot
+    robot = VirtualRobot(random_maze(16, seed=0))
+    robot.attach(board.populate())
+
+primitives = None
+
+def load_primitives():
+    global primitives
+    from motion_primitives import PrimitiveLibrary
+    try:
+        primitives = PrimitiveLibrary.load()
+    except OSError:
+        print("No motion primitive library (sim/gen_primitives.py)")
+
+# Bring up one bus for all I2C devices, the IMU and the ToF array together
+startup.bring_up(extra=(('primitives loaded', load_primitives),))
+print("I2C devices %s:" % ('scanned' if startup.scanned else 'from the saved map'),
+      [hex(device) for device in startup.devices])
+for line in startup.report():
+    print(line)
+print("Ready to run %.0f ms after reset" % startup.ready_ms)
 
-
-# Initialize hardware
-
-i2c = SoftI2C(scl=Pin(config.I2C_CONFIG['scl']), 
-              sda=Pin(config.I2C_CONFIG['sda']))
-
-from machine import SoftI2C, Pin
-
-i2c = SoftI2C(scl=Pin(config.I2C_CONFIG['scl']), sda=Pin(config.I2C_CONFIG['sda']))
-
-print("Scanning I2C bus...")
-devices = i2c.scan()
-
-if len(devices) == 0:
-    print("No I2C devices found!")
-else:
-    print("I2C devices found:", [hex(device) for device in devices])
-    
 """
 sensor = AS5600(i2c, config.SENSOR_CONFIG['address'])
 
@@ -37,13 +40,7 @@ logger = DataLogger()
 
 """
 
-
-
-# Initialize I2C
-i2c = SoftI2C(scl=Pin(config.I2C_CONFIG['scl']), sda=Pin(config.I2C_CONFIG['sda']))
-
-# Initialize the MPU6500 sensor
-sensor = MPU6500(i2c)
+sensor = startup.imu
 
 def read_sensor(timer):
     print("Acceleration:", sensor.acceleration)
@@ -56,6 +53,12 @@ print("MPU6500 id: " + hex(sensor.whoami))
 timer_0 = Timer(0)
 timer_0.init(period=1000, mode=Timer.PERIODIC, callback=read_sensor)
 
+if HOST:
+    clock.advance(3000000)  # three virtual seconds, the timer fires as they pass
+    timer_0.deinit()
+    for line in startup.bus.report(clock.now_us):
+        print(line)
+
 
 """# Calibration
 if sensor.scan():
@@ -69,18 +72,18 @@ def read_sensor():
     return raw, angle
 
 def control_loop():
-    last_time = time.ticks_ms()
+    last_time = ticks_ms()
     
     while True:
         raw, angle = read_sensor()
-        delta_time = (time.ticks_ms() - last_time) / 1000
-        last_time = time.ticks_ms()
+        delta_time = (ticks_ms() - last_time) / 1000
+        last_time = ticks_ms()
         
-        speed, distance = tracker.update(angle, delta_time)
+        speed, distance = tracker.update(raw, delta_time)
     
         # Log data for plotting
         logger.log(
-            time=time.ticks_ms(),
+            time=ticks_ms(),
             raw_angle=raw,
             angle=angle,
             speed=speed,
@@ -95,7 +98,7 @@ def control_loop():
         else:
             motor.stop()
         
-        time.sleep_ms(10)
+        sleep_ms(10)
 
 # Run main loop
 try:
@@ -108,6 +111,9 @@ except KeyboardInterrupt:
 """
 # Independent testing of MotorController module
 if __name__ == "__main__":
+    from drivers.tb6612 import MotorDriver
+    from motor_controll import MotorController
+
     # For testing, use a dummy MotorDriver if actual hardware is not available.
     class DummyMotorDriver:
         def set_motor(self, side, speed):
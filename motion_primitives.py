@@ -0,0 +1,281 @@
+# motion_primitives.py
+# Precomputed motion primitives for the fast run. sim/gen_primitives.py builds a
+# library on the host for a few speed levels. Each level has one acceleration
+# ramp, and every straight and diagonal run is cut from it. Each smooth turn
+# (45, 90, 135, 180 degrees and the diagonal-to-diagonal 90) has its own
+# velocity table. The robot loads the file once at boot. compile_plan() turns
+# an algorithm.planner plan into primitives, and during the run a control tick
+# only indexes into the tables. The profiles share MotionProfile's duration /
+# sample(t) interface, so VelocityController tracks them unchanged.
+#
+# Turns use the corner model: a turn at a corner point of the plan starts
+# `tangent` mm before the corner and ends `tangent` mm after it, so the runs on
+# either side just get shorter. The 90 degree turn has a tangent of exactly half
+# a cell (edge to edge of the corner cell). That lets two 90s one cell apart be
+# replaced by the 180. All turns of a level run at the same speed, v_turn.
+import math
+from array import array
+from velocity_control import MotionProfile
+try:
+    import ustruct as struct
+except ImportError:  # CPython host
+    import struct
+
+# File: MAGIC, header, then per level the level record, the ramp (positions in um
+# as 'i', velocities in mm/s as 'H'), the number of turns and per turn the turn
+# record, the heading (urad, 'i') and the yaw rate (mrad/s, 'h') for every tick.
+# Arrays are little endian.
+MAGIC = b'MPL1'
+_HEADER = '<HHB'      # control rate (Hz), cell pitch (mm), levels
+_LEVEL = '<HHHHH'     # v_max, accel, v_diag, v_turn (mm/s, mm/s^2), ramp ticks
+_TURN = '<BllH'       # kind, lead straight (um), tangent (um), curve ticks
+
+# Turn kinds
+T45 = 0
+T90 = 1
+T135 = 2
+T180 = 3
+V90 = 4   # diagonal to diagonal
+TURN_ANGLES = (45, 90, 135, 180, 90)
+
+_STILL = MotionProfile(0, 1, 1)
+
+_ITEM_SIZE = {'i': 4, 'H': 2, 'h': 2}
+
+def _zeros(typecode, n):
+    # From raw bytes, the same on MicroPython and CPython
+    return array(typecode, bytearray(_ITEM_SIZE[typecode] * n))
+
+class Turn:
+    def __init__(self, kind, lead_um, tangent_um, heading, rate):
+        """
+        :param lead_um: Straight part before and after the curve.
+        :param tangent_um: Distance from the turn start (and end) to the corner point.
+        :param heading: array('i') of the heading in urad at every tick of the curve.
+        :param rate: array('h') of the yaw rate in mrad/s at every tick of the curve.
+        """
+        self.kind = kind
+        self.lead_um, self.tangent_um = lead_um, tangent_um
+        self.tangent = tangent_um / 1000.0
+        self.heading, self.rate = heading, rate
+
+class Level:
+    def __init__(self, v_max, accel, v_diag, v_turn, ramp_pos, ramp_vel, turns, rate_hz):
+        """
+        :param ramp_pos, ramp_vel: Position (um) and velocity (mm/s) k ticks into a full
+                                   acceleration from standstill to v_max.
+        :param turns: Turn objects, indexed by kind.
+        """
+        self.v_max, self.accel, self.v_diag, self.v_turn = v_max, accel, v_diag, v_turn
+        self.ramp_pos, self.ramp_vel = ramp_pos, ramp_vel
+        self.turns = turns
+        self.rate_hz = rate_hz
+
+    def index(self, v):
+        """Ramp tick at which the velocity reaches v (the ramp is linear)."""
+        return min(len(self.ramp_vel) - 1, int(v * self.rate_hz / self.accel + 0.5))
+
+class RampProfile:
+    """
+    Straight or diagonal run cut from a level's ramp: accelerate from v_in, cruise,
+    decelerate to v_out. The peak is the highest ramp tick whose way up and down both
+    fit in the distance, found by a binary search when the run is compiled.
+    """
+
+    def __init__(self, level, distance, v_in, v_out, v_cap):
+        pos = level.ramp_pos
+        self.pos, self.vel = pos, level.ramp_vel
+        self.rate_hz = level.rate_hz
+        self.accel = level.accel
+        self.distance = distance
+        i, o = level.index(v_in), level.index(v_out)
+        d_um = int(distance * 1000)
+        lo = hi = max(i, o)
+        if 2 * pos[lo] - pos[i] - pos[o] <= d_um:
+            hi = max(lo, level.index(v_cap))
+        while lo < hi:
+            mid = (lo + hi + 1) >> 1
+            if 2 * pos[mid] - pos[i] - pos[o] <= d_um:
+                lo = mid
+            else:
+                hi = mid - 1
+        p = lo
+        self.i, self.p, self.o = i, p, o
+        self.v_peak = self.vel[p]
+        self.v_out = self.vel[o]
+        self.p1 = (pos[p] - pos[i]) / 1000.0
+        cruise = max(0.0, distance - (2 * pos[p] - pos[i] - pos[o]) / 1000.0)
+        self.p2 = self.p1 + cruise
+        self.t1 = (p - i) / self.rate_hz
+        self.t2 = self.t1 + (cruise / self.v_peak if self.v_peak else 0.0)
+        self.duration = self.t2 + (p - o) / self.rate_hz
+
+    def sample(self, t):
+        """(position, velocity, acceleration) at time t."""
+        if t <= 0:
+            return 0.0, self.vel[self.i], 0.0
+        if t >= self.duration:
+            return self.distance, self.v_out, 0.0
+        if t < self.t1:
+            k = self.i + int(t * self.rate_hz)
+            return (self.pos[k] - self.pos[self.i]) * 0.001, self.vel[k], self.accel
+        if t < self.t2:
+            return self.p1 + self.v_peak * (t - self.t1), self.v_peak, 0.0
+        k = self.p - int((t - self.t2) * self.rate_hz)
+        return self.p2 + (self.pos[self.p] - self.pos[k]) * 0.001, self.vel[k], -self.accel
+
+class ConstantSpeed:
+    """Linear channel of a turn: constant speed for the whole primitive."""
+
+    def __init__(self, v, duration):
+        self.v, self.duration = v, duration
+        self.distance = v * duration
+
+    def sample(self, t):
+        if t <= 0:
+            return 0.0, self.v, 0.0
+        if t >= self.duration:
+            return self.distance, self.v, 0.0
+        return self.v * t, self.v, 0.0
+
+class TurnProfile:
+    """Angular channel of a smooth turn (rad, CCW positive): lead, table curve, lead."""
+
+    def __init__(self, turn, sign, v, rate_hz):
+        self.heading, self.rate = turn.heading, turn.rate
+        self.sign = sign
+        self.rate_hz = rate_hz
+        n = len(turn.heading)
+        self.total = sign * math.radians(TURN_ANGLES[turn.kind])
+        self.t0 = turn.lead_um / 1000.0 / v
+        self.t1 = self.t0 + n / rate_hz
+        self.duration = self.t1 + self.t0
+
+    def sample(self, t):
+        if t < self.t0:
+            return 0.0, 0.0, 0.0
+        if t >= self.t1:
+            return self.total, 0.0, 0.0
+        k = int((t - self.t0) * self.rate_hz)
+        rate = self.rate
+        w = rate[k]
+        alpha = ((rate[k + 1] if k + 1 < len(rate) else 0) - w) * self.rate_hz
+        s = self.sign
+        return s * self.heading[k] * 1e-6, s * w * 1e-3, s * alpha * 1e-3
+
+class PrimitiveLibrary:
+    def __init__(self, rate_hz, cell_mm, levels):
+        """
+        :param rate_hz: Control rate the tables are sampled at.
+        :param cell_mm: Cell pitch the turns were built for.
+        :param levels: Level objects, slowest first.
+        """
+        self.rate_hz = rate_hz
+        self.cell_mm = cell_mm
+        self.levels = levels
+
+    @classmethod
+    def load(cls, filename='primitives.mpl'):
+        """Read a library written by save() (tables go straight into preallocated arrays)."""
+        with open(filename, 'rb') as f:
+            if f.read(4) != MAGIC:
+                raise ValueError("not a motion primitive library")
+            rate_hz, cell_mm, count = struct.unpack(_HEADER, f.read(struct.calcsize(_HEADER)))
+            levels = []
+            for _ in range(count):
+                v_max, accel, v_diag, v_turn, n = struct.unpack(_LEVEL, f.read(struct.calcsize(_LEVEL)))
+                pos, vel = _zeros('i', n), _zeros('H', n)
+                f.readinto(pos)
+                f.readinto(vel)
+                turns = []
+                for _ in range(f.read(1)[0]):
+                    kind, lead, tangent, m = struct.unpack(_TURN, f.read(struct.calcsize(_TURN)))
+                    heading, rate = _zeros('i', m), _zeros('h', m)
+                    f.readinto(heading)
+                    f.readinto(rate)
+                    turns.append(Turn(kind, lead, tangent, heading, rate))
+                levels.append(Level(v_max, accel, v_diag, v_turn, pos, vel, turns, rate_hz))
+        return cls(rate_hz, cell_mm, levels)
+
+    def save(self, filename='primitives.mpl'):
+        """Write the library (host side; the arrays must already be little endian)."""
+        with open(filename, 'wb') as f:
+            f.write(MAGIC + struct.pack(_HEADER, self.rate_hz, self.cell_mm, len(self.levels)))
+            for level in self.levels:
+                f.write(struct.pack(_LEVEL, level.v_max, level.accel, level.v_diag, level.v_turn,
+                                    len(level.ramp_pos)))
+                f.write(level.ramp_pos)
+                f.write(level.ramp_vel)
+                f.write(bytes((len(level.turns),)))
+                for turn in level.turns:
+                    f.write(struct.pack(_TURN, turn.kind, turn.lead_um, turn.tangent_um, len(turn.heading)))
+                    f.write(turn.heading)
+                    f.write(turn.rate)
+
+    def compile_plan(self, plan, level=0):
+        """
+        Turn a plan from algorithm.planner into primitives, from standstill to standstill.
+        Turns before the first run are made in place, and a turn after the last run is
+        left out (the run is over at the goal).
+        :param plan: List of (action, value), e.g. [('straight', 3), ('right', 90), ...].
+        :param level: Speed level index.
+        :return: List of (linear, angular) profile pairs for VelocityController.start_profiles().
+        """
+        lv = self.levels[level]
+        cell = self.cell_mm
+        diag_step = cell * math.sqrt(0.5)
+        # Runs between corners and the signed corner angles (degrees, left positive)
+        runs, diagonal, corners = [0.0], [False], []
+        pending = spin = 0
+        for action, value in plan:
+            if action in ('left', 'right'):
+                pending += value if action == 'left' else -value
+                continue
+            if pending:
+                if runs[-1] == 0 and not corners:
+                    spin += pending
+                else:
+                    corners.append(pending)
+                    runs.append(0.0)
+                    diagonal.append(False)
+                pending = 0
+            runs[-1] += value * (diag_step if action == 'diagonal' else cell)
+            diagonal[-1] = action == 'diagonal'
+
+        # Corner kinds; two 90s the same way with one cell between them become a 180
+        kinds, signs = [], []
+        k = 0
+        while k < len(corners):
+            angle = corners[k]
+            if (abs(angle) == 90 and k + 1 < len(corners) and corners[k + 1] == angle
+                    and not diagonal[k + 1] and runs[k + 1] == cell):
+                kinds.append(T180)
+                del runs[k + 1], diagonal[k + 1], corners[k + 1]
+            elif abs(angle) == 45:
+                kinds.append(T45)
+            elif abs(angle) == 90:
+                kinds.append(V90 if diagonal[k] else T90)
+            elif abs(angle) == 135:
+                kinds.append(T135)
+            else:
+                raise ValueError("no primitive for a %d degree corner" % angle)
+            signs.append(1 if angle > 0 else -1)
+            k += 1
+
+        primitives = []
+        if spin:
+            primitives.append((_STILL, MotionProfile(math.radians(spin), 10.0, 100.0)))
+        v_in, tangent_in = 0, 0.0
+        for k, run in enumerate(runs):
+            turn = lv.turns[kinds[k]] if k < len(kinds) else None
+            tangent_out = turn.tangent if turn else 0.0
+            v_out = lv.v_turn if turn else 0
+            length = max(0.0, run - tangent_in - tangent_out)
+            if length > 0 or v_in != v_out:
+                cap = lv.v_diag if diagonal[k] else lv.v_max
+                primitives.append((RampProfile(lv, length, v_in, v_out, cap), _STILL))
+            if turn:
+                angular = TurnProfile(turn, signs[k], lv.v_turn, self.rate_hz)
+                primitives.append((ConstantSpeed(lv.v_turn, angular.duration), angular))
+            v_in, tangent_in = v_out, tangent_out
+        return primitives
@@ -1,7 +1,11 @@
 # motor_control.py
 import time
-from drivers.tb6612 import MotorDriver
-import config
+from hal import ticks_ms, ticks_diff, ticks_add, sleep_ms, HOST
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
 class MotorController:
     def __init__(self, motor_driver, mm_per_sec=700.0, turn_90_time=0.5, default_speed=60000):
         """
@@ -16,6 +20,22 @@ class MotorController:
         self.turn_90_time = turn_90_time
         self.default_speed = default_speed
 
+    def forward_duration(self, distance_mm):
+        """Time (seconds) needed to drive distance_mm with the open-loop calibration."""
+        # Calculate how long to run the motors to cover the distance (if using time-based control)
+        if self.mm_per_sec > 0:
+            return abs(distance_mm) / self.mm_per_sec  # time in seconds
+        return 0  # if mm_per_sec is zero (no calibration), we would rely on encoder feedback instead
+
+    def turn_duration(self, angle_deg):
+        """Time (seconds) needed to turn angle_deg in place."""
+        return (abs(angle_deg) / 90.0) * self.turn_90_time
+
+    def drive(self, left, right):
+        """Set both motors without waiting (used by MotionExecutor)."""
+        self.driver.set_motor("left", left)
+        self.driver.set_motor("right", right)
+
     def move_forward(self, distance_mm, speed=None):
         """
         Move the robot straight for the given distance in millimeters.
@@ -23,22 +43,14 @@ class MotorController:
         """
         if speed is None:
             speed = self.default_speed
-        # Calculate how long to run the motors to cover the distance (if using time-based control)
-        if self.mm_per_sec > 0:
-            duration = abs(distance_mm) / self.mm_per_sec  # time in seconds
-        else:
-            duration = 0  # if mm_per_sec is zero (no calibration), we would rely on encoder feedback instead
+        duration = self.forward_duration(distance_mm)
         # Set motor directions based on sign of distance
         if distance_mm >= 0:
-            # forward
-            self.driver.set_motor("left", speed)
-            self.driver.set_motor("right", speed)
+            self.drive(speed, speed)  # forward
         else:
-            # backward
-            self.driver.set_motor("left", -speed)
-            self.driver.set_motor("right", -speed)
+            self.drive(-speed, -speed)  # backward
         # Run for the calculated duration (blocking)
-        time.sleep(duration)
+        sleep_ms(int(duration * 1000))
         # Stop motors after moving
         self.driver.stop()
 
@@ -49,11 +61,8 @@ class MotorController:
         if speed is None:
             speed = self.default_speed
         # Left turn: left motor backward, right motor forward
-        self.driver.set_motor("left", -speed)
-        self.driver.set_motor("right", speed)
-        # Calculate turn duration proportionally to angle
-        duration = (angle_deg / 90.0) * self.turn_90_time
-        time.sleep(duration)
+        self.drive(-speed, speed)
+        sleep_ms(int(self.turn_duration(angle_deg) * 1000))
         self.driver.stop()
 
     def turn_right(self, angle_deg=90, speed=None):
@@ -63,24 +72,153 @@ class MotorController:
         if speed is None:
             speed = self.default_speed
         # Right turn: left motor forward, right motor backward
-        self.driver.set_motor("left", speed)
-        self.driver.set_motor("right", -speed)
-        duration = (angle_deg / 90.0) * self.turn_90_time
-        time.sleep(duration)
+        self.drive(speed, -speed)
+        sleep_ms(int(self.turn_duration(angle_deg) * 1000))
         self.driver.stop()
 
-# Independent testing of MotorController module
-if __name__ == "__main__":
-    # For testing, use a dummy MotorDriver if actual hardware is not available.
-    class DummyMotorDriver:
-        def set_motor(self, side, speed):
+class MotionExecutor:
+    """
+    Non-blocking replacement for the sleeping MotorController methods.
+    Motion primitives are queued and a state machine advances them from tick(),
+    which is called at a fixed control rate by a machine.Timer or by the run()
+    coroutine, so sensing and planning can run while the mouse is moving.
+    Back-to-back primitives are chained without stopping the motors in between.
+    """
+    FORWARD = 'forward'
+    LEFT = 'left'
+    RIGHT = 'right'
+    WAIT = 'wait'
+
+    def __init__(self, controller, rate_hz=200, clock=ticks_ms):
+        """
+        :param controller: MotorController providing calibration and motor access.
+        :param rate_hz: Control rate used by run() and start_timer().
+        :param clock: Millisecond tick source (ticks_ms), replaceable for host tests.
+        """
+        self.controller = controller
+        self.period_ms = max(1, 1000 // rate_hz)
+        self.clock = clock
+        self.queue = []
+        self.current = None
+        self.completed = 0
+        self._end = 0
+        self._timer = None
+
+    def forward(self, distance_mm, speed=None):
+        self.queue.append((MotionExecutor.FORWARD, distance_mm, speed))
+
+    def turn_left(self, angle_deg=90, speed=None):
+        self.queue.append((MotionExecutor.LEFT, angle_deg, speed))
+
+    def turn_right(self, angle_deg=90, speed=None):
+        self.queue.append((MotionExecutor.RIGHT, angle_deg, speed))
+
+    def wait(self, seconds):
+        """Stand still for the given time."""
+        self.queue.append((MotionExecutor.WAIT, seconds, 0))
+
+    @property
+    def busy(self):
+        return self.current is not None or bool(self.queue)
+
+    def pending(self):
+        """Number of primitives not started yet."""
+        return len(self.queue)
+
+    def cancel(self):
+        """Drop all queued primitives and stop the motors."""
+        self.queue = []
+        self.current = None
+        self.controller.driver.stop()
+
+    def tick(self, now=None):
+        """
+        Advance the state machine; never blocks.
+        :return: True while a primitive is running.
+        """
+        if now is None:
+            now = self.clock()
+        start = now
+        if self.current is not None:
+            if ticks_diff(now, self._end) < 0:
+                return True
+            self.current = None
+            self.completed += 1
+            if not self.queue:
+                self.controller.driver.stop()
+                return False
+            start = self._end  # chained: the next one begins where this one ended, not at this poll
+        elif not self.queue:
+            return False
+        self._start(self.queue.pop(0), start)
+        return True
+
+    def _start(self, primitive, start):
+        kind, value, speed = primitive
+        ctrl = self.controller
+        if speed is None:
+            speed = ctrl.default_speed
+        if kind == MotionExecutor.FORWARD:
+            duration = ctrl.forward_duration(value)
+            if value >= 0:
+                ctrl.drive(speed, speed)
+            else:
+                ctrl.drive(-speed, -speed)
+        elif kind == MotionExecutor.LEFT:
+            duration = ctrl.turn_duration(value)
+            ctrl.drive(-speed, speed)
+        elif kind == MotionExecutor.RIGHT:
+            duration = ctrl.turn_duration(value)
+            ctrl.drive(speed, -speed)
+        else:
+            duration = value
+            ctrl.driver.stop()
+        self.current = primitive
+        self._end = ticks_add(start, int(duration * 1000))
+
+    def start_timer(self, timer):
+        """Drive tick() from a hardware timer, e.g. start_timer(machine.Timer(1))."""
+        self._timer = timer
+        timer.init(period=self.period_ms, mode=timer.PERIODIC, callback=lambda t: self.tick())
+
+    def stop_timer(self):
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    async def run(self):
+        """Coroutine that ticks the executor at the control rate until the queue is empty."""
+        while self.tick():
+            await asyncio.sleep(self.period_ms / 1000)
+
+class DummyMotorDriver:
+    """Stand-in for tb6612.MotorDriver when no hardware is attached."""
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.speeds = {"left": 0, "right": 0}
+
+    def set_motor(self, side, speed):
+        self.speeds[side] = speed
+        if self.verbose:
             print(f"[Dummy] {side} motor set to speed {speed}")
-        def stop(self):
+
+    def stop(self):
+        self.speeds = {"left": 0, "right": 0}
+        if self.verbose:
             print("[Dummy] Motors stopped")
 
-    # Initialize MotorController with dummy driver and test movements
-    dummy_driver = MotorDriver(**config.MOTOR_PINS)
-    motor_ctrl = MotorController(dummy_driver)
+# Independent testing of MotorController module
+if __name__ == "__main__":
+    if HOST:
+        # For testing, use a dummy MotorDriver if actual hardware is not available.
+        driver = DummyMotorDriver()
+    else:
+        import config
+        from drivers.tb6612 import MotorDriver
+        driver = MotorDriver(**config.MOTOR_PINS)
+
+    # Initialize MotorController with the driver and test movements
+    motor_ctrl = MotorController(driver)
 
     print("Testing forward movement 100mm:")
     motor_ctrl.move_forward(100)   # Expect motors forward then stop
@@ -90,3 +228,37 @@ if __name__ == "__main__":
     motor_ctrl.turn_left(90)       # Expect left motor reverse, right motor forward then stop
     print("Testing turn right 45 degrees:")
     motor_ctrl.turn_right(45)      # Expect left motor forward, right motor reverse then stop
+
+    # Executor on a simulated clock: one cell, right turn, one cell, all queued up front
+    now = [0]
+    executor = MotionExecutor(MotorController(DummyMotorDriver(verbose=False)), clock=lambda: now[0])
+    executor.forward(180)
+    executor.turn_right(90)
+    executor.forward(180)
+    transitions = []
+    while executor.tick():
+        if executor.current is not None and (not transitions or transitions[-1][1] != executor.completed):
+            transitions.append((now[0], executor.completed, executor.current[0]))
+        now[0] += executor.period_ms
+    print("Executor transitions (ms, done, primitive):", transitions, "finished at", now[0], "ms")
+
+    # Executor as a coroutine: a planner task keeps working while the mouse moves
+    async def planner(executor, log):
+        for cell in range(3):
+            executor.forward(90)
+            while executor.pending():
+                log.append(cell)  # this is where sensing / flood fill would run
+                await asyncio.sleep(0.005)
+
+    async def demo():
+        # asyncio sleeps in real time, so the executor needs a real clock on the host too
+        executor = MotionExecutor(MotorController(DummyMotorDriver(verbose=False), mm_per_sec=3000),
+                                  clock=ticks_ms if not HOST else lambda: int(time.monotonic() * 1000))
+        log = []
+        plan = asyncio.create_task(planner(executor, log))
+        await asyncio.sleep(0)
+        await executor.run()
+        await plan
+        print("Planner iterations while driving:", len(log), "primitives done:", executor.completed)
+
+    asyncio.run(demo())
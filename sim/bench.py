@@ -0,0 +1,115 @@
+# bench.py
+# Run solvers over a set of mazes in a process pool and report search quality
+# (steps, explored cells) and compute cost (total and per-step latency).
+#
+#   python -m sim.bench mazes/*.maz
+#   python -m sim.bench --random 200 --size 16 --jobs 8
+import argparse
+import math
+import time
+from multiprocessing import Pool
+from sim.maze_files import load_maze, random_maze, centre_goal
+from sim.mouse import VirtualMouse, SOLVERS
+
+def percentile(values, p):
+    """p-th percentile (0..100) of an already sorted list, nearest-rank."""
+    if not values:
+        return 0
+    # smallest rank covering p percent; multiplying first keeps exact products exact,
+    # the epsilon absorbs the representation error of fractional p (e.g. 99.9)
+    k = min(len(values) - 1, max(0, math.ceil(p * len(values) / 100.0 - 1e-9) - 1))
+    return values[k]
+
+def run_search(maze, solver_name, goal=None, max_steps=None):
+    """
+    Drive a virtual mouse from the start cell to the goal with one solver.
+    :return: dict with reached, steps, turns, explored, compute_ms and step latencies (us).
+    """
+    goal = goal or centre_goal(maze.width, maze.height)
+    goal_set = set(goal)
+    max_steps = max_steps or 4 * maze.width * maze.height
+    solver = SOLVERS[solver_name](maze.width, maze.height, goal)
+    mouse = VirtualMouse(maze)
+    latencies = []
+    while mouse.cell not in goal_set and mouse.steps < max_steps:
+        walls = mouse.sense()
+        t0 = time.perf_counter_ns()
+        direction = solver.step(mouse.cell, mouse.heading, walls)
+        latencies.append((time.perf_counter_ns() - t0) // 1000)
+        if direction is None:
+            break  # solver believes the goal is unreachable
+        mouse.move(direction)
+    latencies.sort()
+    return {
+        'reached': mouse.cell in goal_set,
+        'steps': mouse.steps,
+        'turns': mouse.turns,
+        'explored': len(mouse.visited),
+        'compute_ms': sum(latencies) / 1000.0,
+        'p50_us': percentile(latencies, 50),
+        'p90_us': percentile(latencies, 90),
+        'p99_us': percentile(latencies, 99),
+        'max_us': latencies[-1] if latencies else 0,
+    }
+
+def _job(args):
+    name, source, solver_name = args
+    maze = load_maze(source) if isinstance(source, str) else random_maze(*source)
+    return name, solver_name, run_search(maze, solver_name)
+
+def run_corpus(mazes, solver_names, jobs=None):
+    """
+    Run every solver on every maze in a process pool.
+    :param mazes: list of (name, source) where source is a file path or (size, seed) for random_maze.
+    :return: list of (maze name, solver name, stats) in input order.
+    """
+    tasks = [(name, source, solver) for name, source in mazes for solver in solver_names]
+    with Pool(jobs) as pool:
+        return pool.map(_job, tasks, chunksize=max(1, len(tasks) // (4 * (jobs or 4))))
+
+def summarize(results, solver_names):
+    """Per-solver aggregate table as a list of text lines."""
+    header = "%-12s %6s %8s %8s %9s %10s %8s %8s %8s" % (
+        'solver', 'mazes', 'reached', 'steps', 'explored', 'compute_ms', 'p50_us', 'p90_us', 'p99_us')
+    lines = [header, '-' * len(header)]
+    for solver in solver_names:
+        rows = [stats for _, s, stats in results if s == solver]
+        if not rows:
+            continue
+        n = len(rows)
+        mean = lambda key: sum(row[key] for row in rows) / n
+        lines.append("%-12s %6d %8d %8.1f %9.1f %10.2f %8.1f %8.1f %8.1f" % (
+            solver, n, sum(row['reached'] for row in rows), mean('steps'), mean('explored'),
+            mean('compute_ms'), mean('p50_us'), mean('p90_us'), mean('p99_us')))
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micromouse search benchmark")
+    parser.add_argument('files', nargs='*', help=".maz, .num or ASCII maze files")
+    parser.add_argument('--random', type=int, default=0, help="also run N generated mazes")
+    parser.add_argument('--size', type=int, default=16, help="size of generated mazes")
+    parser.add_argument('--solvers', default=','.join(SOLVERS), help="comma separated solver names")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--verbose', action='store_true', help="print one line per maze and solver")
+    args = parser.parse_args(argv)
+
+    solver_names = args.solvers.split(',')
+    for name in solver_names:
+        if name not in SOLVERS:
+            parser.error("unknown solver %r (have: %s)" % (name, ', '.join(SOLVERS)))
+    mazes = [(path, path) for path in args.files]
+    mazes += [('random-%d' % seed, (args.size, seed)) for seed in range(args.random)]
+    if not mazes:
+        parser.error("no mazes given (pass files or --random N)")
+
+    t0 = time.perf_counter()
+    results = run_corpus(mazes, solver_names, args.jobs)
+    if args.verbose:
+        for name, solver, stats in results:
+            print("%-30s %-12s %s" % (name, solver, stats))
+    for line in summarize(results, solver_names):
+        print(line)
+    print("%d runs in %.1f s" % (len(results), time.perf_counter() - t0))
+
+if __name__ == "__main__":
+    main()
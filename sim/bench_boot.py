@@ -0,0 +1,91 @@
+# bench_boot.py
+# Time from main() to ready-to-run on the simulated board. The simulated bus
+# advances the virtual clock by its estimated wire time, so every transaction
+# costs what it would at the configured bus clock. Three boots are compared:
+#  - serial: the old main.py order, i.e. scan the bus, reset the IMU and wait,
+#    then bring up the ToF array, then calibrate the gyro,
+#  - utils.startup, first boot: scan, then the IMU reset with the ToF bring-up
+#    run during its waits,
+#  - utils.startup, later boots: the saved device map instead of the scan.
+# The time before main() (firmware start-up, importing .py or frozen .mpy
+# modules, see sim/build_mpy.py) is only measurable on the board, where it is
+# the first line of Startup.report().
+#
+#   python -m sim.bench_boot [--calibrate 256]
+import argparse
+import os
+import tempfile
+import config
+from hal import board, clock
+from sim.host import I2C
+from utils.startup import Startup
+
+class TimedI2C(I2C):
+    """Simulated bus on the configured pins whose transactions take their wire time."""
+
+    def __init__(self):
+        bus = config.I2C_CONFIG
+        super().__init__(scl=bus['scl'], sda=bus['sda'], freq=bus['freq'])
+
+    def _advance(self, bits):
+        clock.advance((self.bits - bits) * 1000000 // self.freq)
+
+    def _count(self, payload, addrsize, restart):
+        bits = self.bits
+        super()._count(payload, addrsize, restart)
+        self._advance(bits)
+
+    def scan(self):
+        bits = self.bits
+        found = super().scan()
+        self._advance(bits)
+        return found
+
+def serial_boot(calibrate):
+    """The boot order of the old main.py. :return: (ready ms, bus ms)."""
+    from drivers.mpu6500 import MPU6500
+    from drivers.tof_array import ToFArray
+    start = clock.now_us
+    i2c = TimedI2C()
+    i2c.scan()
+    imu = MPU6500(i2c)
+    tof = ToFArray(i2c, config.TOF['sensors'], config.TOF['period_ms'])
+    tof.begin()
+    tof.start()
+    if calibrate:
+        imu.calibrate(calibrate)
+    return (clock.now_us - start) / 1000.0, i2c.bus_us / 1000.0
+
+def pipeline_boot(calibrate, cache):
+    """:return: (ready ms, bus ms, Startup)."""
+    start = clock.now_us
+    startup = Startup(cache=cache, i2c=TimedI2C())
+    startup.bring_up(calibrate)
+    return (clock.now_us - start) / 1000.0, startup.i2c.bus_us / 1000.0, startup
+
+def main():
+    parser = argparse.ArgumentParser(description="Boot time on the simulated board")
+    parser.add_argument('--calibrate', type=int, default=256, help="gyro calibration samples")
+    args = parser.parse_args()
+    cache = os.path.join(tempfile.mkdtemp(), 'i2c_devices.json')
+    rows = []
+    board.reset()
+    board.populate()
+    rows.append(('serial (old main.py)',) + serial_boot(args.calibrate))
+    for name in ('startup, first boot', 'startup, saved map'):
+        board.reset()
+        board.populate()
+        ready, bus, startup = pipeline_boot(args.calibrate, cache)
+        rows.append((name, ready, bus))
+    os.remove(cache)
+    os.rmdir(os.path.dirname(cache))
+
+    print("%-24s %9s %9s" % ('boot', 'ready_ms', 'bus_ms'))
+    for name, ready, bus in rows:
+        print("%-24s %9.1f %9.1f" % (name, ready, bus))
+    print("\nstages of the boot with the saved map:")
+    for line in startup.report(startup.stages[0][1]):
+        print(line)
+
+if __name__ == "__main__":
+    main()
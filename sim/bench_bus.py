@@ -0,0 +1,100 @@
+# bench_bus.py
+# Utilization of the shared I2C bus over full sensor cycles on the simulated
+# board: IMU and encoder read at 1 kHz, four ToF sensors ranging at 100 Hz.
+#  - before: the blocking driver calls, one transaction per consumer. Fusion
+#    reads the gyro, the tilt check the accelerometer, the logger the
+#    temperature, odometry the encoder angle, and ToFArray.update() polls the
+#    due sensors. They go through a BusManager only for its per-device
+#    statistics.
+#  - after: the same reads queued on utils.i2c_bus.BusManager through the
+#    drivers' queue_* methods. The three IMU reads are merged into one burst,
+#    ToFArray.queue_update() runs behind the control reads, and the ToF part of
+#    every tick is limited by --budget-us.
+# Bus time is the wire time estimate at the configured clock. It is the same
+# for hardware I2C and SoftI2C on the simulated bus; on the board SoftI2C adds
+# the bit-banging overhead, which shows in the busy_ms column.
+#
+#   python -m sim.bench_bus [--seconds 2] [--budget-us 800]
+import argparse
+from array import array
+import config
+from hal import board, clock, ticks_ms
+from drivers.AS5600 import AS5600
+from drivers.mpu6500 import MPU6500
+from drivers.tof_array import ToFArray
+from utils.i2c_bus import BusManager, make_i2c, PRIO_CONTROL, PRIO_BACKGROUND
+
+def setup():
+    """Fresh simulated board and bus. :return: (bus manager, imu, encoder, tof array)."""
+    board.reset()
+    board.populate()
+    i2c, _ = make_i2c(config.I2C_CONFIG)
+    bus = BusManager(i2c, config.I2C_CONFIG['freq'], clock=clock.ticks_us)
+    bus.device(0x68, 'imu', PRIO_CONTROL)
+    bus.device(0x36, 'encoder', PRIO_CONTROL)
+    bus.device(config.TOF['address'], 'tof boot', PRIO_BACKGROUND)
+    for name, _, address in config.TOF['sensors']:
+        bus.device(address, 'tof ' + name, PRIO_BACKGROUND)
+    imu = MPU6500(bus)
+    encoder = AS5600(bus, 0x36)
+    tof = ToFArray(bus, config.TOF['sensors'], config.TOF['period_ms'], clock=ticks_ms)
+    tof.begin()
+    tof.start()
+    bus.reset_stats()
+    return bus, imu, encoder, tof
+
+def run(ticks, queued, budget_us):
+    """
+    :return: (bus manager, per tick wire time array('I') in us, ToF readings).
+    """
+    bus, imu, encoder, tof = setup()
+    per_tick = array('I', [0] * ticks)
+    sample = [0.0] * 7
+    samples = sum(tof.samples)
+    for t in range(ticks):
+        before = bus.wire_us()
+        if queued:
+            encoder.queue_raw_angle(bus)
+            imu.queue_gyro(bus)
+            imu.queue_acceleration(bus)
+            imu.queue_temperature(bus)
+            tof.queue_update(bus)
+            bus.run(budget_us)
+            imu.sample_into(sample)
+            encoder.queued_raw_angle
+        else:
+            imu.gyro
+            imu.acceleration
+            imu.temperature
+            encoder.raw_angle
+            tof.update()
+        per_tick[t] = bus.wire_us() - before
+        clock.advance(1000)
+    return bus, per_tick, sum(tof.samples) - samples
+
+def main():
+    parser = argparse.ArgumentParser(description="I2C bus utilization of the sensor cycle, before / after")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--budget-us', type=int, default=800,
+                        help="bus time per 1 ms tick the queue may fill with non-control reads")
+    args = parser.parse_args()
+    ticks = int(args.seconds * 1000)
+    elapsed = ticks * 1000
+    _, hardware = make_i2c(config.I2C_CONFIG)
+    print("bus: %s at %d Hz, %d ticks of 1 ms\n" % (
+        'hardware I2C' if hardware else 'SoftI2C', config.I2C_CONFIG['freq'], ticks))
+    rows = []
+    for name, queued in (('before', False), ('after', True)):
+        bus, per_tick, readings = run(ticks, queued, args.budget_us)
+        print("%s:" % name)
+        for line in bus.report(elapsed):
+            print(line)
+        print()
+        rows.append((name, sum(bus.transactions), 100.0 * bus.wire_us() / elapsed,
+                     max(per_tick), readings))
+    print("%-8s %12s %12s %14s %13s" % ('cycle', 'trans/s', 'bus util', 'max tick ms', 'tof readings'))
+    for name, trans, util, peak, readings in rows:
+        print("%-8s %12.0f %11.1f%% %14.3f %13d" % (name, trans / args.seconds, util, peak / 1000.0, readings))
+
+if __name__ == "__main__":
+    main()
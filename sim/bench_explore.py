@@ -0,0 +1,104 @@
+# bench_explore.py
+# Search cost of the exploration planner (algorithm.explore) against the plain
+# flood fill search (to the goal, then flood back to the start): cells driven,
+# turns, estimated search time, how long the resulting safe fast-run route is
+# compared with the true shortest path, and the per-cell decision time.
+# Every maze is searched --repeats times; the runs make the same decisions, and
+# each decision is timed as its fastest run, so a host scheduler or GC pause
+# in one run does not count as planner time. The budget check is on the worst
+# decision of those.
+#
+#   python -m sim.bench_explore [--random 50] [--size 16] [--repeats 3] [--budget-us 2000]
+import argparse
+import time
+from algorithm.explore import Explorer
+from algorithm.floodfill import FloodFill, flood_fill_flat
+from algorithm.maze import Maze
+from sim.bench import percentile
+from sim.maze_files import random_maze, centre_goal
+from sim.mouse import VirtualMouse, choose_direction
+
+CELL_S = 0.53  # one stop-and-go cell at search speed (see sim.competition)
+TURN_S = 0.30
+
+def _drive(mouse, explorer, decide, max_steps):
+    latencies = []
+    while mouse.steps < max_steps:
+        walls = mouse.sense()
+        t0 = time.perf_counter_ns()
+        direction = decide(mouse, walls)
+        latencies.append((time.perf_counter_ns() - t0) // 1000)
+        if direction is None:
+            break
+        mouse.move(direction)
+    return latencies
+
+def run_flood(maze, goal):
+    """Baseline: flood to the goal, then flood back to the start."""
+    observer = Explorer(maze.width, maze.height, goal)
+    mouse = VirtualMouse(maze)
+    known = Maze(maze.width, maze.height)
+    latencies = []
+    for target in (goal, [observer.start]):
+        flood = FloodFill(known, target)
+        target_set = set(target)
+
+        def decide(mouse, walls):
+            observer.sense(mouse.cell, walls)
+            flood.update(mouse.cell, walls)
+            if mouse.cell in target_set:
+                return None
+            return choose_direction(known, flood.distance, mouse.cell, mouse.heading)
+        latencies += _drive(mouse, observer, decide, 8 * maze.width * maze.height)
+    return mouse, observer, latencies
+
+def run_explorer(maze, goal):
+    explorer = Explorer(maze.width, maze.height, goal)
+    mouse = VirtualMouse(maze)
+
+    def decide(mouse, walls):
+        return explorer.step(mouse.cell, mouse.heading, walls)
+    latencies = _drive(mouse, explorer, decide, 8 * maze.width * maze.height)
+    return mouse, explorer, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Exploration planner against the plain flood search")
+    parser.add_argument('--random', type=int, default=50)
+    parser.add_argument('--size', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=3, help="runs per maze; decisions are timed as the fastest")
+    parser.add_argument('--budget-us', type=int, default=2000, help="per-cell decision budget on this host")
+    args = parser.parse_args()
+    totals = {}
+    for seed in range(args.random):
+        maze = random_maze(args.size, seed)
+        goal = centre_goal(maze.width, maze.height)
+        optimal = flood_fill_flat(maze, goal)[maze.index(maze.height - 1, 0)]
+        for name, run in (('flood', run_flood), ('explorer', run_explorer)):
+            runs = [run(maze, goal) for _ in range(args.repeats)]
+            mouse, knowledge, _ = runs[0]
+            latencies = [min(times) for times in zip(*[r[2] for r in runs])]
+            t = totals.setdefault(name, {'steps': 0, 'turns': 0, 'excess': 0, 'proven': 0,
+                                         'home': 0, 'lat': []})
+            t['steps'] += mouse.steps
+            t['turns'] += mouse.turns
+            safe = knowledge.shortest[1]  # route the fast run can take without unknown walls
+            t['excess'] += safe - optimal
+            t['proven'] += knowledge.proven
+            t['home'] += mouse.cell == knowledge.start
+            t['lat'] += latencies
+    n = args.random
+    print("%d random %dx%d mazes" % (n, args.size, args.size))
+    print("%-9s %7s %7s %9s %11s %7s %6s %7s %7s" % ('search', 'cells', 'turns', 'search s',
+                                                    'route +cells', 'proven', 'home', 'p99 us', 'max us'))
+    for name, t in totals.items():
+        lat = sorted(t['lat'])
+        print("%-9s %7.1f %7.1f %9.1f %11.2f %6d%% %5d%% %7d %7d" % (
+            name, t['steps'] / n, t['turns'] / n, (t['steps'] * CELL_S + t['turns'] * TURN_S) / n,
+            t['excess'] / n, 100 * t['proven'] // n, 100 * t['home'] // n,
+            percentile(lat, 99), lat[-1]))
+    worst = max(totals['explorer']['lat'] or [0])
+    print("explorer worst decision %d us, budget %d us: %s" % (
+        worst, args.budget_us, 'ok' if worst <= args.budget_us else 'OVER'))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_flood.py
+# Throughput of the NumPy batch flood fill (analysis.flood_batch) against the
+# MCU implementation (algorithm.floodfill.flood_fill_flat) run maze by maze, in
+# mazes per second:
+#  - random mazes with the centre goal, per maze size and batch size,
+#  - one maze against many goal sets (every cell as the goal: all-pairs distances),
+#  - weighted goals (random costs) on random mazes.
+# Every distance map of the batch backend is compared with the MCU one and a
+# mismatch stops the benchmark.
+#
+#   python -m sim.bench_flood [--random 1000] [--sizes 16 32] [--batches 1 10 100 1000]
+import argparse
+import random
+import time
+import numpy as np
+from algorithm.floodfill import flood_fill_flat
+from analysis.flood_batch import walls_array, goal_seeds, flood_fill_batch, flood_fill_mazes
+from sim.maze_files import random_maze, centre_goal
+
+def check(dist, mazes, goals):
+    """Compare batch results with flood_fill_flat(). :return: Number of maps compared."""
+    for k, (maze, goal) in enumerate(zip(mazes, goals)):
+        if dist[k].ravel().tolist() != flood_fill_flat(maze, goal).tolist():
+            raise AssertionError("map %d differs from flood_fill_flat (goal %r)" % (k, goal))
+    return len(mazes)
+
+def rate(fn, count, repeat=3):
+    """Best count / seconds over `repeat` calls of fn()."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return count / best
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch flood fill throughput")
+    parser.add_argument('--random', type=int, default=1000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 32])
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+    compared = 0
+    print("%-34s %6s %12s %12s %8s" % ('workload', 'batch', 'mcu maze/s', 'numpy maze/s', 'speedup'))
+    for size in args.sizes:
+        mazes = [random_maze(size, seed) for seed in range(args.random)]
+        goal = centre_goal(size, size)
+        compared += check(flood_fill_mazes(mazes, goal), mazes, [goal] * len(mazes))
+        mcu = rate(lambda: [flood_fill_flat(m, goal) for m in mazes], len(mazes), 1)
+        for batch in args.batches:
+            if batch > len(mazes):
+                continue
+            chunks = [mazes[k:k + batch] for k in range(0, len(mazes) - batch + 1, batch)]
+            n = batch * len(chunks)
+            fast = rate(lambda: [flood_fill_mazes(chunk, goal) for chunk in chunks], n, 1)
+            print("%-34s %6d %12.0f %12.0f %7.1fx" % (
+                '%dx%d random, centre goal' % (size, size), batch, mcu, fast, fast / mcu))
+
+        # One maze, every cell as the goal
+        maze = mazes[0]
+        cells = [(r, c) for r in range(size) for c in range(size)]
+        walls = walls_array([maze])
+        seeds = np.stack([goal_seeds(cell, size, size) for cell in cells])
+        compared += check(flood_fill_batch(walls, seeds), [maze] * len(cells), cells)
+        mcu = rate(lambda: [flood_fill_flat(maze, cell) for cell in cells], len(cells), 1)
+        fast = rate(lambda: flood_fill_batch(walls, seeds), len(cells))
+        print("%-34s %6d %12.0f %12.0f %7.1fx" % (
+            '%dx%d one maze, all-pairs' % (size, size), len(cells), mcu, fast, fast / mcu))
+
+        # Weighted goals: a few goal cells with random starting costs per maze
+        rng = random.Random(size)
+        goals = [[(rng.randrange(size), rng.randrange(size), rng.randrange(size)) for _ in range(4)]
+                 for _ in mazes]
+        walls = walls_array(mazes)
+        seeds = np.stack([goal_seeds(g, size, size) for g in goals])
+        compared += check(flood_fill_batch(walls, seeds), mazes, goals)
+        mcu = rate(lambda: [flood_fill_flat(m, g) for m, g in zip(mazes, goals)], len(mazes), 1)
+        fast = rate(lambda: flood_fill_batch(walls, seeds), len(mazes))
+        print("%-34s %6d %12.0f %12.0f %7.1fx" % (
+            '%dx%d random, 4 weighted goals' % (size, size), len(mazes), mcu, fast, fast / mcu))
+    print("\n%d distance maps identical to flood_fill_flat" % compared)
+
+if __name__ == "__main__":
+    main()
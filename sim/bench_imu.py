@@ -0,0 +1,75 @@
+# bench_imu.py
+# Bus traffic and allocations per IMU sample: separate property reads
+# (acceleration, gyro, temperature) against the burst and FIFO APIs.
+#
+#   python -m sim.bench_imu
+import gc
+from array import array
+from drivers.mpu6500 import MPU6500, SAMPLE_SIZE, decode_sample
+from sim.mock_i2c import MockI2C
+from sim.devices import MPU6500Device
+
+def alloc_per_call(fn, n=200):
+    """
+    Bytes allocated per call: exact on MicroPython, traced peak on CPython (which
+    also counts interpreter frames, so only compare CPython numbers to each other).
+    """
+    fn()
+    gc.collect()
+    try:
+        start = gc.mem_alloc()
+        for _ in range(n):
+            fn()
+        return (gc.mem_alloc() - start) / n
+    except AttributeError:
+        import tracemalloc
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak - base
+
+def bus_per_sample(i2c, fn, samples):
+    i2c.reset_stats()
+    fn()
+    return i2c.transactions / samples, i2c.bytes / samples, i2c.bus_us / samples
+
+def main():
+    i2c = MockI2C(freq=400000)
+    device = i2c.attach(0x68, MPU6500Device())
+    device.set_sample((120, -340, 16100), 2000, (12, -7, 3))
+    imu = MPU6500(i2c)
+
+    def properties():
+        return imu.acceleration, imu.gyro, imu.temperature
+
+    raw = array('h', [0] * 7)
+    scaled = array('f', [0] * 7)
+    batch = 16
+    fifo_buf = bytearray(batch * SAMPLE_SIZE)
+
+    def burst_raw():
+        imu.read_raw_into(raw)
+
+    def burst_scaled():
+        imu.read_into(scaled)
+
+    def fifo():
+        for _ in range(batch):
+            device.sample()
+        count = imu.fifo_read_into(fifo_buf)
+        for i in range(count):
+            decode_sample(fifo_buf, i * SAMPLE_SIZE, raw)
+
+    imu.fifo_start()
+    print("%-22s %8s %8s %8s %14s" % ('method', 'trans', 'bytes', 'bus_us', 'alloc_B/sample'))
+    for name, fn, samples in (('properties', properties, 1), ('read_raw_into', burst_raw, 1),
+                              ('read_into (scaled)', burst_scaled, 1), ('fifo x%d' % batch, fifo, batch)):
+        trans, nbytes, bus = bus_per_sample(i2c, fn, samples)
+        print("%-22s %8.2f %8.1f %8.1f %14.1f" % (name, trans, nbytes, bus, alloc_per_call(fn) / samples))
+    assert imu.read_raw_into(raw)[2] == 16100
+
+if __name__ == "__main__":
+    main()
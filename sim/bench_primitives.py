@@ -0,0 +1,142 @@
+# bench_primitives.py
+# Motion primitive library (motion_primitives.py) on the host:
+#  - file size and load time of the generated library,
+#  - lookup latency: one sample() of a table profile against computing the same
+#    reference with velocity_control.MotionProfile,
+#  - compile_plan() latency for fast-run plans of random mazes,
+#  - the compiled runs driven on the plant model through VelocityController:
+#    run time against stop-and-turn moves, and where the mouse ends up compared
+#    with the goal of the plan.
+#
+#   python -m sim.bench_primitives [--random 20] [--size 16] [--level 1]
+import argparse
+import math
+import os
+import tempfile
+import time
+from algorithm.planner import MotionCosts, plan_fast_run
+from motion_primitives import PrimitiveLibrary
+from sim.bench import percentile
+from sim.gen_primitives import build_library
+from sim.maze_files import random_maze, centre_goal
+from sim.plant import DiffDrivePlant
+from velocity_control import MotionProfile, VelocityController, TRAPEZOID, SCURVE
+
+FREE_SPEED = 2500.0  # plant motor fast enough for every level; kv / ka scaled to match
+
+def lookup_ns(profile, rate_hz, repeat=20):
+    """Per sample() cost over the whole profile at the control rate, best of `repeat` passes."""
+    times = [k / rate_hz for k in range(int(profile.duration * rate_hz) + 1)]
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for t in times:
+            profile.sample(t)
+        ns = (time.perf_counter_ns() - t0) / len(times)
+        best = ns if best is None else min(best, ns)
+    return best
+
+def end_pose(plan, cell):
+    """Where the plan ends (x, y in mm) starting at the origin heading along x."""
+    x = y = 0.0
+    heading = 0
+    for action, value in plan:
+        if action == 'left':
+            heading += value
+        elif action == 'right':
+            heading -= value
+        else:
+            step = cell * (math.sqrt(0.5) if action == 'diagonal' else 1.0)
+            x += value * step * math.cos(math.radians(heading))
+            y += value * step * math.sin(math.radians(heading))
+    return x, y
+
+def drive(primitives, rate_hz, seed):
+    """Run the primitives back to back on the plant. :return: (seconds, plant)."""
+    plant = DiffDrivePlant(free_speed=FREE_SPEED, noise=0.002, seed=seed)
+    kv = 65535 / FREE_SPEED
+    ctrl = VelocityController(plant, kv=kv, ka=kv * plant.tau)
+    dt = 1.0 / rate_hz
+    ticks = 0
+    for linear, angular in primitives:
+        ctrl.start_profiles(linear, angular)
+        while not ctrl.done:
+            vl, vr = plant.wheel_velocities()
+            ctrl.update(dt, vl, vr, plant.yaw_rate())
+            plant.step(dt)
+            ticks += 1
+    plant.stop()
+    return ticks * dt, plant
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion primitive library benchmark")
+    parser.add_argument('--random', type=int, default=20)
+    parser.add_argument('--size', type=int, default=16)
+    parser.add_argument('--level', type=int, default=1)
+    args = parser.parse_args()
+
+    # Library: generate, save, load back
+    built = build_library()
+    path = os.path.join(tempfile.mkdtemp(), 'primitives.mpl')
+    built.save(path)
+    t0 = time.perf_counter()
+    library = PrimitiveLibrary.load(path)
+    load_ms = (time.perf_counter() - t0) * 1000
+    print("library: %d levels, %d bytes, load %.1f ms" % (len(library.levels), os.path.getsize(path), load_ms))
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+    rate = library.rate_hz
+    level = library.levels[args.level]
+
+    # Lookup latency against computing the reference
+    run = library.compile_plan([('straight', 8)], args.level)[0][0]
+    # straight, smooth 90, straight: the middle one's angular channel
+    turn = library.compile_plan([('straight', 1), ('right', 90), ('straight', 1)], args.level)[1][1]
+    rows = [
+        ("straight 8 cells, table", lookup_ns(run, rate)),
+        ("straight 8 cells, MotionProfile trapezoid",
+         lookup_ns(MotionProfile(8 * 180, level.v_max, level.accel, TRAPEZOID), rate)),
+        ("straight 8 cells, MotionProfile S-curve",
+         lookup_ns(MotionProfile(8 * 180, level.v_max, level.accel, SCURVE), rate)),
+        ("smooth 90, table", lookup_ns(turn, rate)),
+        ("in-place 90, MotionProfile S-curve", lookup_ns(MotionProfile(math.pi / 2, 10.0, 100.0, SCURVE), rate)),
+    ]
+    print("\n%-45s %10s" % ('lookup', 'ns/sample'))
+    for name, ns in rows:
+        print("%-45s %10.0f" % (name, ns))
+
+    # Plans of random mazes: compile latency, run time on the plant, end point error
+    costs = MotionCosts(mm_per_sec=level.v_max, accel=level.accel, max_cells=args.size)
+    compile_us, smooth_s, stop_s, errors, counts = [], 0.0, 0.0, [], {}
+    for seed in range(args.random):
+        maze = random_maze(args.size, seed)
+        _, plan = plan_fast_run(maze, (maze.height - 1, 0), centre_goal(maze.width, maze.height), 'N', costs)
+        t0 = time.perf_counter()
+        primitives = library.compile_plan(plan, args.level)
+        compile_us.append((time.perf_counter() - t0) * 1e6)
+        for action, value in plan:
+            counts[action] = counts.get(action, 0) + 1
+        seconds, plant = drive(primitives, rate, seed)
+        smooth_s += seconds
+        x, y = end_pose(plan, library.cell_mm)
+        errors.append(math.hypot(plant.x - x, plant.y - y))
+        # Stop-and-turn: every run from rest to rest, every turn in place
+        for action, value in plan:
+            if action in ('left', 'right'):
+                stop_s += MotionProfile(math.radians(value), 10.0, 100.0).duration
+            else:
+                step = library.cell_mm * (math.sqrt(0.5) if action == 'diagonal' else 1.0)
+                stop_s += MotionProfile(value * step, level.v_max, level.accel).duration
+    compile_us.sort()
+    errors.sort()
+    n = args.random
+    print("\n%d random %dx%d plans at level %d (v_max %d, v_turn %d): %s" % (
+        n, args.size, args.size, args.level, level.v_max, level.v_turn,
+        ', '.join('%d %s' % (v, k) for k, v in sorted(counts.items()))))
+    print("compile_plan: median %.0f us, max %.0f us" % (percentile(compile_us, 50), compile_us[-1]))
+    print("run time: smooth primitives %.2f s, stop-and-turn %.2f s per run (%.0f%% faster)" % (
+        smooth_s / n, stop_s / n, 100 * (1 - smooth_s / stop_s)))
+    print("end point vs plan: median %.0f mm, max %.0f mm" % (percentile(errors, 50), errors[-1]))
+
+if __name__ == "__main__":
+    main()
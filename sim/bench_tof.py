@@ -0,0 +1,96 @@
+# bench_tof.py
+# Throughput and latency of four ToF sensors sharing one I2C bus: the old
+# single-shot + sleep(10 ms) reads, staggered continuous ranging polled from a
+# 1 kHz loop, and ToFArray (XSHUT bring-up, reads only when a sample is due).
+# Runs on the host virtual clock of hal, which the drivers' own sleeps advance,
+# and which also advances by the estimated bus time of every transaction.
+#
+#   python -m sim.bench_tof
+import config
+from hal import clock, ticks_ms
+from drivers.vl53I0x import Sensor, start_staggered, SYSRANGE_START, RESULT_RANGE_VAL
+from drivers.tof_array import ToFArray
+from sim.mock_i2c import MockI2C
+from sim.devices import VL6180XDevice, XShutPin
+
+ADDRESSES = (0x29, 0x2A, 0x2B, 0x2C)
+
+def setup():
+    i2c = MockI2C(freq=400000)
+    devices = [i2c.attach(a, VL6180XDevice(lambda: clock.now_us / 1000, distance_mm=60 + 20 * n))
+               for n, a in enumerate(ADDRESSES)]
+    sensors = [Sensor(i2c, a) for a in ADDRESSES]
+    i2c.reset_stats()
+    return i2c, devices, sensors
+
+def bus_sync(i2c, last):
+    # The bus time of the transactions since the previous call passes on the clock
+    clock.advance(i2c.bus_us - last)
+    return i2c.bus_us
+
+def run_sequential(duration_ms):
+    i2c, devices, sensors = setup()
+    reads, latencies, last = 0, [], 0
+    start = clock.now_us
+    while clock.now_us - start < duration_ms * 1000:
+        for sensor, device in zip(sensors, devices):
+            sensor.myWrite16(SYSRANGE_START, 0x01)
+            clock.advance(10000)  # the old blocking time.sleep(0.01)
+            sensor.myRead16(RESULT_RANGE_VAL)
+            reads += 1
+            latencies.append(clock.now_us / 1000 - device.ready_at)
+            last = bus_sync(i2c, last)
+    return reads, latencies, i2c.bus_us, clock.now_us - start
+
+def run_continuous(duration_ms, period_ms=10, tick_us=1000):
+    i2c, devices, sensors = setup()
+    start_staggered(sensors, period_ms)
+    reads, latencies, last = 0, [], 0
+    start = clock.now_us
+    while clock.now_us - start < duration_ms * 1000:
+        for sensor, device in zip(sensors, devices):
+            if sensor.read() is not None:
+                reads += 1
+                latencies.append(clock.now_us / 1000 - device.ready_at)
+            last = bus_sync(i2c, last)
+        clock.advance(tick_us - clock.now_us % tick_us)
+    return reads, latencies, i2c.bus_us, clock.now_us - start
+
+def run_array(duration_ms, tick_us=1000):
+    i2c = MockI2C(freq=400000)
+    pins = []
+    for n, (name, _, address) in enumerate(config.TOF['sensors']):
+        device = VL6180XDevice(lambda: clock.now_us / 1000, distance_mm=60 + 20 * n)
+        pins.append((name, XShutPin(i2c, device), address))
+    tof = ToFArray(i2c, pins, config.TOF['period_ms'], clock=ticks_ms)
+    tof.begin()
+    assert i2c.scan() == sorted(address for _, _, address in config.TOF['sensors'])
+    tof.start()
+    i2c.reset_stats()
+    devices = [pin.device for _, pin, _ in pins]
+    reads, latencies, last = 0, [], 0
+    start = clock.now_us
+    while clock.now_us - start < duration_ms * 1000:
+        before = list(tof.samples)
+        reads += tof.update()
+        for i, device in enumerate(devices):
+            if tof.samples[i] != before[i]:
+                latencies.append(clock.now_us / 1000 - device.ready_at)
+        last = bus_sync(i2c, last)
+        clock.advance(tick_us - clock.now_us % tick_us)
+    return reads, latencies, i2c.bus_us, clock.now_us - start
+
+def main(duration_ms=2000):
+    print("%-26s %10s %10s %12s %12s %9s" % ('mode', 'reads/s', 'per sensor', 'latency_ms', 'max_lat_ms', 'bus_util'))
+    for name, result in (('sequential single shot', run_sequential(duration_ms)),
+                         ('staggered continuous', run_continuous(duration_ms)),
+                         ('ToFArray scheduled', run_array(duration_ms))):
+        reads, latencies, bus_us, elapsed_us = result
+        rate = reads * 1000000 / elapsed_us
+        avg = sum(latencies) / len(latencies)
+        worst = max(latencies)
+        print("%-26s %10.1f %10.1f %12.2f %12.2f %8.1f%%" % (
+            name, rate, rate / len(ADDRESSES), avg, worst, 100.0 * bus_us / elapsed_us))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# build_mpy.py
+# Build step for the board. Importing a .py file on the ESP32 compiles it to
+# bytecode first, and that is repeated on every boot before main() runs.
+# This tool precompiles the firmware modules with mpy-cross into .mpy files,
+# laid out like the source tree, to copy to the board instead of the sources:
+#   mpremote cp -r build/. :
+# (remove the .py copies of those modules from the board: an import finds the
+# .py before the .mpy).
+# main.py and boot.py stay source; MicroPython runs those two as scripts. With
+# --manifest it also writes a manifest for freezing the same modules into the
+# firmware image. Frozen bytecode is executed from flash, so it is neither
+# loaded into the heap nor compiled at import:
+#   make BOARD=ESP32_GENERIC_S3 FROZEN_MANIFEST=/path/to/manifest.py
+# mpy-cross must be the version of the firmware (pip install mpy-cross==<version>).
+#
+#   python -m sim.build_mpy [-o build] [-O 1] [--march xtensawin] [--manifest manifest.py]
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGES = ('algorithm', 'drivers', 'utils')
+SCRIPTS = ('main.py', 'boot.py')
+
+def firmware_modules(root=ROOT):
+    """Source files that run on the board, relative to root: the top level modules and PACKAGES."""
+    modules = [name for name in sorted(os.listdir(root))
+               if name.endswith('.py') and name not in SCRIPTS]
+    for package in PACKAGES:
+        for name in sorted(os.listdir(os.path.join(root, package))):
+            if name.endswith('.py'):
+                modules.append(package + '/' + name)
+    return modules
+
+def write_manifest(filename, modules, root=ROOT):
+    with open(filename, 'w') as f:
+        f.write("# Firmware modules of the mouse, generated by sim/build_mpy.py\n")
+        f.write('include("$(PORT_DIR)/boards/manifest.py")\n')
+        for name in modules:
+            if '/' not in name:
+                f.write('module(%r, base_path=%r)\n' % (name, root))
+        for package in PACKAGES:
+            f.write('package(%r, base_path=%r)\n' % (package, root))
+
+def compile_modules(mpy_cross, modules, out, opt, march, root=ROOT):
+    """Run mpy-cross on every module. :return: List of (module, source bytes, mpy bytes)."""
+    sizes = []
+    for name in modules:
+        target = os.path.join(out, name[:-3] + '.mpy')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        cmd = [mpy_cross, '-O%d' % opt, '-s', name, '-o', target]
+        if march:
+            cmd.append('-march=' + march)
+        subprocess.run(cmd + [os.path.join(root, name)], check=True)
+        sizes.append((name, os.path.getsize(os.path.join(root, name)), os.path.getsize(target)))
+    return sizes
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile the firmware modules to .mpy")
+    parser.add_argument('-o', '--output', default=os.path.join(ROOT, 'build'))
+    parser.add_argument('-O', '--opt', type=int, default=1,
+                        help="mpy-cross optimisation level (1+ strips assert statements)")
+    parser.add_argument('--march', default=None,
+                        help="native code architecture, xtensawin for the ESP32-S3")
+    parser.add_argument('--mpy-cross', default='mpy-cross', help="mpy-cross executable")
+    parser.add_argument('--manifest', default=None, help="also write a frozen-module manifest")
+    args = parser.parse_args()
+    modules = firmware_modules()
+    if args.manifest:
+        write_manifest(args.manifest, modules)
+        print("manifest with %d modules written to %s" % (len(modules), args.manifest))
+    mpy_cross = shutil.which(args.mpy_cross)
+    if mpy_cross is None:
+        sys.exit("%s not found: pip install mpy-cross==<firmware version>" % args.mpy_cross)
+    sizes = compile_modules(mpy_cross, modules, args.output, args.opt, args.march)
+    print("%-32s %8s %8s" % ('module', 'py', 'mpy'))
+    for name, py, mpy in sizes:
+        print("%-32s %8d %8d" % (name, py, mpy))
+    print("%-32s %8d %8d" % ('total', sum(s[1] for s in sizes), sum(s[2] for s in sizes)))
+    print("copy to the board: mpremote cp -r %s/. :" % args.output)
+
+if __name__ == "__main__":
+    main()
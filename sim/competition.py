@@ -0,0 +1,338 @@
+# competition.py
+# End-to-end competition runs on the physics model: the mouse searches from the
+# start to the centre, explores its way back, then makes a speed run on the
+# planned route, all through the real control stack (VelocityController,
+# Odometry, HeadingEstimator, FloodFill, plan_fast_run) driving sim.robot at a
+# fixed control rate. Runs are independent, so a maze corpus is spread over a
+# process pool; the headline number is the total competition time per maze.
+#
+#   python -m sim.competition mazes/*.maz
+#   python -m sim.competition --random 20 --size 16 --jobs 8
+#   python -m sim.competition --random 20 --strategy explore
+import argparse
+import math
+import time
+from multiprocessing import Pool
+from algorithm.maze import Maze, DIR_CODES
+from algorithm.floodfill import FloodFill, UNREACHED, flood_fill_flat
+from algorithm.explore import Explorer, TO_GOAL
+from algorithm.planner import MotionCosts, plan_fast_run
+from sim.maze_files import load_maze, random_maze, centre_goal
+from sim.mouse import choose_direction, relative, _OFFSETS
+from sim.robot import VirtualRobot, CELL_MM, TOF_MOUNTS
+from utils.heading_fusion import HeadingEstimator
+from utils.postion_calculator import Odometry, V_MM_S, W_MRAD_S
+from velocity_control import VelocityController
+
+# Sensor indices in TOF_MOUNTS
+_LEFT, _FRONT, _RIGHT = (i for i, m in enumerate(TOF_MOUNTS) if m[0] in ('left', 'front', 'right'))
+
+class MouseRun:
+    """
+    Mouse firmware on top of a VirtualRobot. Moves are stop-and-go: straight runs
+    with side-wall centring, in-place turns, and a front wall alignment before
+    turning away from a wall.
+    """
+
+    def __init__(self, maze, goal=None, robot=None, control_hz=500, physics_hz=1000,
+                 search_speed=500.0, search_accel=3000.0, run_speed=1200.0, run_accel=5000.0,
+                 side_wall_mm=150, front_wall_mm=130, seed=None):
+        """
+        :param maze: Maze with the true walls (the mouse only learns them through its sensors).
+        :param goal: Goal cells; defaults to the centre.
+        :param robot: VirtualRobot to drive (defaults to a new one in the maze).
+        :param side_wall_mm, front_wall_mm: ToF thresholds for a wall next to / ahead of the cell.
+        """
+        self.goal = goal or centre_goal(maze.width, maze.height)
+        self.start = (maze.height - 1, 0)
+        self.robot = robot or VirtualRobot(maze, seed=seed)
+        self.control_dt = 1.0 / control_hz
+        self.substeps = max(1, physics_hz // control_hz)
+        self.search_speed, self.search_accel = search_speed, search_accel
+        self.run_speed, self.run_accel = run_speed, run_accel
+        self.side_wall_mm, self.front_wall_mm = side_wall_mm, front_wall_mm
+        track = self.robot.track_mm
+        self.ctrl = VelocityController(self.robot, track_mm=track)
+        self.odo = Odometry(wheel_diameter=self.robot.mm_per_count * 4096 / math.pi, track_width=track)
+        self.est = HeadingEstimator()
+        self.known = Maze(maze.width, maze.height)
+        self.visited = set([self.start])
+        self.cell = self.start
+        self.heading = 'N'
+        self.target = math.pi / 2  # absolute heading of the current axis (unwrapped)
+        self.prev_counts = self.robot.encoder_counts()
+        self.odo.reset(*self.prev_counts)
+        self.est.reset(self.target)
+        self.ticks = 0
+        self.turn_time = None
+        self.decisions = 0
+        self.decide_ns = 0  # host time spent in the search decisions (map update + next move)
+
+    # Control loop
+    def _tick(self, base, steer=0.0):
+        robot = self.robot
+        for _ in range(self.substeps):
+            robot.step(self.control_dt / self.substeps)
+        left, right = robot.encoder_counts()
+        state = self.odo.update(left, right, int(self.control_dt * 1000000))
+        v, w = state[V_MM_S], state[W_MRAD_S] / 1000.0
+        half = self.ctrl.track_mm / 2
+        self.est.update(robot.gyro_z(), w, v * self.control_dt, self.control_dt)
+        self.ctrl.heading = self.est.heading - base - steer - self.est.rate * self.control_dt
+        self.ctrl.update(self.control_dt, v - w * half, v + w * half, self.est.rate)
+        self.ticks += 1
+
+    def _centring(self):
+        """Heading offset (rad) that steers back to the middle between the side walls."""
+        dl, dr = self.robot.tof(_LEFT), self.robot.tof(_RIGHT)
+        mid = CELL_MM / 2 - 6 - abs(TOF_MOUNTS[_LEFT][2])
+        if dl < self.side_wall_mm and dr < self.side_wall_mm:
+            e = (dl - dr) / 2
+        elif dl < self.side_wall_mm:
+            e = dl - mid
+        elif dr < self.side_wall_mm:
+            e = mid - dr
+        else:
+            return 0.0
+        return max(-0.15, min(0.15, 0.004 * e))
+
+    def _run_move(self, base, follow_walls=False, settle=0.04):
+        steer = 0.0
+        n = 0
+        while not self.ctrl.done:
+            if follow_walls and n % 5 == 0:
+                steer = self._centring()
+            self._tick(base, steer)
+            n += 1
+            if self.robot.crashed:
+                return False
+        for _ in range(int(settle / self.control_dt)):
+            self._tick(base)
+        return not self.robot.crashed
+
+    def straight(self, cells, speed, accel):
+        self.ctrl.start_straight(cells * CELL_MM, v_max=speed, accel=accel)
+        return self._run_move(self.target, follow_walls=True)
+
+    def turn(self, quarter_turns):
+        """Turn in place, positive to the left."""
+        if not quarter_turns:
+            return True
+        t0 = self.robot.time
+        base = self.target
+        self.ctrl.start_turn(90 * quarter_turns)
+        self.target += quarter_turns * math.pi / 2
+        ok = self._run_move(base)
+        if abs(quarter_turns) == 1 and self.turn_time is None:
+            self.turn_time = self.robot.time - t0
+        return ok
+
+    def align_front(self):
+        """Drive forwards or back so the front wall is at its nominal distance."""
+        front = self.robot.tof(_FRONT)
+        nominal = CELL_MM / 2 - 6 - TOF_MOUNTS[_FRONT][1]
+        error = front - nominal
+        if abs(error) < 3 or front >= self.front_wall_mm:
+            return True
+        self.ctrl.start_straight(error, v_max=200.0, accel=2000.0)
+        return self._run_move(self.target, settle=0.02)
+
+    # Cell level behaviour
+    def sense(self):
+        """Absolute walls around the current cell from the left, front and right sensors."""
+        robot = self.robot
+        return {
+            relative(self.heading, 3): robot.tof(_LEFT) < self.side_wall_mm,
+            self.heading: robot.tof(_FRONT) < self.front_wall_mm,
+            relative(self.heading, 1): robot.tof(_RIGHT) < self.side_wall_mm,
+        }
+
+    def face(self, direction):
+        turn = (DIR_CODES[direction] - DIR_CODES[self.heading]) % 4
+        if turn == 0:
+            return True
+        walls = self.known.walls[self.known.index(*self.cell)]
+        if walls & (1 << DIR_CODES[self.heading]) and not self.align_front():
+            return False
+        ok = self.turn({1: -1, 2: 2, 3: 1}[turn])
+        self.heading = direction
+        return ok
+
+    def step_to(self, direction, speed, accel):
+        if not self.face(direction):
+            return False
+        ok = self.straight(1, speed, accel)
+        dr, dc = _OFFSETS[direction]
+        self.cell = (self.cell[0] + dr, self.cell[1] + dc)
+        self.visited.add(self.cell)
+        return ok
+
+    def explore(self, goal, max_steps=None):
+        """Search with a flood fill until a goal cell is reached. :return: True on success."""
+        goal = list(goal)
+        goal_set = set(goal)
+        flood = FloodFill(self.known, goal)
+        max_steps = max_steps or 4 * self.known.width * self.known.height
+        for _ in range(max_steps):
+            walls = self.sense()
+            t0 = time.perf_counter_ns()
+            flood.update(self.cell, walls)
+            direction = None
+            if self.cell not in goal_set:
+                direction = choose_direction(self.known, flood.distance, self.cell, self.heading)
+            self.decide_ns += time.perf_counter_ns() - t0
+            self.decisions += 1
+            if self.cell in goal_set:
+                return True
+            if direction is None or flood.distance(*self.cell) == UNREACHED:
+                return False
+            if not self.step_to(direction, self.search_speed, self.search_accel):
+                return False
+        return False
+
+    def search(self, on_goal=None):
+        """
+        Search with algorithm.explore: to the goal, on until the shortest path is
+        proven, then back to the start exploring. on_goal() is called once the goal
+        is reached. :return: True when back at the start.
+        """
+        explorer = Explorer(self.known.width, self.known.height, self.goal, self.start)
+        self.known = explorer.maze
+        for _ in range(8 * self.known.width * self.known.height):
+            walls = self.sense()
+            t0 = time.perf_counter_ns()
+            direction = explorer.step(self.cell, self.heading, walls)
+            self.decide_ns += time.perf_counter_ns() - t0
+            self.decisions += 1
+            if on_goal and explorer.phase != TO_GOAL:
+                on_goal()
+                on_goal = None
+            if direction is None:
+                return self.cell == self.start
+            if not self.step_to(direction, self.search_speed, self.search_accel):
+                return False
+        return False
+
+    def speed_run(self):
+        """Fastest route over visited cells only (unvisited cells count as closed)."""
+        plan_maze = Maze(self.known.width, self.known.height)
+        plan_maze.walls[:] = self.known.walls
+        for i in range(len(plan_maze.walls)):
+            if plan_maze.cell(i) not in self.visited:
+                for d in range(4):
+                    plan_maze.add_wall_idx(i, d)
+        costs = MotionCosts(mm_per_sec=self.run_speed, turn_90_time=self.turn_time or 0.5,
+                            accel=self.run_accel, max_cells=max(self.known.width, self.known.height),
+                            diagonals=False)
+        estimate, plan = plan_fast_run(plan_maze, self.cell, self.goal, self.heading, costs)
+        if estimate is None:
+            return False, None
+        for action, value in plan:
+            if action == 'straight':
+                ok = self.straight(value, self.run_speed, self.run_accel)
+                dr, dc = _OFFSETS[self.heading]
+                self.cell = (self.cell[0] + dr * value, self.cell[1] + dc * value)
+            else:
+                quarters = value // 90
+                ok = self.turn(quarters if action == 'left' else -quarters)
+                self.heading = relative(self.heading, (-quarters if action == 'left' else quarters) % 4)
+            if not ok:
+                return False, estimate
+        return self.cell in set(self.goal), estimate
+
+def run_competition(maze, seed=0, strategy='flood', **kwargs):
+    """
+    Search, return to start and one speed run on the physics model.
+    :param strategy: 'flood' (flood to the goal and back) or 'explore' (algorithm.explore).
+    :return: dict with the phase times (virtual seconds), success flags and the simulation speed.
+    """
+    t0 = time.perf_counter()
+    run = MouseRun(maze, seed=seed, **kwargs)
+    robot = run.robot
+    result = {'reached': False, 'returned': False, 'speed_run': False, 'crashed': False,
+              'search_s': None, 'return_s': None, 'run_s': None, 'estimate_s': None}
+    if strategy == 'explore':
+        def on_goal():
+            result['reached'] = True
+            result['search_s'] = robot.time
+        if run.search(on_goal):
+            result['returned'] = True
+            result['return_s'] = robot.time - result['search_s']
+    elif run.explore(run.goal):
+        result['reached'] = True
+        result['search_s'] = robot.time
+        mark = robot.time
+        if run.explore([run.start]):
+            result['returned'] = True
+            result['return_s'] = robot.time - mark
+    # Shortest path fully observed: the speed run cannot be beaten by unexplored walls
+    known = run.known
+    result['proven'] = known.shortest_path_observed(flood_fill_flat(known, run.goal),
+                                                    known.index(*run.start))
+    if result['returned']:
+        run.face('N')
+        mark = robot.time
+        ok, estimate = run.speed_run()
+        result['speed_run'] = ok
+        result['estimate_s'] = estimate
+        if ok:
+            result['run_s'] = robot.time - mark
+    result['crashed'] = robot.crashed
+    result['total_s'] = robot.time if result['speed_run'] else None
+    result['explored'] = len(run.visited)
+    result['decisions'] = run.decisions
+    result['ms_per_step'] = run.decide_ns / 1e6 / run.decisions if run.decisions else 0.0
+    elapsed = time.perf_counter() - t0
+    result['wall_s'] = elapsed
+    result['realtime_x'] = robot.time / elapsed if elapsed else 0.0
+    return result
+
+def _job(args):
+    name, source, seed, strategy = args
+    maze = load_maze(source) if isinstance(source, str) else random_maze(*source)
+    return name, run_competition(maze, seed=seed, strategy=strategy)
+
+def run_corpus(mazes, jobs=None, seed=0, strategy='flood'):
+    """
+    :param mazes: list of (name, source), source is a file path or (size, seed) for random_maze.
+    :return: list of (name, result) in corpus order.
+    """
+    work = [(name, source, seed, strategy) for name, source in mazes]
+    with Pool(jobs) as pool:
+        return pool.map(_job, work)
+
+def _fmt(value, spec='%7.1f'):
+    return spec % value if value is not None else '%7s' % '-'
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end competition runs on the physics model")
+    parser.add_argument('mazes', nargs='*', help=".maz / .num / text maze files")
+    parser.add_argument('--random', type=int, default=0, help="also run N random mazes")
+    parser.add_argument('--size', type=int, default=16)
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0, help="sensor / motor noise seed")
+    parser.add_argument('--strategy', choices=('flood', 'explore'), default='flood')
+    args = parser.parse_args()
+    corpus = [(path, path) for path in args.mazes]
+    corpus += [('random-%d' % n, (args.size, n)) for n in range(args.random)]
+    if not corpus:
+        parser.error("no mazes given")
+    t0 = time.perf_counter()
+    results = run_corpus(corpus, args.jobs, args.seed, args.strategy)
+    print("%-20s %7s %7s %7s %7s %7s %6s %6s %7s" % ('maze', 'search', 'return', 'run', 'plan', 'total',
+                                                     'cells', 'proven', 'x real'))
+    simulated = 0.0
+    for name, r in results:
+        print("%-20s %s %s %s %s %s %6d %6s %7.0f%s" % (
+            name[-20:], _fmt(r['search_s']), _fmt(r['return_s']), _fmt(r['run_s'], '%7.2f'),
+            _fmt(r['estimate_s'], '%7.2f'), _fmt(r['total_s']), r['explored'],
+            'yes' if r['proven'] else 'no', r['realtime_x'],
+            '  CRASHED' if r['crashed'] else ('' if r['speed_run'] else '  incomplete')))
+        simulated += r['wall_s'] * r['realtime_x']
+    done = [r['total_s'] for _, r in results if r['total_s'] is not None]
+    print("%d/%d mazes completed, mean total competition time %s s; %.0f s simulated in %.1f s" % (
+        len(done), len(results), '%.1f' % (sum(done) / len(done)) if done else '-',
+        simulated, time.perf_counter() - t0))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# devices.py
+# Register-level models of the sensors on the mouse, for use with MockI2C.
+from sim.mock_i2c import RegisterDevice
+
+def _put_short(regs, reg, value):
+    value &= 0xFFFF
+    regs[reg] = value >> 8
+    regs[reg + 1] = value & 0xFF
+
+class MPU6500Device(RegisterDevice):
+    """MPU6500 with WHO_AM_I, the 14 byte sample block and a sample FIFO."""
+    WHO_AM_I = 0x75
+    ACCEL_XOUT_H = 0x3B
+    FIFO_COUNTH = 0x72
+    FIFO_R_W = 0x74
+
+    def __init__(self, whoami=0x70):
+        super().__init__(128)
+        self.regs[self.WHO_AM_I] = whoami
+        self.fifo = bytearray()
+        self.set_sample((0, 0, 16384), 0, (0, 0, 0))
+
+    def set_sample(self, accel, temp, gyro):
+        """Set the raw values returned by the next reads."""
+        for i, value in enumerate(tuple(accel) + (temp,) + tuple(gyro)):
+            _put_short(self.regs, self.ACCEL_XOUT_H + 2 * i, value)
+
+    def sample(self):
+        """Latch the current sample registers into the FIFO (one sample period)."""
+        self.fifo += self.regs[self.ACCEL_XOUT_H:self.ACCEL_XOUT_H + 14]
+        del self.fifo[:max(0, len(self.fifo) - 512)]  # 512 byte FIFO keeps the newest data
+
+    def read_register(self, reg):
+        if reg == self.FIFO_COUNTH:
+            return len(self.fifo) >> 8
+        if reg == self.FIFO_COUNTH + 1:
+            return len(self.fifo) & 0xFF
+        return self.regs[reg]
+
+    def read(self, reg, buf):
+        if reg == self.FIFO_R_W:  # FIFO data register does not auto increment
+            n = len(buf)
+            buf[:n] = self.fifo[:n]
+            del self.fifo[:n]
+            return
+        super().read(reg, buf)
+
+class AS5600Device(RegisterDevice):
+    """AS5600 magnetic encoder: 12 bit raw angle and angle registers, magnet detected status."""
+    STATUS = 0x0B
+    RAW_ANGLE = 0x0C
+    ANGLE = 0x0E
+
+    def __init__(self, counts=0):
+        super().__init__(0x100)
+        self.regs[self.STATUS] = 0x20  # MD: magnet detected
+        self.position = 0.0  # shaft position in counts, not wrapped
+        self.set_counts(counts)
+
+    def set_counts(self, counts):
+        """Set the shaft position in (fractional) counts."""
+        self.position = counts
+        raw = int(counts) & 0x0FFF
+        _put_short(self.regs, self.RAW_ANGLE, raw)
+        _put_short(self.regs, self.ANGLE, raw)
+
+    def rotate(self, counts):
+        """Turn the shaft by a number of counts (4096 per turn)."""
+        self.set_counts(self.position + counts)
+
+class VL6180XDevice(RegisterDevice):
+    """
+    Time-of-flight ranging sensor (16 bit register addresses) with single-shot and
+    continuous ranging, the "New Sample Ready" status and interrupt clear.
+    Time comes from clock(), in milliseconds, so it can follow a simulated clock.
+    """
+    FRESH_OUT_OF_RESET = 0x0016
+    SYSTEM_INTERRUPT_CLEAR = 0x0015
+    SYSRANGE_START = 0x0018
+    SYSRANGE_INTERMEASUREMENT_PERIOD = 0x001B
+    RESULT_INTERRUPT_STATUS_GPIO = 0x004F
+    RESULT_RANGE_VAL = 0x0062
+    I2C_SLAVE_DEVICE_ADDRESS = 0x0212
+
+    def __init__(self, clock, distance_mm=100, conversion_ms=8.0):
+        super().__init__(0x300)
+        self.clock = clock
+        self.distance_mm = distance_mm
+        self.conversion_ms = conversion_ms
+        self.samples = 0
+        self.overwritten = 0  # samples that replaced one nobody read
+        self.reset()
+
+    def reset(self):
+        """Power-on state, as after releasing XSHUT."""
+        self.regs[:] = bytes(len(self.regs))
+        self.regs[0x0000] = 0xB4  # model id
+        self.regs[self.FRESH_OUT_OF_RESET] = 1
+        self.regs[self.SYSRANGE_INTERMEASUREMENT_PERIOD] = 0xFF
+        self.continuous = False
+        self.next_ready = None
+        self.ready_at = None  # time the latest sample became ready
+
+    def period_ms(self):
+        return (self.regs[self.SYSRANGE_INTERMEASUREMENT_PERIOD] + 1) * 10
+
+    def _update(self):
+        now = self.clock()
+        while self.next_ready is not None and now >= self.next_ready:
+            if self.regs[self.RESULT_INTERRUPT_STATUS_GPIO] & 0x07:
+                self.overwritten += 1
+            self.ready_at = self.next_ready
+            self.regs[self.RESULT_RANGE_VAL] = max(0, min(255, int(self.distance_mm)))
+            self.regs[self.RESULT_INTERRUPT_STATUS_GPIO] = (self.regs[self.RESULT_INTERRUPT_STATUS_GPIO] & 0xF8) | 0x04
+            self.samples += 1
+            if self.continuous:
+                self.next_ready += max(self.period_ms(), self.conversion_ms)
+            else:
+                self.next_ready = None
+
+    def read_register(self, reg):
+        self._update()
+        return self.regs[reg]
+
+    def write_register(self, reg, value):
+        self._update()
+        if reg == self.SYSRANGE_START:
+            if value & 0x02:
+                self.continuous = True
+                self.next_ready = self.clock() + self.conversion_ms
+            elif self.continuous:
+                self.continuous = False  # the running measurement still completes
+            elif value & 0x01:
+                self.next_ready = self.clock() + self.conversion_ms
+            return
+        if reg == self.SYSTEM_INTERRUPT_CLEAR:
+            self.regs[self.RESULT_INTERRUPT_STATUS_GPIO] &= 0xF8
+            return
+        if reg == self.I2C_SLAVE_DEVICE_ADDRESS and self.bus is not None:
+            self.bus.move(self, value & 0x7F)
+        self.regs[reg] = value
+
+class XShutPin:
+    """
+    Shutdown line of a simulated sensor (Pin-like value()). Low takes the sensor
+    off the bus, high resets it and brings it back on its default address.
+    """
+    def __init__(self, bus, device, address=0x29):
+        self.bus = bus
+        self.device = device
+        self.address = address
+        self.state = 0
+
+    def value(self, v=None):
+        if v is None:
+            return self.state
+        if v and not self.state:
+            self.device.reset()
+            self.bus.attach(self.address, self.device)
+        elif not v and self.state:
+            self.bus.detach(self.device)
+        self.state = 1 if v else 0
@@ -0,0 +1,238 @@
+# evaluate.py
+# Corpus evaluation for algorithm and tuning changes. Every maze gets a full
+# sim.competition run (search, return, speed run on the physics model). The
+# runs are spread over a process pool and each result is stored in a
+# content-addressed cache. The cache key is the maze hash (walls and goal), the
+# code version (a hash of every repository module the run imports), and the
+# run parameters. A rerun therefore only simulates the mazes whose result can
+# have changed, and checking out an older commit finds its results again.
+# Host timings (ms per step) are cached with the result they were measured with.
+#
+# The table compares search, fast-run and total time and the compute per search
+# step with a baseline saved earlier by --save. Only mazes present in both runs
+# are compared.
+#
+#   python -m sim.evaluate mazes/*.maz --random 200 --save before.json
+#   python -m sim.evaluate mazes/*.maz --random 200 --baseline before.json
+#   python -m sim.evaluate --random 200 --strategy explore --set search_speed=600 --baseline before.json
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from sim.competition import run_competition
+from sim.maze_files import load_maze, random_maze, centre_goal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = (
+    # (result key, label, format)
+    ('search_s', 'search s', '%.2f'),
+    ('return_s', 'return s', '%.2f'),
+    ('run_s', 'fast run s', '%.3f'),
+    ('total_s', 'total s', '%.2f'),
+    ('explored', 'cells explored', '%.1f'),
+    ('ms_per_step', 'compute ms/step', '%.4f'),
+)
+
+def maze_hash(maze, goal):
+    """Content hash of a maze: size, walls and goal cells."""
+    h = hashlib.sha256()
+    h.update(bytes((maze.width, maze.height)))
+    h.update(bytes(maze.walls))
+    h.update(repr(sorted(goal)).encode())
+    return h.hexdigest()
+
+def code_version(root=ROOT):
+    """Hash of the source of every loaded module from the repository, except this tool."""
+    files = set()
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if name in ('__main__', __name__) or not path:
+            continue
+        path = os.path.abspath(path)
+        if path.startswith(root + os.sep) and path.endswith('.py'):
+            files.add(path)
+    h = hashlib.sha256()
+    for path in sorted(files):
+        h.update(os.path.relpath(path, root).encode())
+        with open(path, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:16]
+
+class ResultCache:
+    """One JSON file per result under `path`, named by the key."""
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(maze_digest, version, params):
+        text = json.dumps([maze_digest, version, params], sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._file(key)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        name = self._file(key)
+        os.makedirs(os.path.dirname(name), exist_ok=True)
+        tmp = '%s.%d.tmp' % (name, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp, name)  # readers never see half a file
+
+def _job(args):
+    index, maze, params = args
+    try:
+        return index, run_competition(maze, **params)
+    except Exception as e:  # one broken run must not take the corpus down; not cached
+        return index, {'error': '%s: %s' % (type(e).__name__, e)}
+
+def evaluate(corpus, params, jobs=None, cache=None):
+    """
+    Run (or fetch from the cache) the competition result of every maze.
+    :param corpus: list of (name, source), source is a file path or (size, seed) for random_maze.
+    :param params: run_competition() keyword arguments (seed, strategy, MouseRun tuning).
+    :param cache: ResultCache or None.
+    :return: (version, list of {'name', 'maze', 'result'} in corpus order).
+    """
+    version = code_version()
+    rows, work = [], []
+    for name, source in corpus:
+        maze = load_maze(source) if isinstance(source, str) else random_maze(*source)
+        digest = maze_hash(maze, centre_goal(maze.width, maze.height))
+        row = {'name': name, 'maze': digest, 'result': None}
+        key = ResultCache.key(digest, version, params)
+        row['result'] = cache.get(key) if cache else None
+        if row['result'] is None:
+            work.append((len(rows), maze, params, key))
+        rows.append(row)
+    if work:
+        with Pool(jobs) as pool:
+            keys = dict((index, key) for index, _, _, key in work)
+            tasks = [(index, maze, p) for index, maze, p, _ in work]
+            for index, result in pool.imap_unordered(_job, tasks):
+                rows[index]['result'] = result
+                if cache and 'error' not in result:
+                    cache.put(keys[index], result)
+    return version, rows
+
+def _mean(rows, key):
+    values = [row['result'][key] for row in rows]
+    return sum(values) / len(values) if values else None
+
+def _completed(row):
+    result = row['result']
+    return result.get('total_s') is not None and not result.get('crashed')
+
+def compare(rows, baseline=None):
+    """Aggregate table (text lines) of the run, and of the baseline on the same mazes."""
+    lines = []
+    if baseline is None:
+        done = [row for row in rows if _completed(row)]
+        lines.append("%-18s %12s" % ('metric', 'current'))
+        lines.append("%-18s %12s" % ('completed', '%d/%d' % (len(done), len(rows))))
+        for key, label, spec in METRICS:
+            value = _mean(done, key)
+            lines.append("%-18s %12s" % (label, spec % value if value is not None else '-'))
+        return lines
+    base = dict((row['maze'], row) for row in baseline)
+    pairs = [(base[row['maze']], row) for row in rows if row['maze'] in base]
+    both = [(b, c) for b, c in pairs if _completed(b) and _completed(c)]
+    lines.append("%d mazes in both runs, %d completed in both; means over those" % (len(pairs), len(both)))
+    lines.append("%-18s %12s %12s %9s" % ('metric', 'baseline', 'current', 'change'))
+    lines.append("%-18s %12s %12s" % ('completed', '%d/%d' % (sum(_completed(b) for b, _ in pairs), len(pairs)),
+                                      '%d/%d' % (sum(_completed(c) for _, c in pairs), len(pairs))))
+    for key, label, spec in METRICS:
+        old = _mean([b for b, _ in both], key)
+        new = _mean([c for _, c in both], key)
+        if old is None:
+            lines.append("%-18s %12s %12s" % (label, '-', '-'))
+            continue
+        change = '%+8.1f%%' % (100.0 * (new - old) / old) if old else '%9s' % '-'
+        lines.append("%-18s %12s %12s %s" % (label, spec % old, spec % new, change))
+    better = sum(c['result']['total_s'] < b['result']['total_s'] for b, c in both)
+    worse = sum(c['result']['total_s'] > b['result']['total_s'] for b, c in both)
+    lines.append("total time better on %d mazes, worse on %d" % (better, worse))
+    return lines
+
+def _value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel, cached corpus evaluation against a baseline")
+    parser.add_argument('mazes', nargs='*', help=".maz / .num / text maze files")
+    parser.add_argument('--random', type=int, default=0, help="also run N random mazes")
+    parser.add_argument('--size', type=int, default=16)
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0, help="sensor / motor noise seed")
+    parser.add_argument('--strategy', choices=('flood', 'explore'), default='flood')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="MouseRun parameter, e.g. search_speed=600 (repeatable)")
+    parser.add_argument('--cache', default=os.path.join(ROOT, '.eval_cache'),
+                        help="result cache directory ('' disables it)")
+    parser.add_argument('--save', default=None, help="write the results here, for --baseline")
+    parser.add_argument('--baseline', default=None, help="results file written by --save")
+    parser.add_argument('--verbose', action='store_true', help="one line per maze")
+    args = parser.parse_args()
+    corpus = [(path, path) for path in args.mazes]
+    corpus += [('random-%d' % n, (args.size, n)) for n in range(args.random)]
+    if not corpus:
+        parser.error("no mazes given")
+    params = {'seed': args.seed, 'strategy': args.strategy}
+    for item in args.set:
+        name, sep, value = item.partition('=')
+        if not sep:
+            parser.error("--set expects NAME=VALUE, got %r" % item)
+        params[name] = _value(value)
+    cache = ResultCache(args.cache) if args.cache else None
+
+    t0 = time.perf_counter()
+    version, rows = evaluate(corpus, params, args.jobs, cache)
+    elapsed = time.perf_counter() - t0
+    errors = [row for row in rows if 'error' in row['result']]
+    rows = [row for row in rows if 'error' not in row['result']]
+    if args.verbose:
+        print("%-24s %8s %8s %8s %10s" % ('maze', 'search', 'run', 'total', 'ms/step'))
+        for row in rows:
+            r = row['result']
+            print("%-24s %8s %8s %8s %10.4f" % (
+                row['name'][-24:], '%.1f' % r['search_s'] if r['search_s'] is not None else '-',
+                '%.2f' % r['run_s'] if r['run_s'] is not None else '-',
+                '%.1f' % r['total_s'] if r['total_s'] is not None else '-', r['ms_per_step']))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        print("baseline %s: code %s, %s" % (args.baseline, saved['version'], saved['params']))
+        baseline = saved['rows']
+    print("current: code %s, %s" % (version, params))
+    for line in compare(rows, baseline):
+        print(line)
+    for row in errors:
+        print("%s: %s" % (row['name'], row['result']['error']))
+    computed = len(rows) + len(errors) - (cache.hits if cache else 0)
+    print("%d mazes: %d from the cache, %d simulated, %.1f s" % (
+        len(rows) + len(errors), cache.hits if cache else 0, computed, elapsed))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'version': version, 'params': params, 'rows': rows}, f)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# gen_primitives.py
+# Host-side generator of the motion primitive library (motion_primitives.py).
+# For every speed level it samples one linear acceleration ramp up to v_max
+# at the control rate, and one table per smooth turn. A turn is driven at
+# constant speed with a raised-cosine yaw rate, so the yaw acceleration is
+# continuous. The peak lateral acceleration is a_lat. The level's turn speed
+# is the fastest at which every turn still fits the corner model, i.e. each
+# tangent is at most half a cell. The 180 is the two 90s and the straight
+# between them in one table: a single raised-cosine 180 one cell wide would
+# reach about a cell ahead of its start, into the wall.
+#
+#   python -m sim.gen_primitives [-o primitives.mpl] [--rate 1000] [--cell 180]
+import argparse
+import math
+import sys
+from array import array
+from motion_primitives import (PrimitiveLibrary, Level, Turn, T45, T90, T135, T180, V90,
+                               TURN_ANGLES)
+
+# Speed levels: v_max (mm/s), accel (mm/s^2), highest turn speed (mm/s), lateral accel (mm/s^2)
+LEVELS = (
+    (800, 3000, 400, 5000),
+    (1200, 4000, 500, 6000),
+    (1600, 5000, 600, 6500),
+    (2000, 6000, 700, 7000),
+)
+DIAG_SPEED_FACTOR = 0.8  # same default as algorithm.planner.MotionCosts
+
+def curve(angle, steps=20000):
+    """
+    Smooth turn at v = 1 mm/s and peak yaw rate 1 rad/s.
+    :return: (x, y) at the end, in the entry frame (x ahead, y to the left).
+    """
+    period = 2 * angle
+    dt = period / steps
+    x = y = 0.0
+    for k in range(steps):
+        t = (k + 0.5) * dt
+        phi = 0.5 * (t - period / (2 * math.pi) * math.sin(2 * math.pi * t / period))
+        x += math.cos(phi) * dt
+        y += math.sin(phi) * dt
+    return x, y
+
+def tangent_length(angle):
+    """Distance from the start of a unit curve to the corner where its entry and exit lines meet."""
+    x, y = curve(angle)
+    return x - y / math.tan(angle)
+
+def build_level(v_max, accel, v_turn, a_lat, rate, cell, units):
+    half = cell / 2.0
+    n = int(v_max * rate / accel) + 1
+    vel = array('H', [int(round(accel * k / rate)) for k in range(n)])
+    pos = array('i', [int(round(accel * (k / rate) ** 2 / 2 * 1000)) for k in range(n)])
+    # Fastest turn speed at which every turn fits its corner, snapped onto the ramp
+    limits = [math.sqrt(a_lat * half / units[angle]) for angle in (45, 90, 135)]
+    v = min([v_turn] + limits)
+    v = vel[min(n - 1, int(v * rate / accel))]
+
+    turns = []
+    for kind in (T45, T90, T135, V90):
+        angle = math.radians(TURN_ANGLES[kind])
+        ticks = int(math.ceil(2 * angle / (a_lat / v) * rate))
+        w_peak = 2 * angle * rate / ticks  # whole number of ticks
+        scale = v / w_peak                 # unit curve -> mm
+        if kind == T90:
+            lead = half - units[90] * scale
+            tangent = half
+        else:
+            lead = 0.0
+            tangent = units[TURN_ANGLES[kind]] * scale
+        period = ticks / rate
+        heading, yaw = array('i'), array('h')
+        for k in range(ticks):
+            t = k / rate
+            phi = 0.5 * w_peak * (t - period / (2 * math.pi) * math.sin(2 * math.pi * t / period))
+            heading.append(int(round(phi * 1e6)))
+            yaw.append(int(round(w_peak * (1 - math.cos(2 * math.pi * t / period)) / 2 * 1000)))
+        turns.append(Turn(kind, int(lead * 1000), int(tangent * 1000), heading, yaw))
+    # 180: 90, the leads of both 90s as one straight, 90
+    t90 = turns[1]
+    middle = int(round(2 * t90.lead_um / 1000.0 / v * rate))
+    quarter = int(round(math.pi / 2 * 1e6))
+    heading = array('i', t90.heading)
+    heading.extend(array('i', [quarter] * middle))
+    heading.extend(array('i', [quarter + h for h in t90.heading]))
+    yaw = array('h', t90.rate)
+    yaw.extend(array('h', [0] * middle))
+    yaw.extend(t90.rate)
+    turns.insert(T180, Turn(T180, t90.lead_um, t90.tangent_um, heading, yaw))
+    return Level(v_max, accel, int(v_max * DIAG_SPEED_FACTOR), v, pos, vel, turns, rate)
+
+def build_library(rate=1000, cell=180, levels=LEVELS):
+    units = {}
+    for angle in (45, 90, 135):
+        units[angle] = tangent_length(math.radians(angle))
+    return PrimitiveLibrary(rate, cell, [build_level(*level, rate=rate, cell=cell, units=units)
+                                         for level in levels])
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the motion primitive library")
+    parser.add_argument('-o', '--output', default='primitives.mpl')
+    parser.add_argument('--rate', type=int, default=1000, help="control rate in Hz")
+    parser.add_argument('--cell', type=int, default=180, help="cell pitch in mm")
+    args = parser.parse_args()
+    library = build_library(args.rate, args.cell)
+    if sys.byteorder == 'big':
+        for level in library.levels:
+            for table in [level.ramp_pos, level.ramp_vel] + [a for t in level.turns for a in (t.heading, t.rate)]:
+                table.byteswap()
+    library.save(args.output)
+    names = ('45', '90', '135', '180', 'v90')
+    print("%-5s %6s %6s %6s %6s  %s" % ('level', 'v_max', 'accel', 'v_diag', 'v_turn',
+                                        '  '.join('%-15s' % (n + ' lead/tan/ms') for n in names)))
+    size = 0
+    for k, level in enumerate(library.levels):
+        cols = []
+        for turn in level.turns:
+            ms = 1000.0 * (2 * turn.lead_um / 1000.0 / level.v_turn + len(turn.heading) / args.rate)
+            cols.append('%-15s' % ('%.0f/%.0f/%.0f' % (turn.lead_um / 1000.0, turn.tangent, ms)))
+            size += 6 * len(turn.heading)
+        size += 6 * len(level.ramp_pos)
+        print("%-5d %6d %6d %6d %6d  %s" % (k, level.v_max, level.accel, level.v_diag, level.v_turn,
+                                            '  '.join(cols)))
+    print("%d levels, %d bytes of tables, written to %s" % (len(library.levels), size, args.output))
+
+if __name__ == "__main__":
+    main()
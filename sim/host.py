@@ -0,0 +1,225 @@
+# host.py
+# CPython backend of hal.py: machine.Pin / PWM / I2C / SoftI2C / Timer and the
+# time.ticks_* API on top of a virtual clock. Sleeping advances the clock
+# instead of waiting, and periodic timers fire as it passes their deadlines, so
+# drivers and control loops run as fast as the host can execute them. Buses
+# and pins are shared through `board`: every I2C built on the same scl/sda pins
+# sees the same simulated devices, like wires on the PCB.
+from sim.mock_i2c import MockI2C
+
+def _whole(n):
+    if not isinstance(n, int):
+        raise TypeError("can't convert %s to int" % type(n).__name__)
+
+class VirtualClock:
+    """Microsecond clock that only moves when something sleeps or advances it."""
+
+    def __init__(self):
+        self.now_us = 0
+        self._timers = []
+
+    def ticks_us(self):
+        return self.now_us
+
+    def ticks_ms(self):
+        return self.now_us // 1000
+
+    def advance(self, us):
+        """Move time forward, running every timer callback that falls due on the way."""
+        end = self.now_us + int(us)
+        while self._timers:
+            timer = min(self._timers, key=lambda t: t.deadline_us)
+            if timer.deadline_us > end:
+                break
+            self.now_us = max(self.now_us, timer.deadline_us)
+            timer._fire()
+        self.now_us = max(self.now_us, end)
+
+    # time.sleep_us() / sleep_ms() take integers only on MicroPython; reject
+    # what the board would, so a float sleep does not pass unnoticed here
+    def sleep_us(self, us):
+        _whole(us)
+        self.advance(us)
+
+    def sleep_ms(self, ms):
+        _whole(ms)
+        self.advance(ms * 1000)
+
+    def sleep(self, s):
+        self.advance(s * 1000000)
+
+class Board:
+    """Shared state of the simulated PCB: pin levels, pin listeners and I2C buses."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.levels = {}
+        self.listeners = {}
+        self.buses = {}
+        self.pwms = {}
+
+    def bus(self, scl, sda):
+        """Device map of the I2C bus on the given pins."""
+        key = (scl, sda)
+        if key not in self.buses:
+            self.buses[key] = {}
+        return self.buses[key]
+
+    def connect(self, pin, listener):
+        """Call listener.value(v) whenever the pin is driven (e.g. a sensor XSHUT line)."""
+        self.listeners[pin] = listener
+        if pin in self.levels:
+            listener.value(self.levels[pin])
+
+    def drive(self, pin, v):
+        self.levels[pin] = v
+        if pin in self.listeners:
+            self.listeners[pin].value(v)
+
+    def populate(self, tof_distance_mm=100):
+        """
+        Fit the devices of the real mouse according to config.py: MPU6500 and
+        AS5600 on the I2C pins, and a VL6180X behind every configured XSHUT pin.
+        :return: dict of name -> device model.
+        """
+        import config
+        from sim.devices import MPU6500Device, AS5600Device, VL6180XDevice, XShutPin
+        i2c = I2C(scl=config.I2C_CONFIG['scl'], sda=config.I2C_CONFIG['sda'],
+                  freq=config.I2C_CONFIG['freq'])
+        devices = {
+            'imu': i2c.attach(0x68, MPU6500Device()),
+            'encoder': i2c.attach(0x36, AS5600Device()),
+        }
+        clock = self.clock
+        for name, xshut, _ in config.TOF['sensors']:
+            device = VL6180XDevice(lambda: clock.now_us / 1000, distance_mm=tof_distance_mm)
+            self.connect(xshut, XShutPin(i2c, device))
+            devices[name] = device
+        return devices
+
+clock = VirtualClock()
+board = Board(clock)
+
+def _pin_id(pin):
+    return pin.id if isinstance(pin, Pin) else pin
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return board.levels.get(self.id, 0)
+        board.drive(self.id, 1 if v else 0)
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+class PWM:
+    """PWM output that records every duty change as (ticks_us, duty_u16) in `history`."""
+
+    def __init__(self, pin, freq=1000, duty_u16=0):
+        self.pin = _pin_id(pin)
+        self._freq = freq
+        self._duty = 0
+        self.history = []
+        board.pwms[self.pin] = self
+        self.duty_u16(duty_u16)
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = max(0, min(65535, int(d)))
+        self.history.append((clock.now_us, self._duty))
+
+    def duty(self, d=None):
+        if d is None:
+            return self._duty >> 6
+        self.duty_u16(d << 6)
+
+    def deinit(self):
+        self.duty_u16(0)
+
+class I2C(MockI2C):
+    """machine.I2C / SoftI2C signature; devices are shared by all buses on the same pins."""
+
+    def __init__(self, id=-1, scl=None, sda=None, freq=400000, timeout=50000):
+        super().__init__(freq)
+        self.devices = board.bus(_pin_id(scl), _pin_id(sda))
+
+SoftI2C = I2C
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self.deadline_us = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.mode = mode
+        self.period_us = int(1000000 / freq) if freq > 0 else int(period * 1000)
+        self.callback = callback
+        self.deadline_us = clock.now_us + self.period_us
+        if self not in clock._timers:
+            clock._timers.append(self)
+
+    def deinit(self):
+        if self in clock._timers:
+            clock._timers.remove(self)
+
+    def _fire(self):
+        if self.mode == Timer.PERIODIC:
+            self.deadline_us += self.period_us
+        else:
+            self.deinit()
+        if self.callback:
+            self.callback(self)
+
+def ticks_ms():
+    return clock.now_us // 1000
+
+def ticks_us():
+    return clock.now_us
+
+def ticks_diff(a, b):
+    return a - b
+
+def ticks_add(a, b):
+    return a + b
+
+def sleep_ms(ms):
+    clock.sleep_ms(ms)
+
+def sleep_us(us):
+    clock.sleep_us(us)
+
+def const(value):
+    return value
@@ -0,0 +1,166 @@
+# maze_files.py
+# Host-side loaders for the usual micromouse maze file formats, plus a random
+# maze generator for when no corpus is at hand. All loaders return an
+# algorithm.maze.Maze using the robot's (row, col) convention: row 0 is the
+# north edge, and the competition start cell (x=0, y=0) is (height - 1, 0).
+import random
+from algorithm.maze import Maze
+
+def parse_maz(data):
+    """
+    Binary .maz file: one byte per cell, column-major (index = x * size + y),
+    y growing northwards, wall bits N=1, E=2, S=4, W=8.
+    """
+    size = int(len(data) ** 0.5)
+    if size * size != len(data):
+        raise ValueError("maz data is not a square maze (%d bytes)" % len(data))
+    maze = Maze(size, size)
+    for x in range(size):
+        for y in range(size):
+            cell = data[x * size + y]
+            for bit, direction in ((1, 'N'), (2, 'E'), (4, 'S'), (8, 'W')):
+                if cell & bit:
+                    maze.add_wall(size - 1 - y, x, direction)
+    return maze
+
+def parse_num(text):
+    """
+    Text .num file: one line per cell "x y N E S W" with 0/1 wall flags, y growing northwards.
+    """
+    cells = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) == 6:
+            cells.append([int(f) for f in fields])
+    if not cells:
+        raise ValueError("no cells found in num data")
+    width = max(cell[0] for cell in cells) + 1
+    height = max(cell[1] for cell in cells) + 1
+    maze = Maze(width, height)
+    for x, y, n, e, s, w in cells:
+        for flag, direction in ((n, 'N'), (e, 'E'), (s, 'S'), (w, 'W')):
+            if flag:
+                maze.add_wall(height - 1 - y, x, direction)
+    return maze
+
+def parse_text(text):
+    """
+    ASCII drawing with posts every 4 columns / 2 lines, e.g.
+        o---o---o
+        |       |
+        o   o---o
+    Any non-blank character on a wall position counts as a wall.
+    """
+    lines = [line.rstrip() for line in text.splitlines() if line.strip()]
+    height = (len(lines) - 1) // 2
+    width = (max(len(line) for line in lines) - 1) // 4
+    if height < 1 or width < 1:
+        raise ValueError("text data is not a maze drawing")
+    at = lambda line, i: line[i] if i < len(line) else ' '
+    maze = Maze(width, height)
+    for r in range(height):
+        above, middle = lines[2 * r], lines[2 * r + 1]
+        for c in range(width):
+            if at(above, 4 * c + 2) != ' ':
+                maze.add_wall(r, c, 'N')
+            if at(middle, 4 * c) != ' ':
+                maze.add_wall(r, c, 'W')
+        # The outer east / south borders are already walls in Maze
+    return maze
+
+def load_maze(path):
+    """Load a maze file, picking the parser from the file extension."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.maz'):
+        return parse_maz(data)
+    text = data.decode()
+    if path.endswith('.num'):
+        return parse_num(text)
+    return parse_text(text)
+
+def centre_goal(width, height):
+    """The 2x2 goal area in the middle of the maze (a single cell for odd sizes)."""
+    rows = sorted({(height - 1) // 2, height // 2})
+    cols = sorted({(width - 1) // 2, width // 2})
+    return [(r, c) for r in rows for c in cols]
+
+def random_maze(size=16, seed=None, loops=0.1):
+    """
+    Generate a competition-like maze: a depth-first perfect maze with an open
+    goal area in the centre, a wall east of the start cell and a fraction of
+    extra walls knocked down to create loops.
+    """
+    rng = random.Random(seed)
+    maze = Maze(size, size)
+    for i in range(size * size):
+        maze.walls[i] = 0x0F
+    goal = centre_goal(size, size)
+
+    def knock(r, c, direction):
+        i = maze.index(r, c)
+        d = 'NESW'.index(direction)
+        maze.walls[i] &= ~(1 << d)
+        maze.walls[i + maze.offsets[d]] &= ~(1 << ((d + 2) % 4))
+
+    moves = (('N', -1, 0), ('E', 0, 1), ('S', 1, 0), ('W', 0, -1))
+    visited = bytearray(size * size)
+    stack = [(size - 1, 0)]
+    visited[maze.index(size - 1, 0)] = 1
+    while stack:
+        r, c = stack[-1]
+        options = [(d, r + dr, c + dc) for d, dr, dc in moves
+                   if 0 <= r + dr < size and 0 <= c + dc < size and not visited[maze.index(r + dr, c + dc)]]
+        if not options:
+            stack.pop()
+            continue
+        d, nr, nc = rng.choice(options)
+        knock(r, c, d)
+        visited[maze.index(nr, nc)] = 1
+        stack.append((nr, nc))
+
+    for r in range(size):
+        for c in range(size):
+            for d, dr, dc in moves[1:3]:
+                if r + dr < size and c + dc < size and rng.random() < loops / 2:
+                    knock(r, c, d)
+    if len(goal) == 4:
+        (r0, c0), (r1, c1) = goal[0], goal[3]
+        knock(r0, c0, 'E')
+        knock(r1, c0, 'E')
+        knock(r0, c0, 'S')
+        knock(r0, c1, 'S')
+    if size > 1:
+        # Start cell: closed to the east, so the only way out is north
+        maze.add_wall(size - 1, 0, 'E')
+        knock(size - 1, 0, 'N')
+    return maze
+
+def to_text(maze):
+    """ASCII drawing of a maze (inverse of parse_text)."""
+    lines = []
+    for r in range(maze.height):
+        top, middle = 'o', ''
+        for c in range(maze.width):
+            top += ('   ' if maze.is_open(r, c, 'N') else '---') + 'o'
+            middle += (' ' if maze.is_open(r, c, 'W') else '|') + '   '
+        lines.append(top)
+        lines.append(middle + '|')
+    lines.append('o' + '---o' * maze.width)
+    return '\n'.join(lines)
+
+# Independent testing of maze_files module
+if __name__ == "__main__":
+    maze = random_maze(8, seed=3)
+    text = to_text(maze)
+    print(text)
+    assert parse_text(text).walls == maze.walls, "text round trip failed"
+    num = '\n'.join('%d %d %d %d %d %d' % (c, maze.height - 1 - r,
+                    *(0 if maze.is_open(r, c, d) else 1 for d in 'NESW'))
+                    for r in range(maze.height) for c in range(maze.width))
+    assert parse_num(num).walls == maze.walls, "num round trip failed"
+    maz = bytes(sum(bit for bit, d in ((1, 'N'), (2, 'E'), (4, 'S'), (8, 'W'))
+                    if not maze.is_open(maze.height - 1 - y, x, d))
+                for x in range(maze.width) for y in range(maze.height))
+    assert parse_maz(maz).walls == maze.walls, "maz round trip failed"
+    print("maz / num / text loaders OK")
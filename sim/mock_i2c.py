@@ -0,0 +1,97 @@
+# mock_i2c.py
+# Mock I2C bus for host benchmarks. It has the machine.I2C memory API used by
+# the drivers, routes transactions to register-map devices and counts
+# transactions, bytes on the wire and estimated bus time.
+
+class RegisterDevice:
+    """
+    Generic register-map device: reads and writes go to a bytearray with
+    auto-increment. Subclasses override read_register / write_register for
+    registers with side effects (FIFOs, status bits, ...).
+    """
+    def __init__(self, size=256):
+        self.regs = bytearray(size)
+        self.bus = None
+        self.address = None
+
+    def read_register(self, reg):
+        return self.regs[reg]
+
+    def write_register(self, reg, value):
+        self.regs[reg] = value
+
+    def read(self, reg, buf):
+        for i in range(len(buf)):
+            buf[i] = self.read_register(reg + i)
+
+    def write(self, reg, data):
+        for i in range(len(data)):
+            self.write_register(reg + i, data[i])
+
+class MockI2C:
+    def __init__(self, freq=400000):
+        """
+        :param freq: Bus clock, used to estimate bus time (9 bits per byte plus start/stop).
+        """
+        self.freq = freq
+        self.devices = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.bits = 0
+
+    @property
+    def bus_us(self):
+        """Estimated time the bus was busy, in microseconds."""
+        return self.bits * 1000000 // self.freq
+
+    def attach(self, address, device):
+        if address in self.devices and self.devices[address] is not device:
+            raise OSError("address 0x%02x already in use" % address)
+        self.devices[address] = device
+        device.bus, device.address = self, address
+        return device
+
+    def detach(self, device):
+        """Remove a device from the bus (powered down / held in reset)."""
+        if self.devices.get(device.address) is device:
+            del self.devices[device.address]
+
+    def move(self, device, address):
+        """Device changed its own address (address register write)."""
+        self.detach(device)
+        self.attach(address, device)
+
+    def scan(self):
+        # One address byte per probe of 0x08..0x77, like machine.I2C.scan()
+        self.transactions += 112
+        self.bytes += 112
+        self.bits += 112 * 11
+        return sorted(self.devices)
+
+    def _device(self, addr):
+        if addr not in self.devices:
+            raise OSError(19, "ENODEV")  # what machine.I2C raises on a NACK
+        return self.devices[addr]
+
+    def _count(self, payload, addrsize, restart):
+        # address byte(s), register address, optional repeated start + address, payload
+        n = 1 + addrsize // 8 + (1 if restart else 0) + payload
+        self.transactions += 1
+        self.bytes += n
+        self.bits += 9 * n + (3 if restart else 2)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        self._device(addr).read(memaddr, buf)
+        self._count(len(buf), addrsize, True)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize)
+        return bytes(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self._device(addr).write(memaddr, buf)
+        self._count(len(buf), addrsize, False)
@@ -0,0 +1,96 @@
+# mouse.py
+# Virtual mouse for host-side runs: it moves on the true maze but a solver only
+# ever learns the walls that the sensor model reports.
+from algorithm.maze import Maze, DIR_CODES, DIR_NAMES
+from algorithm.floodfill import flood_fill, update_flood_map, FloodFill
+
+_OFFSETS = {'N': (-1, 0), 'E': (0, 1), 'S': (1, 0), 'W': (0, -1)}
+
+def relative(heading, turn):
+    """Absolute direction after turning from heading (turn: 0 ahead, 1 right, 2 back, 3 left)."""
+    return DIR_NAMES[(DIR_CODES[heading] + turn) % 4]
+
+class VirtualMouse:
+    def __init__(self, maze, start=None, heading='N', sensors=(0, 1, 3)):
+        """
+        :param maze: Maze object holding the true walls.
+        :param start: Start cell (row, col); defaults to the bottom-left corner.
+        :param heading: Initial heading ('N', 'E', 'S' or 'W').
+        :param sensors: Which sides are sensed, relative to the heading (0 ahead, 1 right, 2 back, 3 left).
+        """
+        self.maze = maze
+        self.cell = start if start is not None else (maze.height - 1, 0)
+        self.heading = heading
+        self.sensors = sensors
+        self.steps = 0
+        self.turns = 0
+        self.visited = {self.cell}
+
+    def sense(self):
+        """Walls seen from the current cell, e.g. {'N': True, 'E': False, 'W': True}."""
+        r, c = self.cell
+        walls = {}
+        for turn in self.sensors:
+            direction = relative(self.heading, turn)
+            walls[direction] = not self.maze.is_open(r, c, direction)
+        return walls
+
+    def move(self, direction):
+        """Move one cell in an absolute direction; raises if the true maze has a wall there."""
+        r, c = self.cell
+        if not self.maze.is_open(r, c, direction):
+            raise RuntimeError("mouse drove into a wall at %s going %s" % ((r, c), direction))
+        if direction != self.heading:
+            self.turns += 1
+        dr, dc = _OFFSETS[direction]
+        self.cell = (r + dr, c + dc)
+        self.heading = direction
+        self.steps += 1
+        self.visited.add(self.cell)
+
+def choose_direction(maze, distance, cell, heading):
+    """
+    Pick the open neighbour with the smallest distance, preferring to keep going straight.
+    :param distance: function (r, c) -> distance to the goal.
+    """
+    r, c = cell
+    best, best_d = None, None
+    for direction in (heading, relative(heading, 1), relative(heading, 3), relative(heading, 2)):
+        if maze.is_open(r, c, direction):
+            dr, dc = _OFFSETS[direction]
+            d = distance(r + dr, c + dc)
+            if best_d is None or d < best_d:
+                best, best_d = direction, d
+    return best
+
+class FullFloodSolver:
+    """Recomputes the whole flood map every step (update_flood_map)."""
+    name = 'full'
+
+    def __init__(self, width, height, goal):
+        self.maze = Maze(width, height)
+        self.goal = goal
+        self.dist = flood_fill(self.maze, goal)
+
+    def step(self, cell, heading, sensor_walls):
+        """Take in the walls seen from cell and return the direction to move next."""
+        self.dist = update_flood_map(self.maze, cell, sensor_walls, self.goal)
+        dist = self.dist
+        return choose_direction(self.maze, lambda r, c: dist[r][c], cell, heading)
+
+class IncrementalFloodSolver:
+    """Keeps a FloodFill and only repairs what the new walls change."""
+    name = 'incremental'
+
+    def __init__(self, width, height, goal):
+        self.flood = FloodFill(Maze(width, height), goal)
+        self.maze = self.flood.maze
+
+    def step(self, cell, heading, sensor_walls):
+        self.flood.update(cell, sensor_walls)
+        return choose_direction(self.maze, self.flood.distance, cell, heading)
+
+SOLVERS = {
+    FullFloodSolver.name: FullFloodSolver,
+    IncrementalFloodSolver.name: IncrementalFloodSolver,
+}
@@ -0,0 +1,76 @@
+# plant.py
+# Host-side plant model of the differential drive: two DC motors behind TB6612
+# PWM, first-order wheel dynamics, a traction (acceleration) limit and optional
+# sensor noise. It has the MotorDriver interface (set_motor / stop), so
+# controllers can drive it directly instead of the real H-bridge.
+import math
+import random
+
+class DiffDrivePlant:
+    def __init__(self, track_mm=70.0, free_speed=1500.0, tau=0.05, max_accel=8000.0,
+                 left_gain=1.0, right_gain=1.0, noise=0.0, seed=None):
+        """
+        :param track_mm: Distance between the wheels.
+        :param free_speed: Wheel speed (mm/s) at full PWM (65535) without load.
+        :param tau: Motor time constant in seconds.
+        :param max_accel: Traction limit of each wheel in mm/s^2; above it the wheel slips.
+        :param left_gain, right_gain: Motor mismatch factors (1.0 = nominal).
+        :param noise: Standard deviation of encoder velocity / gyro noise (relative).
+        """
+        self.track_mm = track_mm
+        self.free_speed = free_speed
+        self.tau = tau
+        self.max_accel = max_accel
+        self.gain = {"left": left_gain, "right": right_gain}
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.pwm = {"left": 0, "right": 0}
+        self.reset()
+
+    def reset(self):
+        self.v = {"left": 0.0, "right": 0.0}
+        self.x = self.y = self.heading = 0.0
+        self.distance = 0.0
+        self.wheel_mm = {"left": 0.0, "right": 0.0}
+        self.time = 0.0
+
+    # MotorDriver interface
+    def set_motor(self, side, speed):
+        if side not in self.pwm:
+            raise ValueError("Invalid motor side")
+        self.pwm[side] = max(-65535, min(65535, speed))
+
+    def stop(self):
+        self.pwm["left"] = self.pwm["right"] = 0
+
+    def step(self, dt):
+        """Advance the model by dt seconds."""
+        for side in ("left", "right"):
+            target = self.pwm[side] / 65535 * self.free_speed * self.gain[side]
+            dv = (target - self.v[side]) / self.tau * dt
+            limit = self.max_accel * dt
+            dv = max(-limit, min(limit, dv))  # wheel slips instead of accelerating harder
+            self.v[side] += dv
+            self.wheel_mm[side] += self.v[side] * dt
+        v = (self.v["left"] + self.v["right"]) / 2
+        w = (self.v["right"] - self.v["left"]) / self.track_mm
+        self.x += v * math.cos(self.heading) * dt
+        self.y += v * math.sin(self.heading) * dt
+        self.heading += w * dt
+        self.distance += v * dt
+        self.time += dt
+
+    def _noisy(self, value, scale):
+        if not self.noise:
+            return value
+        return value + self.rng.gauss(0.0, self.noise * scale)
+
+    def wheel_velocities(self):
+        """Encoder-derived (left, right) wheel velocity in mm/s."""
+        return (self._noisy(self.v["left"], self.free_speed),
+                self._noisy(self.v["right"], self.free_speed))
+
+    def yaw_rate(self):
+        """Gyro yaw rate in rad/s, counter-clockwise positive."""
+        w = (self.v["right"] - self.v["left"]) / self.track_mm
+        return self._noisy(w, self.free_speed / self.track_mm)
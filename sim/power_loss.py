@@ -0,0 +1,127 @@
+# power_loss.py
+# Power-loss test for utils.maze_store. A reference flood search journals every
+# explored cell. The same search is then repeated once for every byte of that
+# write stream, with the power cut at exactly that byte: the write in flight is
+# torn and nothing after it happens. After every cut the store is loaded again.
+# It must hold a state the mouse really had, no older than the last completed
+# sweep, and a flood map equal to a fresh flood of the restored walls. The mouse
+# then resumes from the start cell and has to reach the goal.
+#
+#   python -m sim.power_loss [--size 8] [--seed 0] [--journal 16]
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from algorithm.floodfill import flood_fill_flat
+from algorithm.maze import sensor_masks
+from sim.maze_files import random_maze, centre_goal
+from sim.mouse import VirtualMouse, choose_direction
+from utils.maze_store import MazeStore, RECORD_SIZE
+
+class PowerCut(Exception):
+    pass
+
+class CuttingStore(MazeStore):
+    """MazeStore that loses power after `budget` more bytes have been written."""
+
+    def __init__(self, path, journal_max, budget):
+        super().__init__(path, journal_max)
+        self.budget = budget
+
+    def _write(self, f, data):
+        if len(data) > self.budget:
+            f.write(bytes(data)[:self.budget])
+            f.flush()
+            raise PowerCut()
+        self.budget -= len(data)
+        super()._write(f, data)
+
+    def _replace(self, src, dst):
+        if self.budget == 0:
+            raise PowerCut()
+        super()._replace(src, dst)
+
+def search(maze, goal, store, states=None):
+    """Flood search from the start cell to the goal on store.flood. :return: cells driven."""
+    flood = store.flood
+    known = flood.maze
+    mouse = VirtualMouse(maze)
+    goal_set = set(goal)
+    while True:
+        r, c = mouse.cell
+        store.observe(known.index(r, c), *sensor_masks(mouse.sense()))
+        if states is not None:
+            states.append((bytes(known.walls), bytes(known.seen)))
+        if mouse.cell in goal_set:
+            return mouse.steps
+        mouse.move(choose_direction(known, flood.distance, mouse.cell, mouse.heading))
+
+def main():
+    parser = argparse.ArgumentParser(description="Power-loss test of utils.maze_store")
+    parser.add_argument('--size', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--journal', type=int, default=16, help="journal records per snapshot")
+    args = parser.parse_args()
+    maze = random_maze(args.size, args.seed)
+    goal = centre_goal(maze.width, maze.height)
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'maze')
+    try:
+        # Reference run: the state after every sweep, and the size of the write stream
+        store = MazeStore(path, args.journal)
+        flood = store.load(maze.width, maze.height, goal)
+        states = [(bytes(flood.maze.walls), bytes(flood.maze.seen))]
+        t0 = time.perf_counter()
+        fresh_steps = search(maze, goal, store, states)
+        per_cell = (time.perf_counter() - t0) / len(states) * 1e6
+        store.close()
+        total = store.bytes_written
+        print("%dx%d maze: %d cells driven, %d sweeps, %d bytes written (%d byte records, "
+              "%d snapshots), %.0f us per sweep" % (
+                  maze.width, maze.height, fresh_steps, len(states) - 1, total,
+                  RECORD_SIZE, store.checkpoints, per_cell))
+
+        failures = 0
+        resumed_steps = 0
+        loads = []
+        for cut in range(total + 1):
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            cutting = CuttingStore(path, args.journal, cut)
+            cutting.load(maze.width, maze.height, goal)
+            run = [states[0]]
+            try:
+                search(maze, goal, cutting, run)
+            except PowerCut:
+                pass
+            in_flight = len(run)  # sweeps completed + 1
+            cutting.close()
+
+            t0 = time.perf_counter()
+            restored = MazeStore(path, args.journal)
+            flood = restored.load(maze.width, maze.height, goal)
+            loads.append((time.perf_counter() - t0) * 1e6)
+            state = (bytes(flood.maze.walls), bytes(flood.maze.seen))
+            allowed = states[in_flight - 1:in_flight + 1]
+            problem = None
+            if state not in allowed:
+                problem = "restored state is not the one before or after the cut sweep"
+            elif list(flood.dist) != list(flood_fill_flat(flood.maze, goal)):
+                problem = "restored flood map does not match the restored walls"
+            else:
+                steps = search(maze, goal, restored)
+                resumed_steps = max(resumed_steps, steps)
+            restored.close()
+            if problem:
+                failures += 1
+                print("cut at byte %d (sweep %d): %s" % (cut, in_flight, problem))
+        loads.sort()
+        print("%d power cuts, %d failures; load median %.0f us, max %.0f us; resumed searches "
+              "drive at most %d cells (fresh search %d)" % (
+                  total + 1, failures, loads[len(loads) // 2], loads[-1], resumed_steps, fresh_steps))
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# robot.py
+# Physics model of the complete mouse in a maze, for end-to-end runs on the
+# host: DC motors driven by the TB6612 PWM duty, wheel inertia and traction
+# (wheels slip above the friction limit), chassis mass and yaw inertia,
+# ray-cast ToF sensors against the maze walls, and AS5600 / gyro readings with
+# noise. It can be driven two ways:
+#   - directly: set_motor / stop (the MotorDriver interface) plus encoder_counts(),
+#     gyro_z() and tof(), which is what the fast batch runs in sim/competition.py use
+#   - through hal: attach() reads the PWM and direction pins that drivers.tb6612
+#     drives and feeds the simulated AS5600, MPU6500 and VL6180X devices, so the
+#     unmodified drivers in main.py talk to it over the simulated I2C bus.
+# World frame: x east, y north in mm, origin at the south-west maze corner,
+# heading in rad CCW from east. Cell (r, c) has row 0 at the north edge.
+import math
+import random
+from algorithm.maze import NORTH, EAST, SOUTH, WEST
+
+CELL_MM = 180.0
+WALL_MM = 12.0
+TOF_MAX_MM = 255  # VL6180X range register is 8 bit
+
+# (name, forward mm, left mm, angle rad CCW) of each ToF sensor relative to the centre,
+# named like config.TOF['sensors']
+TOF_MOUNTS = (
+    ('left', 20.0, 25.0, math.pi / 2),
+    ('front', 40.0, 0.0, 0.0),
+    ('right', 20.0, -25.0, -math.pi / 2),
+    ('diagonal', 35.0, 20.0, math.pi / 4),
+)
+
+def cell_centre(maze, r, c):
+    """World (x, y) of the centre of cell (r, c)."""
+    return (c + 0.5) * CELL_MM, (maze.height - r - 0.5) * CELL_MM
+
+def heading_angle(direction):
+    """Heading in rad of a direction code (NORTH, EAST, ...)."""
+    return (math.pi / 2, 0.0, -math.pi / 2, math.pi)[direction]
+
+class VirtualRobot:
+    def __init__(self, maze, mass=0.1, track_mm=70.0, wheel_diameter=35.0, free_speed=1500.0,
+                 tau=0.05, mu=0.82, inertia_factor=0.8, wheel_inertia=0.004, body_radius=40.0,
+                 left_gain=1.0, right_gain=1.0, gyro_bias=0.005, gyro_noise=0.01,
+                 encoder_noise=0.5, tof_noise=2.0, seed=None):
+        """
+        :param maze: Maze object with the true walls.
+        :param mass: Mouse mass in kg (forces are in kg mm / s^2).
+        :param track_mm: Distance between the wheel contact points.
+        :param wheel_diameter: Wheel diameter in mm (AS5600 counts 4096 per turn).
+        :param free_speed: Wheel speed (mm/s) at full duty without load.
+        :param tau: Motor + chassis time constant while the wheels grip; with free_speed this
+                    sets the stall force, matching the feedforward in velocity_control.
+        :param mu: Tyre friction coefficient; each wheel carries half the weight.
+        :param inertia_factor: Yaw inertia as a fraction of mass * (track / 2)^2.
+        :param wheel_inertia: Rotor + wheel inertia reflected to the tyre, in kg (only matters while slipping).
+        :param body_radius: Distance from the centre to the body edge, for wall collisions.
+        :param left_gain, right_gain: Motor mismatch factors.
+        :param gyro_bias: Gyro z offset in rad/s.
+        :param gyro_noise, encoder_noise, tof_noise: Noise standard deviations (rad/s, counts, mm).
+        """
+        self.maze = maze
+        self.mass = mass
+        self.track_mm = track_mm
+        self.mm_per_count = math.pi * wheel_diameter / 4096
+        self.free_speed = free_speed
+        self.stall_force = mass / 2 * free_speed / tau  # per wheel
+        self.grip_force = mu * 9810.0 * mass / 2
+        self.inertia = inertia_factor * mass * (track_mm / 2) ** 2
+        self.wheel_inertia = wheel_inertia
+        self.body_radius = body_radius
+        self.gain = (left_gain, right_gain)
+        self.gyro_bias = gyro_bias
+        self.gyro_noise = gyro_noise
+        self.encoder_noise = encoder_noise
+        self.tof_noise = tof_noise
+        self.rng = random.Random(seed)
+        self.duty = [0.0, 0.0]
+        self.devices = None
+        self.place(maze.height - 1, 0, NORTH)
+
+    def place(self, r, c, direction):
+        """Put the mouse at rest in the centre of cell (r, c) facing a direction code."""
+        self.x, self.y = cell_centre(self.maze, r, c)
+        self.heading = heading_angle(direction)
+        self.v = self.w = 0.0
+        self.wheel_v = [0.0, 0.0]     # tyre surface speed
+        self.wheel_mm = [0.0, 0.0]    # tyre travel, what the encoders see
+        self.slipping = [False, False]
+        self.time = 0.0
+        self.crashed = False
+
+    # MotorDriver interface
+    def set_motor(self, side, speed):
+        if side == "left":
+            self.duty[0] = max(-65535, min(65535, speed)) / 65535
+        elif side == "right":
+            self.duty[1] = max(-65535, min(65535, speed)) / 65535
+        else:
+            raise ValueError("Invalid motor side")
+
+    def stop(self):
+        self.duty[0] = self.duty[1] = 0.0
+
+    def step(self, dt):
+        """Advance the physics by dt seconds (1 ms or less)."""
+        half = self.track_mm / 2
+        ground = (self.v - self.w * half, self.v + self.w * half)
+        force = [0.0, 0.0]
+        kinetic = 0.9 * self.grip_force
+        for i in (0, 1):
+            u = self.wheel_v[i]
+            motor = self.stall_force * (self.duty[i] * self.gain[i] - u / self.free_speed)
+            if not self.slipping[i]:
+                if -self.grip_force <= motor <= self.grip_force:
+                    force[i] = motor  # tyre grips: the motor drives the chassis directly
+                    continue
+                self.slipping[i] = True
+            slip = u - ground[i]
+            direction = 1.0 if slip > 0 or (slip == 0 and motor > 0) else -1.0
+            force[i] = direction * kinetic
+            u += (motor - force[i]) / self.wheel_inertia * dt
+            # tyre speed meets the ground speed again and the motor is within the grip limit
+            if (u - ground[i]) * direction <= 1.0 and -self.grip_force <= motor <= self.grip_force:
+                self.slipping[i] = False
+            self.wheel_v[i] = u
+
+        self.v += (force[0] + force[1]) / self.mass * dt
+        self.w += (force[1] - force[0]) * half / self.inertia * dt
+        mid = self.heading + 0.5 * self.w * dt
+        self.x += self.v * math.cos(mid) * dt
+        self.y += self.v * math.sin(mid) * dt
+        self.heading += self.w * dt
+        for i in (0, 1):
+            if not self.slipping[i]:
+                self.wheel_v[i] = self.v + (self.w * half if i else -self.w * half)
+            self.wheel_mm[i] += self.wheel_v[i] * dt
+        self.time += dt
+        if not self.crashed:
+            self._check_walls()
+
+    def _check_walls(self):
+        maze = self.maze
+        col = int(self.x // CELL_MM)
+        row = maze.height - 1 - int(self.y // CELL_MM)
+        if not (0 <= row < maze.height and 0 <= col < maze.width):
+            self.crashed = True
+            return
+        walls = maze.walls[row * maze.width + col]
+        lx = self.x - col * CELL_MM
+        ly = self.y - (maze.height - 1 - row) * CELL_MM
+        m = self.body_radius + WALL_MM / 2
+        if ((walls & 8 and lx < m) or (walls & 2 and lx > CELL_MM - m)
+                or (walls & 4 and ly < m) or (walls & 1 and ly > CELL_MM - m)):
+            self.crashed = True
+
+    def cell(self):
+        """(row, col) the centre of the mouse is in."""
+        return self.maze.height - 1 - int(self.y // CELL_MM), int(self.x // CELL_MM)
+
+    # Sensors
+    def encoder_counts(self):
+        """(left, right) AS5600 raw counts, 0..4095."""
+        k, n = self.mm_per_count, self.encoder_noise
+        return (int(round(self.wheel_mm[0] / k + self.rng.gauss(0, n))) & 0x0FFF,
+                int(round(self.wheel_mm[1] / k + self.rng.gauss(0, n))) & 0x0FFF)
+
+    def gyro_z(self):
+        """Gyro yaw rate in rad/s, CCW positive, with offset and noise."""
+        return self.w + self.gyro_bias + self.rng.gauss(0, self.gyro_noise)
+
+    def tof(self, index):
+        """Range in mm of TOF_MOUNTS[index], clipped to the sensor range."""
+        _, fwd, left, angle = TOF_MOUNTS[index]
+        c, s = math.cos(self.heading), math.sin(self.heading)
+        d = self.ray(self.x + fwd * c - left * s, self.y + fwd * s + left * c, self.heading + angle)
+        d += self.rng.gauss(0, self.tof_noise)
+        return int(max(0, min(TOF_MAX_MM, d)))
+
+    def ray(self, ox, oy, angle, max_range=TOF_MAX_MM):
+        """Distance from (ox, oy) along angle to the first wall face (grid traversal over cell edges)."""
+        maze = self.maze
+        dx, dy = math.cos(angle), math.sin(angle)
+        col = int(ox // CELL_MM)
+        row_up = int(oy // CELL_MM)  # rows counted from the south edge
+        if not (0 <= col < maze.width and 0 <= row_up < maze.height):
+            return 0.0
+        inf = float('inf')
+        if dx > 1e-9:
+            step_x, t_x, dt_x = 1, ((col + 1) * CELL_MM - ox) / dx, CELL_MM / dx
+        elif dx < -1e-9:
+            step_x, t_x, dt_x = -1, (col * CELL_MM - ox) / dx, -CELL_MM / dx
+        else:
+            step_x, t_x, dt_x = 0, inf, inf
+        if dy > 1e-9:
+            step_y, t_y, dt_y = 1, ((row_up + 1) * CELL_MM - oy) / dy, CELL_MM / dy
+        elif dy < -1e-9:
+            step_y, t_y, dt_y = -1, (row_up * CELL_MM - oy) / dy, -CELL_MM / dy
+        else:
+            step_y, t_y, dt_y = 0, inf, inf
+        walls, width, top = maze.walls, maze.width, maze.height - 1
+        half = WALL_MM / 2
+        while True:
+            if t_x < t_y:
+                if t_x - half / abs(dx) > max_range:
+                    return max_range
+                if walls[(top - row_up) * width + col] & (1 << (EAST if step_x > 0 else WEST)):
+                    return max(0.0, t_x - half / abs(dx))
+                col += step_x
+                t_x += dt_x
+            else:
+                if t_y - half / abs(dy) > max_range:
+                    return max_range
+                if walls[(top - row_up) * width + col] & (1 << (NORTH if step_y > 0 else SOUTH)):
+                    return max(0.0, t_y - half / abs(dy))
+                row_up += step_y
+                t_y += dt_y
+
+    # hal integration
+    def attach(self, devices, rate_hz=1000, tof_every=10):
+        """
+        Drive the robot from the simulated board: a 1 kHz virtual timer reads the
+        TB6612 pins (config.MOTOR_PINS) and updates the device models that
+        board.populate() fitted ('encoder' = left wheel, optional 'encoder_right',
+        'imu' and one ToF device per TOF_MOUNTS name).
+        :return: the hal Timer running the physics.
+        """
+        import config
+        from hal import Timer, board
+        pins = config.MOTOR_PINS
+        self.devices = devices
+        dt = 1.0 / rate_hz
+        count = [0]
+
+        def side_duty(in1, in2, pwm):
+            p = board.pwms.get(pwm)
+            if p is None or not board.levels.get(pins['stby'], 0):
+                return 0.0
+            # TB6612: IN1 high / IN2 low forward, low / high reverse, both high brake
+            a, b = board.levels.get(in1, 0), board.levels.get(in2, 0)
+            if a == b:
+                return 0.0
+            return p.duty_u16() / 65535 * (1 if a else -1)
+
+        def tick(timer):
+            self.duty[0] = side_duty(pins['ain1'], pins['ain2'], pins['pwma'])
+            self.duty[1] = side_duty(pins['bin1'], pins['bin2'], pins['pwmb'])
+            self.step(dt)
+            self._refresh(count[0] % tof_every == 0)
+            count[0] += 1
+
+        timer = Timer(-1)
+        timer.init(freq=rate_hz, callback=tick)
+        self._refresh(True)
+        return timer
+
+    def _refresh(self, tof):
+        devices = self.devices
+        left, right = self.encoder_counts()
+        if 'encoder' in devices:
+            devices['encoder'].set_counts(left)
+        if 'encoder_right' in devices:
+            devices['encoder_right'].set_counts(right)
+        imu = devices.get('imu')
+        if imu is not None:
+            so = (131.0, 65.5, 32.8, 16.4)[(imu.regs[0x1B] >> 3) & 3]
+            raw = int(math.degrees(self.gyro_z()) * so)
+            imu.set_sample((0, 0, 16384), 0, (0, 0, max(-32768, min(32767, raw))))
+        if tof:
+            for i, (name, _, _, _) in enumerate(TOF_MOUNTS):
+                if name in devices:
+                    devices[name].distance_mm = self.tof(i)
@@ -1,4 +1,9 @@
-import uio
+try:
+    import uio
+    import ustruct as struct
+except ImportError:  # CPython host
+    import io as uio
+    import struct
 
 class DataLogger:
     def __init__(self):
@@ -15,4 +20,211 @@ class DataLogger:
     def save(self, filename='log.csv'):
         with open(filename, 'w') as f:
             f.write(self.buffer.getvalue())
-        self.buffer.close()
\ No newline at end of file
+        self.buffer.close()
+
+# Binary log file: MAGIC, format length (1 byte), struct format, names length
+# (2 bytes, little endian), comma separated field names, then packed records.
+MAGIC = b'MMLG'
+
+class BinaryLogger:
+    """
+    Fixed-schema logger for the control loop. Records are packed with struct into
+    a preallocated ring of blocks, so memory stays bounded and no text is
+    formatted while driving. Full blocks are written to flash by flush(), which
+    is meant to run from a low-priority task (e.g. a utils.scheduler task at a
+    few Hz) rather than from the loop that calls log(). When flash cannot keep
+    up the ring stays full and new records are counted in `dropped`.
+    """
+
+    def __init__(self, fields, fmt=None, filename='log.bin', block_records=64, blocks=4):
+        """
+        :param fields: Field names, e.g. ('time', 'raw_angle', 'angle', 'speed', 'distance').
+        :param fmt: struct format of one record, e.g. '<Ihfff' (default: a float per field).
+        :param filename: Binary log file, created (truncated) on construction.
+        :param block_records: Records per block (one flash write).
+        :param blocks: Blocks in the ring.
+        """
+        self.fields = tuple(fields)
+        self.fmt = fmt or '<' + 'f' * len(self.fields)
+        self.record_size = struct.calcsize(self.fmt)
+        self.block_size = self.record_size * block_records
+        self.blocks = blocks
+        self.buffer = bytearray(self.block_size * blocks)
+        self._view = memoryview(self.buffer)
+        self.head = 0          # write offset in buffer
+        self.filled = 0        # full blocks waiting for flush
+        self.tail_block = 0    # next block to flush
+        self.records = 0
+        self.dropped = 0
+        self.file = open(filename, 'wb')
+        names = ','.join(self.fields).encode()
+        self.file.write(MAGIC + bytes([len(self.fmt)]) + self.fmt.encode()
+                        + bytes([len(names) & 0xFF, len(names) >> 8]) + names)
+
+    def log(self, *values):
+        """Append one record; values in field order."""
+        if self.filled == self.blocks:
+            self.dropped += 1
+            return
+        struct.pack_into(self.fmt, self.buffer, self.head, *values)
+        self.head += self.record_size
+        self.records += 1
+        if self.head % self.block_size == 0:
+            self.filled += 1
+            if self.head == len(self.buffer):
+                self.head = 0
+
+    def flush(self, max_blocks=1):
+        """
+        Write up to max_blocks full blocks to the file.
+        :return: Number of blocks written.
+        """
+        written = 0
+        while self.filled and written < max_blocks:
+            start = self.tail_block * self.block_size
+            self.file.write(self._view[start:start + self.block_size])
+            self.tail_block = (self.tail_block + 1) % self.blocks
+            self.filled -= 1
+            written += 1
+        return written
+
+    def close(self):
+        """Write everything including the partial block and close the file."""
+        self.flush(self.blocks)
+        start = self.tail_block * self.block_size
+        if self.head > start:
+            self.file.write(self._view[start:self.head])
+        self.file.close()
+
+def read_header(f):
+    """Read the header of a binary log: returns (fields, fmt)."""
+    if f.read(4) != MAGIC:
+        raise ValueError("not a binary log file")
+    fmt = f.read(f.read(1)[0]).decode()
+    size = f.read(2)
+    fields = tuple(f.read(size[0] | size[1] << 8).decode().split(','))
+    return fields, fmt
+
+def read_binary_log(filename):
+    """
+    Decode a BinaryLogger file (host side).
+    :return: (fields, list of record tuples).
+    """
+    with open(filename, 'rb') as f:
+        fields, fmt = read_header(f)
+        data = f.read()
+    size = struct.calcsize(fmt)
+    usable = len(data) - len(data) % size  # ignore a torn last record
+    return fields, [struct.unpack_from(fmt, data, off) for off in range(0, usable, size)]
+
+def binary_log_to_csv(filename, csv_filename):
+    """Convert a binary log into the same CSV layout DataLogger writes."""
+    fields, records = read_binary_log(filename)
+    with open(csv_filename, 'w') as f:
+        f.write(','.join(fields) + '\n')
+        for record in records:
+            f.write(','.join(map(str, record)) + '\n')
+    return len(records)
+
+# struct codes (standard sizes) -> NumPy dtype codes of the same size
+_NUMPY_CODES = {'b': 'i1', 'B': 'u1', '?': 'b1', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4',
+                'l': 'i4', 'L': 'u4', 'q': 'i8', 'Q': 'u8', 'e': 'f2', 'f': 'f4', 'd': 'f8'}
+
+def _numpy_codes(fmt):
+    """Byte order and one NumPy dtype code per field of a record format, repeat counts expanded."""
+    if not fmt or fmt[0] not in '<>!=':
+        raise ValueError("record format %r: native alignment ('@' or no prefix) is not supported" % fmt)
+    order = '>' if fmt[0] == '!' else fmt[0]
+    codes, count = [], ''
+    for c in fmt[1:]:
+        if c.isdigit():
+            count += c
+            continue
+        if c not in _NUMPY_CODES:
+            raise ValueError("record format %r: unsupported code %r" % (fmt, c))
+        codes.extend([order + _NUMPY_CODES[c]] * int(count or 1))
+        count = ''
+    return codes
+
+def binary_log_to_numpy(filename):
+    """Load a binary log as a NumPy structured array (host side, needs numpy)."""
+    import numpy as np
+    with open(filename, 'rb') as f:
+        fields, fmt = read_header(f)
+        offset = f.tell()
+    codes = _numpy_codes(fmt)
+    if len(codes) != len(fields):
+        raise ValueError("record format %r has %d fields, the header names %d" % (fmt, len(codes), len(fields)))
+    dtype = np.dtype(list(zip(fields, codes)))
+    if dtype.itemsize != struct.calcsize(fmt):
+        raise ValueError("record format %r: dtype of %d bytes for %d byte records" % (
+            fmt, dtype.itemsize, struct.calcsize(fmt)))
+    return np.fromfile(filename, dtype=dtype, offset=offset)
+
+# Decoder and benchmark
+#   python -m utils.data_logger decode log.bin log.csv
+#   python -m utils.data_logger bench
+if __name__ == "__main__":
+    import sys
+    import gc
+    import time
+    if len(sys.argv) == 4 and sys.argv[1] == 'decode':
+        print("%d records written to %s" % (binary_log_to_csv(sys.argv[2], sys.argv[3]), sys.argv[3]))
+        sys.exit(0)
+
+    try:
+        ticks_us, ticks_diff = time.ticks_us, time.ticks_diff
+    except AttributeError:
+        ticks_us = lambda: int(time.perf_counter() * 1000000)
+        ticks_diff = lambda a, b: a - b
+
+    def measure(make, log, finish, n=5000):
+        gc.collect()
+        try:
+            import tracemalloc
+            tracemalloc.start()
+            mem = lambda: tracemalloc.get_traced_memory()[1]
+        except ImportError:  # MicroPython
+            base = gc.mem_alloc()
+            mem = lambda: gc.mem_alloc() - base
+        logger = make()
+        t0 = ticks_us()
+        for i in range(n):
+            log(logger, i)
+        elapsed = ticks_diff(ticks_us(), t0)
+        peak = mem()
+        finish(logger)
+        try:
+            tracemalloc.stop()
+        except NameError:
+            pass
+        return elapsed / n, peak
+
+    fields = ('distance', 'angle', 'raw_angle', 'time', 'speed')
+
+    def csv_log(logger, i):
+        logger.log(distance=i * 0.027, angle=37.96875, raw_angle=432, time=798681 + i, speed=-0.0095)
+
+    def bin_log(logger, i):
+        logger.log(i * 0.027, 37.96875, 432, 798681 + i, -0.0095)
+        if i % 64 == 63:
+            logger.flush()  # stands in for the background flush task
+
+    try:
+        import os
+        import tempfile
+        folder = tempfile.mkdtemp()
+        csv_name, bin_name = os.path.join(folder, 'bench_log.csv'), os.path.join(folder, 'bench_log.bin')
+    except ImportError:  # MicroPython: the board's working directory
+        csv_name, bin_name = 'bench_log.csv', 'bench_log.bin'
+    us_csv, peak_csv = measure(DataLogger, csv_log, lambda l: l.save(csv_name))
+    us_bin, peak_bin = measure(lambda: BinaryLogger(fields, '<ffhIf', bin_name), bin_log,
+                               lambda l: l.close())
+    print("DataLogger (CSV text): %6.2f us/record, peak %7d bytes" % (us_csv, peak_csv))
+    print("BinaryLogger (ring):   %6.2f us/record, peak %7d bytes" % (us_bin, peak_bin))
+    fields, records = read_binary_log(bin_name)
+    print("decoded %d records, first %s" % (len(records), records[0]))
+    if bin_name != 'bench_log.bin':
+        for name in (csv_name, bin_name):
+            os.remove(name)
+        os.rmdir(folder)
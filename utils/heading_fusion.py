@@ -0,0 +1,149 @@
+import math
+
+HALF_PI = math.pi / 2
+TWO_PI = 2 * math.pi
+
+def wrap_angle(a):
+    """Wrap an angle to -pi..pi."""
+    while a > math.pi:
+        a -= TWO_PI
+    while a < -math.pi:
+        a += TWO_PI
+    return a
+
+def wall_angle(d0, d1, travelled):
+    """
+    Heading relative to a side wall from two side ToF readings (mm) taken
+    `travelled` mm apart. Positive when the mouse turns away from the wall on its
+    right (CCW); flip the sign for a wall on the left.
+    """
+    return math.atan2(d1 - d0, travelled)
+
+class HeadingEstimator:
+    """
+    Complementary filter for the heading. The gyro drives the estimate at the
+    control rate. Encoder yaw rate is low-frequency truth while the wheels grip,
+    so the difference between the two slowly learns the gyro bias (skipped while
+    they disagree by more than slip_rate, i.e. wheel slip). Side-wall alignment
+    pulls the heading towards the maze axis plus the measured wall angle.
+    The pose (x, y in mm) is integrated from the encoder distance along the fused
+    heading. update() is a fixed sequence of float operations (no loops, no
+    containers), so it runs in a constant time at 1 kHz.
+    """
+
+    def __init__(self, bias_gain=0.5, slip_rate=0.5, wall_gain=0.2):
+        """
+        :param bias_gain: Bias learning rate in 1/s (time constant 1/bias_gain).
+        :param slip_rate: Gyro vs encoder disagreement (rad/s) treated as wheel slip.
+        :param wall_gain: Fraction of the wall alignment error removed per observation.
+        """
+        self.bias_gain = bias_gain
+        self.slip_rate = slip_rate
+        self.wall_gain = wall_gain
+        self.reset()
+
+    def reset(self, heading=0.0, x=0.0, y=0.0):
+        self.heading = heading
+        self.x, self.y = x, y
+        self.bias = 0.0
+        self.rate = 0.0
+
+    def update(self, gyro_z, enc_rate, enc_distance, dt):
+        """
+        One fusion step.
+        :param gyro_z: Raw gyro yaw rate in rad/s (CCW positive, offset not removed).
+        :param enc_rate: Encoder yaw rate in rad/s ((v_right - v_left) / track).
+        :param enc_distance: Distance travelled by the centre since the last step in mm.
+        :param dt: Time step in seconds.
+        :return: Heading in rad (unwrapped).
+        """
+        rate = gyro_z - self.bias
+        error = rate - enc_rate
+        if -self.slip_rate < error < self.slip_rate:
+            self.bias += self.bias_gain * error * dt
+        mid = self.heading + 0.5 * rate * dt
+        self.heading += rate * dt
+        self.rate = rate
+        self.x += enc_distance * math.cos(mid)
+        self.y += enc_distance * math.sin(mid)
+        return self.heading
+
+    def align(self, angle, gain=None):
+        """
+        Side-wall observation: the mouse is `angle` rad off the wall it is following,
+        and the wall runs along the nearest maze axis.
+        """
+        axis = round(self.heading / HALF_PI) * HALF_PI
+        error = axis + angle - self.heading
+        self.heading += (self.wall_gain if gain is None else gain) * error
+
+class HeadingEKF:
+    """
+    Two-state Kalman filter over (heading, gyro bias). The gyro is the process
+    input; encoder yaw rate and wall alignment are scalar measurements, so every
+    step is a handful of scalar multiplies on the 2x2 covariance (p00, p01, p11),
+    no matrices are allocated. Same interface as HeadingEstimator.
+    """
+
+    def __init__(self, gyro_noise=0.01, bias_walk=0.0005, enc_noise=0.05, wall_noise=0.03,
+                 slip_rate=0.5):
+        """
+        :param gyro_noise: Gyro rate noise density (rad/s / sqrt(Hz)).
+        :param bias_walk: Gyro bias random walk (rad/s / sqrt(s)).
+        :param enc_noise: Encoder yaw rate noise (rad/s) at each update.
+        :param wall_noise: Wall angle noise (rad) per observation.
+        :param slip_rate: Innovation (rad/s) above which an encoder rate is rejected as slip.
+        """
+        self.q_heading = gyro_noise * gyro_noise
+        self.q_bias = bias_walk * bias_walk
+        self.r_enc = enc_noise * enc_noise
+        self.r_wall = wall_noise * wall_noise
+        self.slip_rate = slip_rate
+        self.reset()
+
+    def reset(self, heading=0.0, x=0.0, y=0.0):
+        self.heading = heading
+        self.x, self.y = x, y
+        self.bias = 0.0
+        self.rate = 0.0
+        self.p00, self.p01, self.p11 = 0.0, 0.0, 0.01
+
+    def update(self, gyro_z, enc_rate, enc_distance, dt):
+        """Same as HeadingEstimator.update()."""
+        # Predict: heading += (gyro - bias) dt, F = [[1, -dt], [0, 1]]
+        rate = gyro_z - self.bias
+        mid = self.heading + 0.5 * rate * dt
+        self.heading += rate * dt
+        p01 = self.p01 - dt * self.p11
+        self.p00 += dt * (self.q_heading - 2 * self.p01 + dt * self.p11)
+        self.p01 = p01
+        self.p11 += self.q_bias * dt
+        self.x += enc_distance * math.cos(mid)
+        self.y += enc_distance * math.sin(mid)
+
+        # Encoder rate measurement: z = gyro - bias, H = [0, -1]
+        y = enc_rate - rate
+        if -self.slip_rate < y < self.slip_rate:
+            s = self.p11 + self.r_enc
+            k0, k1 = -self.p01 / s, -self.p11 / s
+            self.heading += k0 * y
+            self.bias += k1 * y
+            p00, p01, p11 = self.p00, self.p01, self.p11
+            self.p00 = p00 + k0 * p01
+            self.p01 = p01 + k0 * p11
+            self.p11 = p11 + k1 * p11
+        self.rate = gyro_z - self.bias
+        return self.heading
+
+    def align(self, angle, gain=None):
+        """Wall observation of the heading, H = [1, 0]; gain is ignored (the filter computes it)."""
+        axis = round(self.heading / HALF_PI) * HALF_PI
+        y = axis + angle - self.heading
+        s = self.p00 + self.r_wall
+        k0, k1 = self.p00 / s, self.p01 / s
+        self.heading += k0 * y
+        self.bias += k1 * y
+        p00, p01 = self.p00, self.p01
+        self.p00 = p00 - k0 * p00
+        self.p01 = p01 - k0 * p01
+        self.p11 -= k1 * p01
@@ -0,0 +1,339 @@
+# i2c_bus.py
+# Manager of the one I2C bus that the IMU, the encoder and the ToF sensors
+# share. It offers the machine.I2C memory API, so drivers can be built on it
+# unchanged. Their blocking transactions run at once and are counted per
+# device: transactions, bytes, estimated wire time and measured bus time.
+# It also keeps a transaction queue. The code of a tick queues the register
+# reads its consumers want (MPU6500.queue_gyro() / queue_sample(),
+# AS5600.queue_raw_angle(), ToFArray.queue_update()), and run() executes them:
+#  - by device priority: the control-critical IMU and encoder (PRIO_CONTROL)
+#    before everything else, so a ToF exchange never delays a control read,
+#  - with reads of one device merged into a burst when their register ranges
+#    are adjacent or close enough that reading the gap costs less than one
+#    more transaction (fusion's gyro, the tilt check's accelerometer and the
+#    logger's temperature become one 14 byte read),
+#  - within a bus time budget: what does not fit stays queued for the next run,
+#    except PRIO_CONTROL reads, which always run.
+# Completion callbacks receive the buffer and may queue follow-up transactions
+# (a ToF range read after its status read, see ToFArray.queue_update()).
+# Queue and burst buffers are allocated up front, so a run does not allocate
+# once every burst length has been seen.
+# The statistics stay MicroPython small ints (below 2**30), so accounting a
+# transaction does not allocate either: bytes, wire bits and busy time are kept
+# as thousands plus a leftover below 1000 (kbytes/bytes, kbits/bits,
+# busy_ms/busy_us), which lasts 12 days of bus time. transactions, merged and
+# deferred are plain counts; at the sensor cycle of sim/bench_bus.py (about
+# 3600 transactions/s) they last three days. reset_stats() before either runs out.
+from array import array
+from hal import I2C, SoftI2C, Pin, ticks_us, ticks_diff
+
+PRIO_CONTROL = 0     # IMU, encoders: read every control tick, never deferred
+PRIO_NORMAL = 1
+PRIO_BACKGROUND = 2  # ToF and other slow sensors
+_PRIORITIES = 3
+
+def make_i2c(cfg):
+    """
+    Bus on the configured pins at the configured clock: the hardware controller
+    cfg['id'] when the port has it, otherwise SoftI2C.
+    :param cfg: config.I2C_CONFIG.
+    :return: (bus, True if it is a hardware controller)
+    """
+    scl, sda, freq = Pin(cfg['scl']), Pin(cfg['sda']), cfg['freq']
+    try:
+        return I2C(cfg.get('id', 0), scl=scl, sda=sda, freq=freq), True
+    except (ValueError, TypeError, OSError):  # no such controller, or it cannot use the pins
+        return SoftI2C(scl=scl, sda=sda, freq=freq), False
+
+def wire_bits(payload, addrsize=8, read=True):
+    """
+    Clock cycles of a register transaction: address byte, register address, for reads
+    a repeated start and the address again, the payload; 9 bits a byte plus start/stop.
+    The same estimate as sim/mock_i2c.py.
+    """
+    n = 1 + addrsize // 8 + (1 if read else 0) + payload
+    return 9 * n + (3 if read else 2)
+
+def _carry(high, low, k, n):
+    # Add n to high[k] * 1000 + low[k], keeping low[k] below 1000
+    n += low[k]
+    if n >= 1000:
+        high[k] += n // 1000
+        n %= 1000
+    low[k] = n
+
+class BusManager:
+    def __init__(self, i2c, freq=400000, queue=16, clock=ticks_us):
+        """
+        :param i2c: machine.I2C / SoftI2C (or a simulated bus).
+        :param freq: Bus clock of i2c, for the wire time estimates.
+        :param queue: Maximum number of queued transactions.
+        :param clock: Microsecond tick source for the measured bus time.
+        """
+        self.i2c = i2c
+        self.freq = freq
+        self.clock = clock
+        # Devices, in registration order
+        self.names = []
+        self.addresses = bytearray()
+        self.priorities = bytearray()
+        self.merging = bytearray()
+        self.transactions = array('I')
+        self.kbytes = array('I')
+        self.bytes = array('I')     # below 1000, the rest is in kbytes
+        self.kbits = array('I')
+        self.bits = array('I')      # below 1000, the rest is in kbits
+        self.busy_ms = array('I')
+        self.busy_us = array('I')   # below 1000, the rest is in busy_ms
+        self.merged = array('I')    # queued reads served by another read's burst
+        self.deferred = array('I')  # runs a queued transaction was left waiting by the budget
+        self._stats = (self.transactions, self.kbytes, self.bytes, self.kbits, self.bits,
+                       self.busy_ms, self.busy_us, self.merged, self.deferred)
+        self._index = {}            # address -> device
+        # Queue, in submission order
+        self._dev = bytearray(queue)
+        self._reg = array('H', [0] * queue)
+        self._addrsize = bytearray(queue)
+        self._write = bytearray(queue)
+        self._prio = bytearray(queue)
+        self._state = bytearray(queue)  # 0 queued, 1 in the burst being built, 2 done
+        self._buf = [None] * queue
+        self._done = [None] * queue
+        self._n = 0
+        self._bursts = {}  # length -> bytearray
+
+    def device(self, address, name, priority=PRIO_NORMAL, merge=True):
+        """
+        Register a device (before using it).
+        :param priority: PRIO_CONTROL, PRIO_NORMAL or PRIO_BACKGROUND.
+        :param merge: False if reads have side effects (FIFO or clear-on-read registers)
+                      and must not be combined or widened.
+        :return: Device index.
+        """
+        k = self._index.get(address)
+        if k is None:
+            k = len(self.names)
+            self._index[address] = k
+            self.names.append(name)
+            self.addresses.append(address)
+            self.priorities.append(priority)
+            self.merging.append(1 if merge else 0)
+            for a in self._stats:
+                a.append(0)
+        else:
+            self.names[k] = name
+            self.priorities[k] = priority
+            self.merging[k] = 1 if merge else 0
+        return k
+
+    def _device(self, address):
+        k = self._index.get(address)
+        if k is None:
+            k = self.device(address, '0x%02x' % address)
+        return k
+
+    def _account(self, k, payload, addrsize, read, t):
+        self.transactions[k] += 1
+        _carry(self.kbytes, self.bytes, k, payload)
+        _carry(self.kbits, self.bits, k, wire_bits(payload, addrsize, read))
+        _carry(self.busy_ms, self.busy_us, k, ticks_diff(self.clock(), t))
+
+    # machine.I2C API, blocking
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        k = self._device(addr)
+        t = self.clock()
+        self.i2c.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        self._account(k, len(buf), addrsize, True, t)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        k = self._device(addr)
+        t = self.clock()
+        data = self.i2c.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+        self._account(k, nbytes, addrsize, True, t)
+        return data
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        k = self._device(addr)
+        t = self.clock()
+        self.i2c.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+        self._account(k, len(buf), addrsize, False, t)
+
+    def scan(self):
+        return self.i2c.scan()
+
+    # Queue
+    def read_into(self, address, reg, buf, done=None, addrsize=8, priority=None):
+        """
+        Queue a register read into buf.
+        :param done: Called as done(buf) once buf holds the data.
+        :param priority: Default the device priority.
+        """
+        self._queue(address, reg, buf, done, addrsize, priority, 0)
+
+    def write(self, address, reg, buf, done=None, addrsize=8, priority=None):
+        """Queue a register write of buf; done(buf) is called after it. Writes are never merged."""
+        self._queue(address, reg, buf, done, addrsize, priority, 1)
+
+    def _queue(self, address, reg, buf, done, addrsize, priority, write):
+        i = self._n
+        if i == len(self._buf):
+            raise RuntimeError("I2C queue full")
+        k = self._device(address)
+        self._dev[i] = k
+        self._reg[i] = reg
+        self._addrsize[i] = addrsize
+        self._write[i] = write
+        self._prio[i] = self.priorities[k] if priority is None else priority
+        self._state[i] = 0
+        self._buf[i] = buf
+        self._done[i] = done
+        self._n = i + 1
+
+    @property
+    def queued(self):
+        """Transactions waiting in the queue."""
+        return self._n
+
+    def run(self, budget_us=None):
+        """
+        Execute the queue. Priorities go in order, submissions in order within a
+        priority, and reads of one device are merged into bursts. Transactions
+        queued by callbacks join the run if their priority has not been passed yet.
+        :param budget_us: Estimated wire time this run may use; transactions below
+                          PRIO_CONTROL that do not fit stay queued, in order.
+        :return: Estimated wire time used, in microseconds.
+        """
+        budget = None if budget_us is None else budget_us * self.freq // 1000000
+        spent = 0
+        full = False
+        for p in range(_PRIORITIES):
+            i = 0
+            while i < self._n and not full:
+                if self._state[i] or self._prio[i] != p:
+                    i += 1
+                    continue
+                if self._write[i]:
+                    length = len(self._buf[i])
+                    start = self._reg[i]
+                else:
+                    start, length = self._group(i, p)
+                bits = wire_bits(length, self._addrsize[i], not self._write[i])
+                if budget is not None and p > PRIO_CONTROL and spent + bits > budget:
+                    full = True
+                    for j in range(i, self._n):
+                        if self._state[j] == 1:
+                            self._state[j] = 0
+                    break
+                spent += bits
+                self._execute(i, start, length)
+                i += 1
+        self._compact()
+        return spent * 1000000 // self.freq
+
+    def _group(self, i, p):
+        # Mark queued reads of the same device that fit into one burst with read i
+        k, size = self._dev[i], self._addrsize[i]
+        self._state[i] = 1
+        start = self._reg[i]
+        end = start + len(self._buf[i])
+        if not self.merging[k]:
+            return start, end - start
+        gap = 2 + size // 8  # bytes read in vain that cost no more than one more transaction
+        for j in range(i + 1, self._n):
+            if self._state[j] or self._dev[j] != k:
+                continue
+            if self._write[j]:
+                break  # a write to the device: later reads must see its effect
+            reg = self._reg[j]
+            top = reg + len(self._buf[j])
+            if self._prio[j] == p and self._addrsize[j] == size and start - gap <= top and reg <= end + gap:
+                self._state[j] = 1
+                start, end = min(start, reg), max(end, top)
+        return start, end - start
+
+    def _execute(self, i, start, length):
+        k, addr, size = self._dev[i], self.addresses[self._dev[i]], self._addrsize[i]
+        t = self.clock()
+        if self._write[i]:
+            self.i2c.writeto_mem(addr, start, self._buf[i], addrsize=size)
+            self._account(k, length, size, False, t)
+            self._finish(i)
+            return
+        buf = self._buf[i]
+        if start == self._reg[i] and length == len(buf):
+            # Nothing merged, or only reads within this one: read in place
+            self.i2c.readfrom_mem_into(addr, start, buf, addrsize=size)
+            burst = buf
+        else:
+            burst = self._bursts.get(length)
+            if burst is None:
+                burst = self._bursts[length] = bytearray(length)
+            self.i2c.readfrom_mem_into(addr, start, burst, addrsize=size)
+        self._account(k, length, size, True, t)
+        for j in range(i, self._n):
+            if self._state[j] != 1:
+                continue
+            if j != i:
+                self.merged[k] += 1
+            out = self._buf[j]
+            if out is not burst:
+                off = self._reg[j] - start
+                for b in range(len(out)):
+                    out[b] = burst[off + b]
+            self._finish(j)
+
+    def _finish(self, j):
+        self._state[j] = 2
+        done = self._done[j]
+        if done is not None:
+            done(self._buf[j])
+
+    def _compact(self):
+        # Keep what is still queued, in order
+        m = 0
+        for i in range(self._n):
+            if self._state[i] == 2:
+                continue
+            self.deferred[self._dev[i]] += 1
+            if m != i:
+                self._dev[m], self._reg[m], self._addrsize[m] = self._dev[i], self._reg[i], self._addrsize[i]
+                self._write[m], self._prio[m], self._state[m] = self._write[i], self._prio[i], 0
+                self._buf[m], self._done[m] = self._buf[i], self._done[i]
+            m += 1
+        for i in range(m, self._n):
+            self._buf[i] = self._done[i] = None
+        self._n = m
+
+    def reset_stats(self):
+        for a in self._stats:
+            for k in range(len(a)):
+                a[k] = 0
+
+    def wire_us(self, k=None):
+        """
+        Estimated wire time of device k, or of all devices, in microseconds.
+        For reports: the result outgrows small ints after a few seconds of traffic.
+        """
+        if k is None:
+            bits = sum(self.kbits) * 1000 + sum(self.bits)
+        else:
+            bits = self.kbits[k] * 1000 + self.bits[k]
+        return bits * 1000000 // self.freq
+
+    def report(self, elapsed_us=None):
+        """
+        Per device bus statistics as a list of text lines.
+        :param elapsed_us: Time the statistics cover; adds each device's share of the bus.
+        """
+        lines = ["%-12s %5s %4s %7s %8s %9s %9s %7s %8s%s" % (
+            'device', 'addr', 'prio', 'trans', 'bytes', 'wire_ms', 'busy_ms', 'merged', 'deferred',
+            '   bus' if elapsed_us else '')]
+        for k, name in enumerate(self.names):
+            share = ' %5.1f%%' % (100.0 * self.wire_us(k) / elapsed_us) if elapsed_us else ''
+            lines.append("%-12s  0x%02x %4d %7d %8d %9.2f %9.2f %7d %8d%s" % (
+                name, self.addresses[k], self.priorities[k], self.transactions[k],
+                self.kbytes[k] * 1000 + self.bytes[k], self.wire_us(k) / 1000.0,
+                self.busy_ms[k] + self.busy_us[k] / 1000.0, self.merged[k], self.deferred[k], share))
+        if elapsed_us:
+            lines.append("bus utilization %.1f%% (estimated wire time)" % (100.0 * self.wire_us() / elapsed_us))
+        return lines
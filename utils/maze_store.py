@@ -0,0 +1,194 @@
+# maze_store.py
+# Maze memory that survives a reset: the walls, the observed sides and the flood
+# map of a FloodFill are kept on flash as a snapshot file plus an append-only
+# journal. Every sensor sweep that shows something new appends one 5 byte
+# record, so the write per explored cell is tiny and fixed. After journal_max
+# records the journal is folded into a new snapshot (header + 4 bytes per cell),
+# which is written to a temporary file and renamed over the old one.
+#
+# A power cut therefore leaves the old or the new snapshot, never a mix, plus at
+# most one torn journal record at the end, which its check byte rejects.
+# Replaying a sweep that is already in the map changes nothing, so a journal
+# that outlives its checkpoint is harmless. Resuming is one snapshot read plus an
+# incremental flood repair per journal record.
+try:
+    import ustruct as struct
+except ImportError:  # CPython host
+    import struct
+try:
+    from binascii import crc32
+except ImportError:
+    from ubinascii import crc32
+import os
+from algorithm.maze import Maze, sensor_masks
+from algorithm.floodfill import FloodFill, _goal_cells
+
+# Snapshot: MAGIC, width, height, number of goal cells, (row, col) per goal cell,
+# walls, seen, flood distances (array('H') in native order, little endian on the
+# ESP32 and on x86 hosts), CRC-32 of everything before it.
+MAGIC = b'MMZ1'
+# Journal record: cell index, sides looked at, walls among them, check byte.
+_RECORD = '<HBBB'
+RECORD_SIZE = 5
+
+def _check(i, look, walls):
+    return crc32(bytes((i & 0xFF, i >> 8, look, walls))) & 0xFF
+
+class MazeStore:
+    """
+    Flash persistence for one FloodFill. load() restores (or starts) the map, then
+    observe() is used instead of FloodFill.observe_idx so every new sweep is
+    journalled before the mouse moves on.
+    """
+
+    def __init__(self, path='maze', journal_max=64):
+        """
+        :param path: File name prefix: path.bin (snapshot), path.log (journal), path.bin.tmp.
+        :param journal_max: Records after which the journal is folded into a new snapshot.
+        """
+        self.snapshot = path + '.bin'
+        self.journal = path + '.log'
+        self.journal_max = journal_max
+        self.flood = None
+        self.records = 0        # records in the journal
+        self.bytes_written = 0
+        self.checkpoints = 0
+        self._file = None
+        self._rec = bytearray(RECORD_SIZE)
+
+    def load(self, width, height, goal):
+        """
+        Restore the saved map, or start an empty maze if there is none (or it is for a
+        different maze size or goal), and open the journal for appending.
+        :return: FloodFill on the restored Maze; maze.seen tells what has been explored.
+        """
+        goal = _goal_cells(goal)
+        flood = FloodFill(Maze(width, height), goal, fill=False)
+        if not self._read_snapshot(flood):
+            flood = FloodFill(Maze(width, height), goal)
+        self.flood = flood
+        replayed, torn = self._replay(flood)
+        if replayed or torn:
+            self.checkpoint()  # fold the journal in and drop a torn tail
+        else:
+            self._file = open(self.journal, 'ab')
+        return flood
+
+    def observe(self, i, look, walls):
+        """
+        FloodFill.observe_idx() that journals the sweep when it showed anything new
+        (a side not observed before, or a wall on a side seen open).
+        :return: Bit mask of the sides that were not observed before.
+        """
+        added = walls & look & ~self.flood.maze.walls[i] & 0x0F
+        new = self.flood.observe_idx(i, look, walls)
+        if new or added:
+            walls &= look
+            struct.pack_into(_RECORD, self._rec, 0, i, look, walls, _check(i, look, walls))
+            self._write(self._file, self._rec)
+            self._file.flush()
+            self.records += 1
+            if self.records >= self.journal_max:
+                self.checkpoint()
+        return new
+
+    def update(self, current_cell, sensor_walls):
+        """Same as FloodFill.update() with the sweep journalled. :return: The flood distances."""
+        r, c = current_cell
+        self.observe(self.flood.maze.index(r, c), *sensor_masks(sensor_walls))
+        return self.flood.dist
+
+    def checkpoint(self):
+        """Write the whole map as a new snapshot and start an empty journal."""
+        tmp = self.snapshot + '.tmp'
+        with open(tmp, 'wb') as f:
+            self._write_snapshot(f)
+        self._replace(tmp, self.snapshot)
+        self.close()
+        self._file = open(self.journal, 'wb')
+        self.records = 0
+        self.checkpoints += 1
+
+    def clear(self):
+        """Forget the saved maze (e.g. on the run_reset switch)."""
+        self.close()
+        for name in (self.journal, self.snapshot):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+        self.records = 0
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    # Every byte and rename goes through these two, so a host test can cut the power anywhere
+    def _write(self, f, data):
+        f.write(data)
+        self.bytes_written += len(data)
+
+    def _replace(self, src, dst):
+        try:
+            os.replace(src, dst)
+        except AttributeError:  # MicroPython: rename replaces an existing file on littlefs
+            os.rename(src, dst)
+
+    def _write_snapshot(self, f):
+        flood = self.flood
+        maze = flood.maze
+        head = bytearray(MAGIC)
+        head.extend(bytes((maze.width, maze.height, len(flood.goal_cells))))
+        for r, c in flood.goal_cells:
+            head.extend(bytes((r, c)))
+        crc = 0
+        for part in (head, maze.walls, maze.seen, flood.dist):
+            crc = crc32(part, crc)
+            self._write(f, part)
+        self._write(f, struct.pack('<I', crc))
+
+    def _read_snapshot(self, flood):
+        """Read the snapshot straight into the map buffers. :return: False if missing or invalid."""
+        maze = flood.maze
+        try:
+            f = open(self.snapshot, 'rb')
+        except OSError:
+            return False
+        with f:
+            head = f.read(7)
+            if len(head) < 7 or head[:4] != MAGIC or head[4] != maze.width or head[5] != maze.height:
+                return False
+            goal = f.read(2 * head[6])
+            if [(goal[k], goal[k + 1]) for k in range(0, len(goal), 2)] != list(flood.goal_cells):
+                return False
+            crc = crc32(goal, crc32(head))
+            n = maze.width * maze.height
+            for part, size in ((maze.walls, n), (maze.seen, n), (flood.dist, 2 * n)):
+                if f.readinto(part) != size:
+                    return False
+                crc = crc32(part, crc)
+            tail = f.read(4)
+            return len(tail) == 4 and struct.unpack('<I', tail)[0] == crc
+
+    def _replay(self, flood):
+        """Apply the journal to the map. :return: (records applied, torn or corrupt tail found)."""
+        try:
+            f = open(self.journal, 'rb')
+        except OSError:
+            return 0, False
+        n = flood.maze.width * flood.maze.height
+        rec = self._rec
+        count = 0
+        with f:
+            while True:
+                got = f.readinto(rec)
+                if not got:
+                    return count, False
+                if got < RECORD_SIZE:
+                    return count, True
+                i, look, walls, check = struct.unpack_from(_RECORD, rec)
+                if check != _check(i, look, walls) or i >= n:
+                    return count, True
+                flood.observe_idx(i, look, walls)
+                count += 1
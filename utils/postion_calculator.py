@@ -1,36 +1,249 @@
 import math
+from array import array
 
 class PositionTracker:
-    def __init__(self, wheel_diameter):
+    def __init__(self, wheel_diameter, counts_per_rev=4096):
         self.wheel_circumference = math.pi * wheel_diameter
+        self.counts_per_rev = counts_per_rev
         self.prev_angle = 0
         self.total_distance = 0
         self._calibration_offset = 0
-        
+
     def calibrate(self, current_angle):
+        # Raw count at the reference position; distances are measured from here
         self._calibration_offset = current_angle
-        
+        self.prev_angle = current_angle
+
     def update(self, current_angle, delta_time):
+        """
+        :param current_angle: Raw encoder count (AS5600 raw_angle, 0..counts_per_rev-1).
+        :param delta_time: Time since the previous update in seconds.
+        :return: (speed in mm/s, total distance travelled in mm)
+        """
         # Handle angle wrapping
         current_angle = self._unwrap_angle(self.prev_angle, current_angle)
-        
-        # Convert to radians and calculate delta
-        delta_rad = math.radians((current_angle - self.prev_angle) / self._calibration_offset)
-        
+
+        # Convert the count delta to a fraction of a wheel turn
+        delta_turns = (current_angle - self.prev_angle) / self.counts_per_rev
+
         # Calculate distance
-        distance = (delta_rad / (2 * math.pi)) * self.wheel_circumference
+        distance = delta_turns * self.wheel_circumference
         self.total_distance += abs(distance)
-        
+
         # Calculate speed
         speed = distance / delta_time if delta_time > 0 else 0
-        
-        self.prev_angle = current_angle
+
+        self.prev_angle = current_angle % self.counts_per_rev
         return speed, self.total_distance
-        
+
     def _unwrap_angle(self, prev, curr):
         diff = curr - prev
-        if diff > 2048:  # Handle 12-bit wrap-around
-            curr -= 4096
-        elif diff < -2048:
-            curr += 4096
-        return curr
\ No newline at end of file
+        half = self.counts_per_rev // 2
+        if diff > half:  # Handle 12-bit wrap-around
+            curr -= self.counts_per_rev
+        elif diff < -half:
+            curr += self.counts_per_rev
+        return curr
+
+# Fixed-point scales used by Odometry
+HEADING_BITS = 21     # heading unit: 1 / 2**21 of a turn; with the 8 fraction bits
+                      # of Odometry the heading and the mid-step sum stay below 2**30
+COS_BITS = 14         # cos table values scaled by 2**14
+COS_TABLE_BITS = 12   # 4096 table entries per turn, linearly interpolated
+DIST_FRAC_BITS = 6    # micrometers per count kept with 6 fractional bits
+
+# Indices into Odometry.state
+X_UM = 0
+Y_UM = 1
+HEADING = 2
+V_MM_S = 3
+W_MRAD_S = 4
+
+class Odometry:
+    """
+    Differential drive odometry from two AS5600 raw counts, in integer
+    fixed point with precomputed constants and a cosine table, so update() does
+    no float math and allocates nothing (all intermediates stay small ints).
+    Results go to the preallocated `state` array:
+        state[X_UM], state[Y_UM]  position in micrometers
+        state[HEADING]            heading in 1 / 2**21 turn (CCW positive, wraps)
+        state[V_MM_S]             forward velocity in mm/s
+        state[W_MRAD_S]           yaw rate in mrad/s
+    Use pose() for float values outside the control loop. Positions stay small
+    ints on MicroPython up to about 16 m from the origin.
+    """
+
+    def __init__(self, wheel_diameter, track_width, counts_per_rev=4096, left_sign=1, right_sign=1):
+        """
+        :param wheel_diameter: Wheel diameter in mm.
+        :param track_width: Distance between the wheel contact points in mm.
+        :param counts_per_rev: Encoder counts per wheel turn (AS5600: 4096).
+        :param left_sign, right_sign: -1 for an encoder that counts down when driving forward.
+        """
+        mm_per_count = math.pi * wheel_diameter / counts_per_rev
+        self.mm_per_count = mm_per_count
+        self.counts_per_rev = counts_per_rev
+        self.left_sign, self.right_sign = left_sign, right_sign
+        # position is integrated in encoder counts: whole counts plus a fraction of
+        # (left + right) * cos, so no rounding error accumulates; um per count
+        # (fixed point) is only applied when publishing
+        self._dist_k = int(round(mm_per_count * 1000 * (1 << DIST_FRAC_BITS)))
+        self._frac_shift = 1 + COS_BITS
+        self._frac_mask = (1 << self._frac_shift) - 1
+        # heading units per count of (right - left), with 8 extra fractional bits
+        turns_per_count = mm_per_count / track_width / (2 * math.pi)
+        self._head_k = int(round(turns_per_count * (1 << (HEADING_BITS + 8))))
+        self._head_mask = (1 << HEADING_BITS) - 1
+        self._table_shift = HEADING_BITS - COS_TABLE_BITS
+        self._quarter = 1 << (HEADING_BITS - 2)
+        # velocity: (counts * k) // dt_us
+        self._v_k = int(round(mm_per_count * 1000000 / 2))
+        self._w_k = int(round(mm_per_count / track_width * 1000000000))
+        self._lerp_mask = (1 << self._table_shift) - 1
+        n = 1 << COS_TABLE_BITS
+        # one extra entry so interpolation never wraps the index
+        self._cos = array('h', [int(round(math.cos(2 * math.pi * i / n) * (1 << COS_BITS))) for i in range(n + 1)])
+        self.state = array('l', [0] * 5)
+        self._prev_left = self._prev_right = 0
+        self._heading_frac = 0  # heading with 8 extra fractional bits
+        self._x = self._y = 0   # position in counts
+        self._x_frac = self._y_frac = 0
+
+    def reset(self, left_raw, right_raw):
+        """Start from the origin with the given encoder counts."""
+        self._prev_left, self._prev_right = left_raw, right_raw
+        for i in range(5):
+            self.state[i] = 0
+        self._heading_frac = 0
+        self._x = self._y = self._x_frac = self._y_frac = 0
+
+    def update(self, left_raw, right_raw, dt_us):
+        """
+        One odometry tick.
+        :param left_raw, right_raw: Raw encoder counts (ints).
+        :param dt_us: Time since the previous update in microseconds.
+        :return: The state array.
+        """
+        half = self.counts_per_rev >> 1
+        mask = self.counts_per_rev - 1
+        dl = (left_raw - self._prev_left) & mask
+        if dl >= half:
+            dl -= self.counts_per_rev
+        dr = (right_raw - self._prev_right) & mask
+        if dr >= half:
+            dr -= self.counts_per_rev
+        self._prev_left, self._prev_right = left_raw, right_raw
+        dl *= self.left_sign
+        dr *= self.right_sign
+
+        state = self.state
+        ds2 = dl + dr
+        d_heading = (dr - dl) * self._head_k
+        # position uses the heading in the middle of the step
+        mid = ((self._heading_frac + (d_heading >> 1)) >> 8) & self._head_mask
+        self._heading_frac = (self._heading_frac + d_heading) & ((self._head_mask << 8) | 0xFF)
+        state[HEADING] = self._heading_frac >> 8
+        cos_t = self._lookup(mid)
+        sin_t = self._lookup((mid - self._quarter) & self._head_mask)
+        self._x_frac += ds2 * cos_t
+        self._x += self._x_frac >> self._frac_shift
+        self._x_frac &= self._frac_mask
+        self._y_frac += ds2 * sin_t
+        self._y += self._y_frac >> self._frac_shift
+        self._y_frac &= self._frac_mask
+        state[X_UM] = (self._x * self._dist_k) >> DIST_FRAC_BITS
+        state[Y_UM] = (self._y * self._dist_k) >> DIST_FRAC_BITS
+        if dt_us > 0:
+            state[V_MM_S] = ds2 * self._v_k // dt_us
+            state[W_MRAD_S] = (dr - dl) * self._w_k // dt_us
+        return state
+
+    def _lookup(self, angle):
+        i = angle >> self._table_shift
+        c = self._cos[i]
+        return c + (((self._cos[i + 1] - c) * (angle & self._lerp_mask)) >> self._table_shift)
+
+    def pose(self):
+        """(x mm, y mm, heading rad) as floats."""
+        s = self.state
+        return s[X_UM] / 1000.0, s[Y_UM] / 1000.0, s[HEADING] * 2 * math.pi / (1 << HEADING_BITS)
+
+class FloatOdometry:
+    """Floating point reference for Odometry (same model, host side checks)."""
+
+    def __init__(self, wheel_diameter, track_width, counts_per_rev=4096):
+        self.mm_per_count = math.pi * wheel_diameter / counts_per_rev
+        self.track_width = track_width
+        self.counts_per_rev = counts_per_rev
+        self.x = self.y = self.heading = 0.0
+        self.prev = (0, 0)
+
+    def reset(self, left_raw, right_raw):
+        self.x = self.y = self.heading = 0.0
+        self.prev = (left_raw, right_raw)
+
+    def update(self, left_raw, right_raw):
+        n = self.counts_per_rev
+        dl = (left_raw - self.prev[0] + n // 2) % n - n // 2
+        dr = (right_raw - self.prev[1] + n // 2) % n - n // 2
+        self.prev = (left_raw, right_raw)
+        sl, sr = dl * self.mm_per_count, dr * self.mm_per_count
+        d_heading = (sr - sl) / self.track_width
+        mid = self.heading + d_heading / 2
+        self.x += (sl + sr) / 2 * math.cos(mid)
+        self.y += (sl + sr) / 2 * math.sin(mid)
+        self.heading += d_heading
+        return self.x, self.y, self.heading
+
+# Replay log.csv through the fixed point odometry and compare with the float reference
+if __name__ == "__main__":
+    import time
+    try:
+        ticks_us, ticks_diff = time.ticks_us, time.ticks_diff
+    except AttributeError:
+        ticks_us = lambda: int(time.perf_counter() * 1000000)
+        ticks_diff = lambda a, b: a - b
+
+    rows = []
+    with open('log.csv') as f:
+        header = f.readline().strip().split(',')
+        raw_i, time_i = header.index('raw_angle'), header.index('time')
+        for line in f:
+            fields = line.strip().split(',')
+            rows.append((int(fields[raw_i]), int(fields[time_i])))
+
+    # The log has one wheel; the right wheel is synthesized with a slow extra
+    # drift (and the run replayed a few times) so the heading changes as well.
+    odo = Odometry(wheel_diameter=35, track_width=70)
+    ref = FloatOdometry(wheel_diameter=35, track_width=70)
+    left0 = rows[0][0]
+    odo.reset(left0, left0)
+    ref.reset(left0, left0)
+    worst_pos, worst_head, busy, ticks = 0.0, 0.0, 0, 0
+    prev_t = rows[0][1]
+    for lap in range(2):
+        for i, (raw, t_ms) in enumerate(rows[1:]):
+            right = (raw + (lap * len(rows) + i) // 2) & 4095
+            dt_us = max(1, (t_ms - prev_t) * 1000)
+            prev_t = t_ms
+            t0 = ticks_us()
+            odo.update(raw, right, dt_us)
+            busy += ticks_diff(ticks_us(), t0)
+            ticks += 1
+            rx, ry, rh = ref.update(raw, right)
+            x, y, h = odo.pose()
+            worst_pos = max(worst_pos, math.hypot(x - rx, y - ry))
+            dh = (h - rh + math.pi) % (2 * math.pi) - math.pi
+            worst_head = max(worst_head, abs(dh))
+    print("replayed %d ticks: fixed point vs float max position error %.3f mm, heading %.4f deg, %.2f us/tick" % (
+        ticks, worst_pos, math.degrees(worst_head), busy / ticks))
+    print("final pose fixed (%.1f mm, %.1f mm, %.1f deg), float (%.1f mm, %.1f mm, %.1f deg)" % (
+        odo.pose()[0], odo.pose()[1], math.degrees(odo.pose()[2]), ref.x, ref.y,
+        math.degrees(ref.heading) % 360))
+
+    # Single wheel tracker on the same log
+    tracker = PositionTracker(wheel_diameter=35)
+    tracker.calibrate(rows[0][0])
+    for (raw, t_ms), (_, prev_ms) in zip(rows[1:], rows):
+        speed, distance = tracker.update(raw, (t_ms - prev_ms) / 1000)
+    print("PositionTracker: %.1f mm travelled" % distance)
@@ -0,0 +1,286 @@
+# profiler.py
+# Opt-in per-stage timing of the control tick. Each stage (an I2C read, the
+# fusion update, odometry, the PWM writes, the whole tick) gets a preallocated
+# histogram of its duration in bucket_us wide buckets, plus count, total and
+# maximum. Recording is a ticks_us() call, a ticks_diff() and a few array
+# increments, so it allocates nothing: every counter stays a MicroPython small
+# int (below 2**30). The total is kept as whole ms plus leftover us, which lasts
+# 12 days of stage time; count lasts 2**30 samples, 12 days at 1 kHz. reset()
+# before either runs out. Stages are timed either explicitly with
+# lap() or by wrap(), which shadows a driver method on one instance with a timed
+# call. The drivers themselves are not touched, so with profiling disabled
+# (config.PROFILE, make_profiler() returns NULL) there is nothing to compile out:
+# no method is wrapped and the lap() calls are no-ops.
+# report() summarises on the board; dump() writes the raw counters for
+# analysis/profile_view.py on the host.
+from array import array
+from hal import ticks_us, ticks_diff
+try:
+    import ustruct as struct
+except ImportError:  # CPython host
+    import struct
+
+# Dump file: MAGIC, header, per stage a length byte and the name, then the
+# arrays count, total_ms, total_us (leftover below 1000), max_us (one 'I' per
+# stage) and the histograms (buckets 'I' per stage), little endian.
+MAGIC = b'PRF2'
+_HEADER = '<HHH'  # stages, buckets, bucket width in us
+
+class Profiler:
+    def __init__(self, stages=(), bucket_us=10, buckets=100, clock=ticks_us):
+        """
+        :param stages: Stage names to register up front (more can be added by stage() / wrap()).
+        :param bucket_us: Histogram bucket width; the last bucket also counts everything longer.
+        :param buckets: Buckets per stage.
+        :param clock: Microsecond tick source.
+        """
+        self.bucket_us = bucket_us
+        self.buckets = buckets
+        self.clock = clock
+        self.names = []
+        self.count = array('I')
+        self.total_ms = array('I')
+        self.total_us = array('I')  # below 1000, the rest is in total_ms
+        self.peak = array('I')
+        self.hist = array('I')
+        self._wrapped = []
+        for name in stages:
+            self.stage(name)
+
+    def stage(self, name):
+        """Index of a stage, registering it (and its buffers) if it is new. Call at setup."""
+        if name in self.names:
+            return self.names.index(name)
+        self.names.append(name)
+        for a in (self.count, self.total_ms, self.total_us, self.peak):
+            a.append(0)
+        self.hist.extend(array('I', bytearray(4 * self.buckets)))
+        return len(self.names) - 1
+
+    def start(self):
+        """Time stamp to pass to the first lap() of a tick."""
+        return self.clock()
+
+    def lap(self, k, t):
+        """Record the time since t for stage k. :return: Now, the start of the next stage."""
+        now = self.clock()
+        self.record(k, ticks_diff(now, t))
+        return now
+
+    def record(self, k, us):
+        """Count one duration of stage k."""
+        b = us // self.bucket_us
+        if b >= self.buckets:
+            b = self.buckets - 1
+        self.hist[k * self.buckets + b] += 1
+        self.count[k] += 1
+        t = self.total_us[k] + us
+        if t >= 1000:
+            self.total_ms[k] += t // 1000
+            t %= 1000
+        self.total_us[k] = t
+        if us > self.peak[k]:
+            self.peak[k] = us
+
+    def wrap(self, obj, name, stage=None, nargs=0):
+        """
+        Time every call of obj.name (a method) as a stage, by shadowing it on the
+        instance. Calls through self.name inside the class are timed as well.
+        :param stage: Stage name, default the method name.
+        :param nargs: Number of positional arguments the calls pass (0..3); fixed so
+                      the wrapper does not build an argument tuple per call.
+        :return: Stage index.
+        """
+        fn = getattr(obj, name)
+        k = self.stage(stage or name)
+        clock, record = self.clock, self.record
+        if nargs == 0:
+            def timed():
+                t = clock()
+                r = fn()
+                record(k, ticks_diff(clock(), t))
+                return r
+        elif nargs == 1:
+            def timed(a):
+                t = clock()
+                r = fn(a)
+                record(k, ticks_diff(clock(), t))
+                return r
+        elif nargs == 2:
+            def timed(a, b):
+                t = clock()
+                r = fn(a, b)
+                record(k, ticks_diff(clock(), t))
+                return r
+        elif nargs == 3:
+            def timed(a, b, c):
+                t = clock()
+                r = fn(a, b, c)
+                record(k, ticks_diff(clock(), t))
+                return r
+        else:
+            raise ValueError("nargs must be 0..3")
+        setattr(obj, name, timed)
+        self._wrapped.append((obj, name))
+        return k
+
+    def unwrap(self):
+        """Restore every wrapped method."""
+        for obj, name in self._wrapped:
+            delattr(obj, name)
+        self._wrapped = []
+
+    def reset(self):
+        """Zero all counters (e.g. after start-up, before the part worth measuring)."""
+        for a in (self.count, self.total_ms, self.total_us, self.peak, self.hist):
+            for i in range(len(a)):
+                a[i] = 0
+
+    def percentile(self, k, p):
+        """Upper edge (us) of the bucket holding the p-th percentile of stage k."""
+        n = self.count[k]
+        if not n:
+            return 0
+        need = (p * n + 99) // 100
+        seen = 0
+        base = k * self.buckets
+        for b in range(self.buckets):
+            seen += self.hist[base + b]
+            if seen >= need:
+                return self.peak[k] if b == self.buckets - 1 else (b + 1) * self.bucket_us
+        return self.peak[k]
+
+    def report(self, budget_us=None):
+        """
+        Per stage timing summary as a list of text lines.
+        :param budget_us: Tick budget (1000 at 1 kHz); adds each stage's mean as a share of it.
+        """
+        lines = ["%-14s %8s %8s %8s %8s %8s%s" % ('stage', 'count', 'mean_us', 'p50_us', 'p99_us', 'max_us',
+                                                  ' budget' if budget_us else '')]
+        for k, name in enumerate(self.names):
+            n = self.count[k]
+            mean = (self.total_ms[k] * 1000.0 + self.total_us[k]) / n if n else 0.0
+            share = ' %5.1f%%' % (100.0 * mean / budget_us) if budget_us else ''
+            lines.append("%-14s %8d %8.1f %8d %8d %8d%s" % (
+                name, n, mean, self.percentile(k, 50), self.percentile(k, 99), self.peak[k], share))
+        return lines
+
+    def dump(self, filename='profile.bin'):
+        """Write the counters for analysis/profile_view.py."""
+        with open(filename, 'wb') as f:
+            f.write(MAGIC + struct.pack(_HEADER, len(self.names), self.buckets, self.bucket_us))
+            for name in self.names:
+                data = name.encode()
+                f.write(bytes((len(data),)) + data)
+            for a in (self.count, self.total_ms, self.total_us, self.peak, self.hist):
+                f.write(a)
+
+class _NullProfiler:
+    """Profiler interface that records nothing, for when profiling is disabled."""
+    names = ()
+
+    def stage(self, name):
+        return 0
+
+    def start(self):
+        return 0
+
+    def lap(self, k, t):
+        return t
+
+    def record(self, k, us):
+        pass
+
+    def wrap(self, obj, name, stage=None, nargs=0):
+        return 0
+
+    def unwrap(self):
+        pass
+
+    def reset(self):
+        pass
+
+    def report(self, budget_us=None):
+        return ["profiling disabled (config.PROFILE)"]
+
+    def dump(self, filename='profile.bin'):
+        pass
+
+NULL = _NullProfiler()
+
+def make_profiler(stages=(), clock=ticks_us):
+    """Profiler set up from config.PROFILE, or NULL when profiling is disabled."""
+    import config
+    cfg = getattr(config, 'PROFILE', None)
+    if not cfg or not cfg['enabled']:
+        return NULL
+    return Profiler(stages, cfg['bucket_us'], cfg['buckets'], clock)
+
+# Profile a 1 kHz control tick against the simulated board
+if __name__ == "__main__":
+    import gc
+    import time
+    from hal import HOST, board, sleep_us
+    import config
+    from drivers.AS5600 import AS5600
+    from drivers.mpu6500_fusion import MPU6500Fusion
+    from drivers.tb6612 import MotorDriver
+    from hal import SoftI2C, Pin
+    from utils.postion_calculator import PositionTracker
+    clock = ticks_us
+    if HOST:
+        from sim.maze_files import random_maze
+        from sim.robot import VirtualRobot
+        VirtualRobot(random_maze(16, seed=0)).attach(board.populate())
+        clock = lambda: time.perf_counter_ns() // 1000  # the virtual clock does not see host CPU time
+    i2c = SoftI2C(scl=Pin(config.I2C_CONFIG['scl']), sda=Pin(config.I2C_CONFIG['sda']),
+                  freq=config.I2C_CONFIG['freq'])
+    encoder = AS5600(i2c, 0x36)
+    fusion = MPU6500Fusion(i2c)
+    tracker = PositionTracker(wheel_diameter=35)
+    motors = MotorDriver(**config.MOTOR_PINS)
+    motors.enable()
+
+    prof = Profiler(clock=clock)
+    prof.wrap(encoder, '_read_register', 'encoder read', nargs=2)
+    prof.wrap(fusion.sensor, '_register_three_shorts', 'imu read', nargs=1)
+    prof.wrap(fusion, 'update', 'fusion')
+    prof.wrap(tracker, 'update', 'odometry', nargs=2)
+    prof.wrap(motors, 'set_motor', 'pwm', nargs=2)
+    TICK = prof.stage('tick')  # the whole tick, timed with lap()
+
+    def tick():
+        t = prof.start()
+        raw = encoder.raw_angle
+        fusion.update()
+        tracker.update(raw, 0.001)
+        motors.set_motor('left', 20000)
+        motors.set_motor('right', 20000)
+        prof.lap(TICK, t)
+
+    for _ in range(100):
+        tick()
+        sleep_us(1000)
+    prof.reset()
+    for _ in range(2000):
+        tick()
+        sleep_us(1000)
+    for line in prof.report(budget_us=1000):
+        print(line)
+
+    # Cost of the instrumentation itself, and (on the board) what it allocates
+    bare = Profiler(('lap',), clock=clock)
+    k = 0
+    gc.collect()
+    before = gc.mem_alloc() if hasattr(gc, 'mem_alloc') else None
+    t0 = clock()
+    t = bare.start()
+    for _ in range(10000):
+        t = bare.lap(k, t)
+    per_lap = ticks_diff(clock(), t0) / 10000
+    print("lap() costs %.2f us" % per_lap)
+    if before is not None:
+        print("10000 laps allocated %d bytes" % (gc.mem_alloc() - before))
+    prof.dump('profile.bin')
+    prof.unwrap()
+    print("wrote profile.bin (python -m analysis.profile_view profile.bin)")
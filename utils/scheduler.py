@@ -0,0 +1,137 @@
+from hal import ticks_us, ticks_diff, ticks_add, sleep_us
+
+# Jitter histogram buckets: [0, 1], [2, 3], [4, 7], ... up to >= 2**(JITTER_BUCKETS - 1) us
+JITTER_BUCKETS = 12
+
+class Task:
+    def __init__(self, name, rate_hz, callback):
+        self.name = name
+        self.rate_hz = rate_hz
+        self.period_us = int(1000000 // rate_hz)
+        self.callback = callback
+        self.next_due = 0
+        self.runs = 0
+        self.overruns = 0
+        self.exec_total_us = 0
+        self.exec_max_us = 0
+        self.jitter_max_us = 0
+        self.jitter = [0] * JITTER_BUCKETS
+
+    def record(self, jitter_us, exec_us):
+        self.runs += 1
+        self.exec_total_us += exec_us
+        if exec_us > self.exec_max_us:
+            self.exec_max_us = exec_us
+        if jitter_us > self.jitter_max_us:
+            self.jitter_max_us = jitter_us
+        bucket = 0
+        while jitter_us > 1 and bucket < JITTER_BUCKETS - 1:
+            jitter_us >>= 1
+            bucket += 1
+        self.jitter[bucket] += 1
+
+class Scheduler:
+    """
+    Cooperative fixed-rate scheduler. Every task keeps an absolute due time that
+    advances by its period, so rates do not drift. When several tasks are due the
+    fastest one runs first. Start jitter, execution time and overruns (missed
+    periods) are recorded per task without allocating in the loop.
+    """
+
+    def __init__(self, clock=ticks_us, sleep=sleep_us):
+        """
+        :param clock: Microsecond tick source (time.ticks_us or a simulated clock).
+        :param sleep: Function sleeping a number of microseconds (advances a simulated clock).
+        """
+        self.clock = clock
+        self.sleep = sleep
+        self.tasks = []
+
+    def add(self, name, rate_hz, callback):
+        """Add a task running callback() at rate_hz."""
+        task = Task(name, rate_hz, callback)
+        task.next_due = self.clock()
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: t.period_us)  # rate monotonic priority
+        return task
+
+    def add_tasks(self, rates, handlers):
+        """
+        Add tasks from a config table.
+        :param rates: dict name -> rate_hz, e.g. config.SCHEDULER_TASKS.
+        :param handlers: dict name -> callable; names without a handler are skipped.
+        """
+        for name, rate_hz in rates.items():
+            if name in handlers:
+                self.add(name, rate_hz, handlers[name])
+
+    def run_once(self):
+        """
+        Run the highest priority task that is due.
+        :return: microseconds until the next task is due (0 if one ran).
+        """
+        now = self.clock()
+        wait = None
+        for task in self.tasks:
+            late = ticks_diff(now, task.next_due)
+            if late >= 0:
+                task.callback()
+                end = self.clock()
+                task.record(late, ticks_diff(end, now))
+                task.next_due = ticks_add(task.next_due, task.period_us)
+                behind = ticks_diff(end, task.next_due)
+                if behind >= 0:
+                    # Missed whole periods: count them and skip ahead instead of bursting
+                    missed = behind // task.period_us + 1
+                    task.overruns += missed
+                    task.next_due = ticks_add(task.next_due, missed * task.period_us)
+                return 0
+            if wait is None or -late < wait:
+                wait = -late
+        return wait or 0
+
+    def run(self, duration_us):
+        """Run the task loop for duration_us microseconds."""
+        start = self.clock()
+        while ticks_diff(self.clock(), start) < duration_us:
+            wait = self.run_once()
+            if wait > 0:
+                self.sleep(wait)
+
+    def report(self):
+        """Per task timing summary as a list of text lines."""
+        lines = ["%-10s %6s %7s %8s %8s %8s %10s  jitter histogram (<=1us, <=3us, <=7us, ...)" % (
+            'task', 'rate', 'runs', 'avg_us', 'max_us', 'overrun', 'jitter_max')]
+        for t in self.tasks:
+            avg = t.exec_total_us // t.runs if t.runs else 0
+            lines.append("%-10s %6d %7d %8d %8d %8d %10d  %s" % (
+                t.name, t.rate_hz, t.runs, avg, t.exec_max_us, t.overruns, t.jitter_max_us, t.jitter))
+        return lines
+
+class SimClock:
+    """Simulated microsecond clock for running the scheduler on the host."""
+    def __init__(self):
+        self.now = 0
+
+    def ticks_us(self):
+        return self.now
+
+    def sleep_us(self, us):
+        self.now += us
+
+    advance = sleep_us
+
+# Host benchmark of the scheduler against a simulated clock
+if __name__ == "__main__":
+    import config
+    clock = SimClock()
+    sched = Scheduler(clock.ticks_us, clock.sleep_us)
+    # Simulated task costs (us): every call just advances the clock
+    costs = {'imu': 180, 'encoders': 120, 'control': 90, 'tof': 900}
+    handlers = dict((name, (lambda c: lambda: clock.advance(c))(cost)) for name, cost in costs.items())
+    sched.add_tasks(config.SCHEDULER_TASKS, handlers)
+    sched.run(1000000)  # one simulated second
+    for line in sched.report():
+        print(line)
+    busy = sum(t.exec_total_us for t in sched.tasks)
+    print("CPU load %.1f %%" % (busy / 10000))
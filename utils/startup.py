@@ -0,0 +1,249 @@
+# startup.py
+# Boot of the mouse, from main.py to ready-to-run. The drivers are built on
+# first use. Nothing is imported or talks to the bus before it is needed, and
+# every driver lives on the one shared I2C bus. bring_up() builds the ones a
+# run needs together. Their waits are interleaved, e.g. the ToF sensors are
+# moved to their addresses and start ranging while the IMU is still in reset.
+# The drivers talk through a utils.i2c_bus.BusManager, which keeps per device
+# bus statistics and the prioritised transaction queue of the control loop.
+# A full bus scan is replaced by the device map saved at the previous boot
+# while the bus configuration and the required devices match. Every stage is
+# time stamped; the ticks start at reset, so the first stamp is the time spent
+# before main (firmware start-up and imports, see sim/build_mpy.py).
+try:
+    import ujson as json
+except ImportError:  # CPython host
+    import json
+import os
+from hal import ticks_us, ticks_diff, ticks_add, sleep_us
+import config
+
+DEVICE_CACHE = 'i2c_devices.json'
+_IMU = 0x68
+_ENCODER = 0x36
+
+def run_steps(steps, clock=ticks_us, sleep=sleep_us):
+    """
+    Run bring-up sequences side by side. A step is a generator that does some work
+    and yields the milliseconds it has to wait before its next part (a chip reset, a
+    boot delay); meanwhile the other steps run. When several are due the earlier one
+    in `steps` goes first, and the loop only sleeps when every step is waiting.
+    :return: Microseconds spent sleeping.
+    """
+    steps = list(steps)
+    now = clock()
+    due = [now] * len(steps)
+    slept = 0
+    while steps:
+        now = clock()
+        wait = None
+        for k in range(len(steps)):
+            late = ticks_diff(now, due[k])
+            if late >= 0:
+                try:
+                    ms = next(steps[k])
+                    due[k] = ticks_add(clock(), int(ms * 1000))
+                except StopIteration:
+                    del steps[k], due[k]
+                wait = 0
+                break
+            if wait is None or -late < wait:
+                wait = -late
+        if wait:
+            sleep(wait)
+            slept += wait
+    return slept
+
+def _call(fn):
+    # A plain function as a step without waits
+    fn()
+    yield 0
+
+class Startup:
+    """
+    The drivers of the mouse. Reading imu, tof, motors or encoder builds that driver
+    on its own (blocking); bring_up() builds the ones a run needs at the same time.
+    """
+
+    def __init__(self, cfg=config, cache=DEVICE_CACHE, i2c=None, clock=ticks_us, sleep=sleep_us):
+        """
+        :param cfg: Hardware configuration (config.py).
+        :param cache: File of the saved device map; None never saves one.
+        :param i2c: Bus to use instead of the one make_i2c() opens on the configured pins.
+        :param clock: Microsecond tick source, counting from reset on the board.
+        :param sleep: Function sleeping a number of microseconds.
+        """
+        self.config = cfg
+        self.cache = cache
+        self.clock, self.sleep = clock, sleep
+        self._i2c = i2c
+        self._bus = None
+        self.hardware_i2c = None  # make_i2c() found a hardware controller
+        self._imu = self._tof = self._motors = self._encoder = None
+        self.devices = None     # addresses found on the bus
+        self.scanned = False    # devices came from a scan rather than the saved map
+        self.stages = []        # (name, ticks_us) in the order they completed
+        self.mark('main')
+
+    def mark(self, name):
+        """Time stamp a boot stage."""
+        self.stages.append((name, self.clock()))
+
+    @property
+    def i2c(self):
+        """The one I2C bus of every device."""
+        if self._i2c is None:
+            from utils.i2c_bus import make_i2c
+            self._i2c, self.hardware_i2c = make_i2c(self.config.I2C_CONFIG)
+        return self._i2c
+
+    @property
+    def bus(self):
+        """BusManager on i2c that the drivers use, with the devices and their priorities."""
+        if self._bus is None:
+            from utils.i2c_bus import BusManager, PRIO_CONTROL, PRIO_BACKGROUND
+            bus = BusManager(self.i2c, self.config.I2C_CONFIG['freq'], clock=self.clock)
+            bus.device(_IMU, 'imu', PRIO_CONTROL)
+            bus.device(_ENCODER, 'encoder', PRIO_CONTROL)
+            bus.device(self.config.TOF['address'], 'tof boot', PRIO_BACKGROUND)  # before the moves
+            for name, _, address in self.config.TOF['sensors']:
+                bus.device(address, 'tof ' + name, PRIO_BACKGROUND)
+            self._bus = bus
+        return self._bus
+
+    @property
+    def imu(self):
+        if self._imu is None:
+            from drivers.mpu6500 import MPU6500
+            self._imu = MPU6500(self.bus)
+        return self._imu
+
+    @property
+    def tof(self):
+        if self._tof is None:
+            tof = self._tof_array()
+            tof.begin()
+            tof.start()
+            self._tof = tof
+        return self._tof
+
+    @property
+    def motors(self):
+        if self._motors is None:
+            from drivers.tb6612 import MotorDriver
+            self._motors = MotorDriver(**self.config.MOTOR_PINS)
+        return self._motors
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            from drivers.AS5600 import AS5600
+            self._encoder = AS5600(self.bus, _ENCODER)
+        return self._encoder
+
+    def _tof_array(self):
+        from drivers.tof_array import ToFArray
+        tof = self.config.TOF
+        return ToFArray(self.bus, tof['sensors'], tof['period_ms'])
+
+    def _bus_key(self):
+        bus = self.config.I2C_CONFIG
+        return [bus['scl'], bus['sda'], bus['freq']]
+
+    def find_devices(self, required=(), rescan=False):
+        """
+        Addresses on the bus. The map saved at the previous boot is used instead of a
+        scan if it was made with the same bus configuration and lists every required
+        address; otherwise the bus is scanned and the new map saved.
+        """
+        if not rescan and self.cache:
+            try:
+                with open(self.cache) as f:
+                    saved = json.load(f)
+                if saved['bus'] == self._bus_key() and all(a in saved['devices'] for a in required):
+                    self.devices = saved['devices']
+                    self.scanned = False
+                    return self.devices
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        self.devices = self.i2c.scan()
+        self.scanned = True
+        if self.cache:
+            try:
+                with open(self.cache, 'w') as f:
+                    json.dump({'bus': self._bus_key(), 'devices': self.devices}, f)
+            except OSError:
+                pass
+        return self.devices
+
+    def forget_devices(self):
+        """Delete the saved device map, so the next boot scans the bus."""
+        try:
+            os.remove(self.cache)
+        except (OSError, TypeError):
+            pass
+
+    def bring_up(self, calibrate=256, extra=()):
+        """
+        Bring up everything a run needs: the IMU, the ToF array, the motor driver and,
+        if it is on the bus, the encoder. A saved device map that turns out to be stale
+        (a device does not answer) is dropped and the boot repeated with a scan.
+        :param calibrate: Gyro samples averaged for the offset; 0 skips calibration.
+        :param extra: (name, function) pairs run while the chips are waiting, e.g.
+                      loading the motion primitive library.
+        :return: self
+        """
+        try:
+            self._bring_up(calibrate, extra, False)
+        except OSError:
+            if self.scanned:
+                raise
+            self.mark('saved device map stale')
+            self._bring_up(calibrate, extra, True)
+        return self
+
+    def _bring_up(self, calibrate, extra, rescan):
+        from drivers.mpu6500 import MPU6500
+        self.i2c
+        self.mark('bus')
+        devices = self.find_devices((_IMU,), rescan)
+        self.mark('bus scan' if self.scanned else 'device map')
+        if _IMU not in devices:
+            raise RuntimeError("MPU6500 not found in I2C bus.")
+        imu = MPU6500(self.bus, boot=False)
+        tof = self._tof_array()
+        steps = [self._stage(imu.bring_up(), 'imu awake'), self._stage(tof.bring_up(), 'tof ranging')]
+        for name, fn in extra:
+            steps.append(self._stage(_call(fn), name))
+        run_steps(steps, self.clock, self.sleep)
+        self._imu, self._tof = imu, tof
+        self.motors
+        if _ENCODER in devices:
+            self.encoder
+        self.mark('drivers')
+        if calibrate:
+            imu.calibrate(calibrate)
+            self.mark('gyro calibrated')
+
+    def _stage(self, step, name):
+        for ms in step:
+            yield ms
+        self.mark(name)
+
+    @property
+    def ready_ms(self):
+        """Time from reset to the last stage."""
+        return self.stages[-1][1] / 1000.0
+
+    def report(self, origin=0):
+        """
+        Boot timeline as a list of text lines.
+        :param origin: Tick the times are counted from; 0 is the reset on the board.
+        """
+        lines = ["%-24s %9s %9s" % ('stage', 'at_ms', 'took_ms')]
+        prev = origin
+        for name, t in self.stages:
+            lines.append("%-24s %9.1f %9.1f" % (name, ticks_diff(t, origin) / 1000.0,
+                                                 ticks_diff(t, prev) / 1000.0))
+            prev = t
+        return lines
@@ -0,0 +1,206 @@
+# velocity_control.py
+# Closed-loop motion control: motion profiles generate the reference, PID plus
+# feedforward loops on distance/velocity (wheel encoders) and heading/yaw rate
+# (gyro) turn it into PWM for the TB6612 driver.
+import math
+import time
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:  # CPython host
+    def ticks_us():
+        return int(time.perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+TRAPEZOID = 'trapezoid'
+SCURVE = 'scurve'
+
+class PID:
+    def __init__(self, kp, ki=0.0, kd=0.0, i_limit=None):
+        """
+        :param kp, ki, kd: Gains.
+        :param i_limit: Clamp for the integral term contribution (anti windup).
+        """
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.i_limit = i_limit
+        self.integral = 0.0
+
+    def reset(self):
+        self.integral = 0.0
+
+    def update(self, error, d_error, dt):
+        """
+        :param error: Current error.
+        :param d_error: Error rate, measured directly (e.g. velocity error) instead of differenced.
+        :param dt: Time step in seconds.
+        """
+        self.integral += error * dt * self.ki
+        if self.i_limit is not None:
+            self.integral = max(-self.i_limit, min(self.i_limit, self.integral))
+        return self.kp * error + self.integral + self.kd * d_error
+
+class MotionProfile:
+    """
+    Rest-to-rest profile over a distance (mm or rad). The ramps are either linear
+    (trapezoid) or raised-cosine (S-curve, jerk-limited); in both cases accel is the
+    peak acceleration. Short moves never reach v_max and use a lower peak velocity.
+    """
+
+    def __init__(self, distance, v_max, accel, shape=TRAPEZOID):
+        if accel <= 0:
+            raise ValueError("accel must be positive")
+        self.sign = -1.0 if distance < 0 else 1.0
+        self.distance = d = abs(distance)
+        self.shape = shape
+        k = 1.0 if shape == TRAPEZOID else math.pi / 2  # ramp time = k * v / accel
+        v = v_max
+        if v * k * v / accel > d:
+            v = math.sqrt(accel * d / k)
+        self.v_peak = v
+        self.t_ramp = k * v / accel
+        self.t_cruise = (d - v * self.t_ramp) / v if v > 0 else 0.0
+        self.duration = 2 * self.t_ramp + self.t_cruise
+
+    def _ramp(self, t):
+        # (position, velocity, acceleration) t seconds into the acceleration ramp
+        v, tr = self.v_peak, self.t_ramp
+        if self.shape == TRAPEZOID:
+            a = v / tr
+            return a * t * t / 2, a * t, a
+        x = math.pi * t / tr
+        return v / 2 * (t - tr / math.pi * math.sin(x)), v / 2 * (1 - math.cos(x)), v * math.pi / (2 * tr) * math.sin(x)
+
+    def sample(self, t):
+        """(position, velocity, acceleration) at time t, signed like the requested distance."""
+        s = self.sign
+        if t <= 0 or self.distance == 0:
+            return 0.0, 0.0, 0.0
+        if t >= self.duration:
+            return s * self.distance, 0.0, 0.0
+        if t < self.t_ramp:
+            p, v, a = self._ramp(t)
+            return s * p, s * v, s * a
+        ramp_p = self.v_peak * self.t_ramp / 2
+        if t < self.t_ramp + self.t_cruise:
+            return s * (ramp_p + self.v_peak * (t - self.t_ramp)), s * self.v_peak, 0.0
+        p, v, a = self._ramp(self.duration - t)
+        return s * (self.distance - p), s * v, -s * a
+
+class VelocityController:
+    def __init__(self, motor_driver, track_mm=70.0, kv=43.7, ka=2.2, pwm_limit=65535,
+                 linear_pid=None, angular_pid=None):
+        """
+        :param motor_driver: tb6612.MotorDriver (or anything with set_motor / stop).
+        :param track_mm: Distance between the wheels.
+        :param kv: Velocity feedforward, PWM per mm/s of wheel speed.
+        :param ka: Acceleration feedforward, PWM per mm/s^2 of wheel acceleration.
+        :param pwm_limit: Largest PWM magnitude sent to the driver.
+        :param linear_pid: PID on distance error (d term: velocity error), output in PWM.
+        :param angular_pid: PID on heading error in rad (d term: yaw rate error), output in PWM.
+        """
+        self.driver = motor_driver
+        self.track_mm = track_mm
+        self.kv, self.ka = kv, ka
+        self.pwm_limit = pwm_limit
+        self.linear_pid = linear_pid or PID(400.0, 2000.0, 30.0, i_limit=15000)
+        self.angular_pid = angular_pid or PID(60000.0, 600000.0, 2000.0, i_limit=15000)
+        self.linear = MotionProfile(0, 1, 1)
+        self.angular = MotionProfile(0, 1, 1)
+        self.t = 0.0
+        self.distance = 0.0  # measured, from encoders
+        self.heading = 0.0   # measured, from gyro (rad, CCW positive)
+        self.error = (0.0, 0.0)
+
+    def _start(self, linear, angular):
+        self.linear, self.angular = linear, angular
+        self.t = 0.0
+        self.distance = self.heading = 0.0
+        self.linear_pid.reset()
+        self.angular_pid.reset()
+
+    def start_straight(self, distance_mm, v_max=700.0, accel=3000.0, shape=TRAPEZOID):
+        """Drive straight while holding the heading."""
+        self._start(MotionProfile(distance_mm, v_max, accel, shape), MotionProfile(0, 1, 1))
+
+    def start_turn(self, angle_deg, w_max=10.0, alpha=100.0, shape=TRAPEZOID):
+        """Turn in place, positive angles to the left (CCW). w_max in rad/s, alpha in rad/s^2."""
+        self._start(MotionProfile(0, 1, 1), MotionProfile(math.radians(angle_deg), w_max, alpha, shape))
+
+    def start_profiles(self, linear, angular):
+        """
+        Follow any pair of profiles with MotionProfile's duration / sample(t) interface,
+        e.g. the precomputed ones from motion_primitives.compile_plan(). Meant for chained
+        moves: the tracking error left over from the previous profiles and the PID state
+        are kept instead of being reset.
+        """
+        e_lin = self.distance - self.linear.sample(self.t)[0]
+        e_ang = self.heading - self.angular.sample(self.t)[0]
+        self.linear, self.angular = linear, angular
+        self.t = 0.0
+        self.distance, self.heading = e_lin, e_ang
+
+    @property
+    def done(self):
+        return self.t >= max(self.linear.duration, self.angular.duration)
+
+    def update(self, dt, left_velocity, right_velocity, yaw_rate):
+        """
+        One control tick.
+        :param dt: Time since the previous tick in seconds.
+        :param left_velocity, right_velocity: Wheel speeds from the encoders in mm/s.
+        :param yaw_rate: Gyro yaw rate in rad/s, CCW positive.
+        :return: (left PWM, right PWM) that were sent to the driver.
+        """
+        self.t += dt
+        v = (left_velocity + right_velocity) / 2
+        self.distance += v * dt
+        self.heading += yaw_rate * dt
+        p_ref, v_ref, a_ref = self.linear.sample(self.t)
+        th_ref, w_ref, al_ref = self.angular.sample(self.t)
+        half = self.track_mm / 2
+        e_lin, e_ang = p_ref - self.distance, th_ref - self.heading
+        self.error = (e_lin, e_ang)
+
+        u_lin = self.kv * v_ref + self.ka * a_ref + self.linear_pid.update(e_lin, v_ref - v, dt)
+        u_ang = (self.kv * w_ref * half + self.ka * al_ref * half
+                 + self.angular_pid.update(e_ang, w_ref - yaw_rate, dt))
+        limit = self.pwm_limit
+        left = int(max(-limit, min(limit, u_lin - u_ang)))
+        right = int(max(-limit, min(limit, u_lin + u_ang)))
+        self.driver.set_motor("left", left)
+        self.driver.set_motor("right", right)
+        return left, right
+
+# Host-side tuning check against the plant model
+if __name__ == "__main__":
+    from sim.plant import DiffDrivePlant
+
+    def run(plant, ctrl, rate_hz=1000, settle=0.2):
+        dt = 1.0 / rate_hz
+        ticks = int((max(ctrl.linear.duration, ctrl.angular.duration) + settle) * rate_hz)
+        worst, busy_us = 0.0, 0
+        for _ in range(ticks):
+            vl, vr = plant.wheel_velocities()
+            t0 = ticks_us()
+            ctrl.update(dt, vl, vr, plant.yaw_rate())
+            busy_us += ticks_diff(ticks_us(), t0)
+            plant.step(dt)
+            worst = max(worst, abs(ctrl.error[0]))
+        plant.stop()
+        return worst, busy_us / ticks
+
+    for shape in (TRAPEZOID, SCURVE):
+        plant = DiffDrivePlant(left_gain=0.95, noise=0.002, seed=1)
+        ctrl = VelocityController(plant)
+        ctrl.start_straight(5 * 180, v_max=1000.0, accel=4000.0, shape=shape)
+        worst, us = run(plant, ctrl)
+        print("%-9s straight 900 mm in %.2f s: end %.1f mm, drift %.1f mm / %.2f deg, worst lag %.1f mm, %.1f us/tick" % (
+            shape, ctrl.linear.duration, plant.distance, plant.y, math.degrees(plant.heading), worst, us))
+
+        plant = DiffDrivePlant(noise=0.002, seed=2)
+        ctrl = VelocityController(plant)
+        ctrl.start_turn(90, shape=shape)
+        worst, us = run(plant, ctrl)
+        print("%-9s turn 90 deg in %.2f s: end %.2f deg, %.1f us/tick" % (
+            shape, ctrl.angular.duration, math.degrees(plant.heading), us))